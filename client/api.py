@@ -1,28 +1,220 @@
+import select
 import socket
-from typing import Any, Dict, List, Optional
+import threading
+import itertools
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
 from client.protocol import encode_message, decode_message
 
+# actions a read-only follower (server/follower.py) can answer
+FOLLOWER_READS = {"list_teams", "list_players_by_team", "list_free_agents", "search"}
+# columns of the rows returned by CampionatoAPI.export (server.db.EXPORT_COLUMNS)
+EXPORT_COLUMNS = (
+    "id_squadra", "nome_club", "citta", "anno_fondazione", "budget",
+    "id_giocatore", "nome", "cognome", "ruolo", "numero_maglia", "gol_segnati",
+)
+
+# actions that change nothing: safe to send again when no reply came back
+READ_ACTIONS = FOLLOWER_READS | {"changes_since", "cache_stats", "replica_status"}
 
 class ApiError(Exception):
     pass
 
 
+class _ConnectionLost(Exception):
+    def __init__(self, received: int):
+        super().__init__(received)
+        self.received = received
+
+
+class _SendFailed(Exception):
+    """The request could not be written, so the server never got it."""
+
+
+class EventSubscription:
+    """
+    Background reader for a ``subscribe`` connection: calls ``callback(event)``
+    for every change pushed by the server until ``close()``. If the
+    connection drops, ``on_error`` (if given) receives the ``ApiError``.
+    """
+
+    def __init__(self, sock: socket.socket, callback: Callable[[Dict[str, Any]], None],
+                 on_error: Optional[Callable[[ApiError], None]] = None):
+        self._sock = sock
+        self._callback = callback
+        self._on_error = on_error
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="campionato-events", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            for line in self._sock.makefile("rb"):
+                msg = decode_message(line)
+                if "event" not in msg:
+                    CampionatoAPI._check(msg)
+                    continue
+                if msg["event"].get("type") != "heartbeat":
+                    self._callback(msg["event"])
+            error = ApiError("Connessione eventi chiusa dal server.")
+        except ApiError as e:
+            error = e
+        except OSError as e:
+            error = ApiError(f"Connessione eventi interrotta: {e}")
+        if not self._closed and self._on_error is not None:
+            self._on_error(error)
+
+    def close(self) -> None:
+        self._closed = True
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+
+
 class CampionatoAPI:
-    def __init__(self, host: str = "127.0.0.1", port: int = 5000):
+    """
+    Client for the Campionato server.
+
+    One connection is kept open per instance and reused by every call
+    (guarded by a lock, so an instance can be shared between threads).
+    An idle connection the server has closed is replaced before writing; if
+    the connection breaks once a request is out, only reads are sent again
+    (a write may already be committed). ``stream`` uses a connection of its own.
+
+    With ``followers`` (``[(host, port), ...]``) the list reads are spread
+    round-robin over those read-only followers and fall back to the primary
+    when a follower can't be reached; writes and ``fetch_if_modified``
+    always go to the primary.
+    Followers lag slightly behind, so a read right after a write may not
+    see it yet.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 5000,
+                 timeout: float = 5.0, connect_timeout: float = 5.0,
+                 followers: Sequence[Tuple[str, int]] = ()):
         self.host = host
         self.port = port
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+        self._lock = threading.Lock()
+        self._followers = [CampionatoAPI(h, p, timeout, connect_timeout) for h, p in followers]
+        self._next_follower = itertools.count()
 
-    def _send(self, req: Dict[str, Any]) -> Dict[str, Any]:
+    def close(self) -> None:
+        with self._lock:
+            self._disconnect()
+        for follower in self._followers:
+            follower.close()
+
+    def __enter__(self) -> "CampionatoAPI":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _connect(self) -> None:
+        s = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+        s.settimeout(self.timeout)
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock, self._file = s, s.makefile("rb")
+
+    def _disconnect(self) -> None:
+        if self._sock is not None:
+            try:
+                self._file.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = self._file = None
+
+    def _exchange(self, payload: bytes, count: int, idempotent: bool = False) -> List[Dict[str, Any]]:
+        """
+        Write ``payload`` and read ``count`` response lines on the shared connection.
+
+        A reused connection the server has already closed is replaced before
+        writing. If the connection breaks after the request went out, it is
+        sent again only when ``idempotent``: a write may already be committed.
+        """
+        with self._lock:
+            for attempt in range(2):
+                if self._sock is not None and self._closed_by_peer():
+                    self._disconnect()
+                reused = self._sock is not None
+                try:
+                    if not reused:
+                        self._connect()
+                    return self._write_read(payload, count)
+                except socket.timeout as e:
+                    # the server may still be working on it: never resend
+                    self._disconnect()
+                    raise ApiError(f"Timeout in attesa del server: {e}") from e
+                except (OSError, _ConnectionLost, _SendFailed) as e:
+                    self._disconnect()
+                    unsent = isinstance(e, _SendFailed)
+                    received = e.received if isinstance(e, _ConnectionLost) else 0
+                    if reused and attempt == 0 and received == 0 and (unsent or idempotent):
+                        continue  # retry on a new connection
+                    if isinstance(e, _ConnectionLost):
+                        raise ApiError("Risposta vuota dal server.") from None
+                    raise ApiError(f"Connessione al server fallita: {e}") from e
+
+    def _closed_by_peer(self) -> bool:
+        # between exchanges nothing is due: a readable socket means EOF or an error
         try:
-            with socket.create_connection((self.host, self.port), timeout=5) as s:
-                s.sendall(encode_message(req))
-                line = s.makefile("rb").readline()
-                if not line:
-                    raise ApiError("Risposta vuota dal server.")
-                resp = decode_message(line)
-        except OSError as e:
-            raise ApiError(f"Connessione al server fallita: {e}") from e
+            readable, _, _ = select.select([self._sock], [], [], 0)
+            return bool(readable) and self._sock.recv(1, socket.MSG_PEEK) == b""
+        except OSError:
+            return True
+
+    def _write_read(self, payload: bytes, count: int) -> List[Dict[str, Any]]:
+        if count == 1:
+            try:
+                self._sock.sendall(payload)
+            except socket.timeout:
+                raise
+            except OSError as e:
+                raise _SendFailed(e) from e
+            writer = None
+        else:
+            # write from another thread so a long pipeline can't deadlock
+            # against the server filling our receive buffer
+            writer = threading.Thread(target=self._sendall_quietly, args=(self._sock, payload), daemon=True)
+            writer.start()
+        responses = []
+        for _ in range(count):
+            line = self._file.readline()
+            if not line:
+                raise _ConnectionLost(len(responses))
+            responses.append(decode_message(line))
+        if writer is not None:
+            writer.join()
+        return responses
+
+    @staticmethod
+    def _sendall_quietly(sock: socket.socket, payload: bytes) -> None:
+        try:
+            sock.sendall(payload)
+        except OSError:
+            pass  # the reader side reports the broken connection
+
+    def _send(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        payload = encode_message(req)
+        idempotent = req.get("action") in READ_ACTIONS
+        if self._followers and req.get("action") in FOLLOWER_READS:
+            follower = self._followers[next(self._next_follower) % len(self._followers)]
+            try:
+                return self._check(follower._exchange(payload, 1, idempotent)[0])
+            except ApiError:
+                pass  # unreachable follower: the primary answers instead
+        resp = self._exchange(payload, 1, idempotent)[0]
+        return self._check(resp)
+
+    @staticmethod
+    def _check(resp: Dict[str, Any]) -> Dict[str, Any]:
         if not resp.get("ok"):
             err = resp.get("error")
             if isinstance(err, dict):
@@ -30,6 +222,132 @@ class CampionatoAPI:
             raise ApiError(str(err) if err else "Errore sconosciuto.")
         return resp
 
+    def pipeline(self, requests: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Send all ``requests`` back to back on one connection and return their
+        ``data`` in the same order. The server runs them concurrently and
+        replies as each one finishes; replies are matched by ``id``.
+
+        Example::
+
+            teams, free = api.pipeline([
+                {"action": "list_teams", "data": {}},
+                {"action": "list_free_agents", "data": {}},
+            ])
+        """
+        if not requests:
+            return []
+        payload = b"".join(
+            encode_message({**req, "id": i}) for i, req in enumerate(requests)
+        )
+        idempotent = all(req.get("action") in READ_ACTIONS for req in requests)
+        responses = {resp.get("id"): resp for resp in self._exchange(payload, len(requests), idempotent)}
+        return [self._check(responses[i])["data"] for i in range(len(requests))]
+
+
+    def batch(self, requests: List[Dict[str, Any]], atomic: bool = False) -> List[Dict[str, Any]]:
+        """
+        Run many ``{"action": ..., "data": ...}`` requests in one round trip
+        and one server-side transaction. Returns one ``{"ok": ..., ...}``
+        result per request; with ``atomic=True`` any failure undoes the whole
+        batch and raises ``ApiError``.
+        """
+        resp = self._send({
+            "action": "batch",
+            "data": {"requests": requests, "atomic": atomic},
+        })
+        return resp["data"]
+
+    def _iter_pages(self, action: str, data: Dict[str, Any], page_size: int) -> Iterator[Any]:
+        after = None
+        while True:
+            resp = self._send({"action": action, "data": {**data, "limit": page_size, "after": after}})
+            yield from resp["data"]
+            after = resp.get("next")
+            if after is None:
+                return
+
+    @staticmethod
+    def _page_args(limit: Optional[int], after: Optional[List[Any]]) -> Dict[str, Any]:
+        args: Dict[str, Any] = {}
+        if limit is not None:
+            args["limit"] = limit
+        if after is not None:
+            args["after"] = after
+        return args
+
+    def stream(self, action: str, data: Optional[Dict[str, Any]] = None,
+               chunk_size: Optional[int] = None) -> Iterator[Any]:
+        """
+        Rows of a list action in streaming mode: the server sends them in
+        chunks as it reads them and this generator yields them one by one,
+        so neither side holds the whole result in memory.
+        """
+        data = dict(data or {})
+        if chunk_size is not None:
+            data["chunk_size"] = chunk_size
+        try:
+            with socket.create_connection((self.host, self.port), timeout=self.connect_timeout) as s:
+                s.settimeout(self.timeout)
+                s.sendall(encode_message({"action": action, "data": data, "stream": True}))
+                for line in s.makefile("rb"):
+                    frame = self._check(decode_message(line))
+                    if frame.get("done"):
+                        return
+                    yield from frame["rows"]
+        except OSError as e:
+            raise ApiError(f"Connessione al server fallita: {e}") from e
+        raise ApiError("Stream interrotto dal server.")
+
+    def fetch_if_modified(self, action: str, data: Optional[Dict[str, Any]] = None,
+                          if_version: Optional[int] = None) -> Tuple[Optional[List[Any]], int]:
+        """
+        Conditional list read: returns ``(rows, version)``, or ``(None, version)``
+        when the data is still at ``if_version`` and the server skipped the query.
+
+        Always asked to the primary: versions are counters local to each
+        server, so a version seen on one follower means nothing to another.
+
+        Example::
+
+            rows, version = api.fetch_if_modified("list_teams")
+            ...
+            fresh, version = api.fetch_if_modified("list_teams", if_version=version)
+            if fresh is not None:
+                rows = fresh
+        """
+        data = dict(data or {})
+        if if_version is not None:
+            data["if_version"] = if_version
+        payload = encode_message({"action": action, "data": data})
+        resp = self._check(self._exchange(payload, 1, action in READ_ACTIONS)[0])
+        if resp.get("not_modified"):
+            return None, resp["version"]
+        return resp["data"], resp["version"]
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None], types: Optional[List[str]] = None,
+                  on_error: Optional[Callable[[ApiError], None]] = None) -> EventSubscription:
+        """
+        Receive change events (``{"type": "player_transferred", "id_giocatore": ...}``)
+        as soon as the server commits them, instead of polling. ``callback``
+        runs on a background thread; ``types`` restricts the event types.
+        """
+        try:
+            s = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+            s.sendall(encode_message({"action": "subscribe", "data": {"types": types}}))
+            line = s.makefile("rb").readline()
+        except OSError as e:
+            raise ApiError(f"Connessione al server fallita: {e}") from e
+        if not line:
+            s.close()
+            raise ApiError("Risposta vuota dal server.")
+        try:
+            self._check(decode_message(line))
+        except ApiError:
+            s.close()
+            raise
+        s.settimeout(None)  # events may be minutes apart; heartbeats keep it alive
+        return EventSubscription(s, callback, on_error)
 
     # ---- Teams ----
     def create_team(self, nome_club: str, citta: str, anno_fondazione: int, budget: float) -> int:
@@ -44,10 +362,17 @@ class CampionatoAPI:
         })
         return int(resp["data"]["id_squadra"])
 
-    def list_teams(self) -> List[Any]:
-        resp = self._send({"action": "list_teams", "data": {}})
+    def list_teams(self, limit: Optional[int] = None, after: Optional[List[Any]] = None) -> List[Any]:
+        resp = self._send({"action": "list_teams", "data": self._page_args(limit, after)})
         return resp["data"]
 
+    def iter_teams(self, page_size: int = 500) -> Iterator[Any]:
+        """All teams, fetched ``page_size`` at a time."""
+        return self._iter_pages("list_teams", {}, page_size)
+
+    def stream_teams(self) -> Iterator[Any]:
+        return self.stream("list_teams")
+
     def delete_team(self, id_squadra: int) -> None:
         self._send({"action": "delete_team", "data": {"id_squadra": id_squadra}})
 
@@ -65,10 +390,20 @@ class CampionatoAPI:
         })
         return int(resp["data"]["id_giocatore"])
 
-    def list_players_by_team(self, id_squadra: int) -> List[Any]:
-        resp = self._send({"action": "list_players_by_team", "data": {"id_squadra": id_squadra}})
+    def list_players_by_team(self, id_squadra: int, limit: Optional[int] = None,
+                             after: Optional[List[Any]] = None) -> List[Any]:
+        resp = self._send({
+            "action": "list_players_by_team",
+            "data": {"id_squadra": id_squadra, **self._page_args(limit, after)},
+        })
         return resp["data"]
 
+    def iter_players_by_team(self, id_squadra: int, page_size: int = 500) -> Iterator[Any]:
+        return self._iter_pages("list_players_by_team", {"id_squadra": id_squadra}, page_size)
+
+    def stream_players_by_team(self, id_squadra: int) -> Iterator[Any]:
+        return self.stream("list_players_by_team", {"id_squadra": id_squadra})
+
     def update_player(self, id_giocatore: int, nome: str, cognome: str, ruolo: str, numero_maglia: int) -> None:
         self._send({
             "action": "update_player",
@@ -90,6 +425,56 @@ class CampionatoAPI:
     def delete_player(self, id_giocatore: int) -> None:
         self._send({"action": "delete_player", "data": {"id_giocatore": id_giocatore}})
 
-    def list_free_agents(self):
-        resp = self._send({"action": "list_free_agents", "data": {}})
-        return resp["data"]
\ No newline at end of file
+    def list_free_agents(self, limit: Optional[int] = None, after: Optional[List[Any]] = None):
+        resp = self._send({"action": "list_free_agents", "data": self._page_args(limit, after)})
+        return resp["data"]
+
+    def iter_free_agents(self, page_size: int = 500) -> Iterator[Any]:
+        return self._iter_pages("list_free_agents", {}, page_size)
+
+    def stream_free_agents(self) -> Iterator[Any]:
+        return self.stream("list_free_agents")
+
+    # ---- Search ----
+    def search(self, q: str, limit: Optional[int] = None, fields: Optional[List[str]] = None) -> List[Any]:
+        """
+        Players and teams matching every word of ``q`` as a prefix, best
+        first, as ``[tipo, id, nome, cognome, ruolo, nome_club]`` with
+        ``tipo`` ``"giocatore"`` or ``"squadra"``. For typeahead boxes.
+        Names are matched unless ``fields`` lists the columns to match
+        (``nome``, ``cognome``, ``squadra``, ``ruolo``, ``nome_club``).
+        """
+        data: Dict[str, Any] = {"q": q}
+        if limit is not None:
+            data["limit"] = limit
+        if fields is not None:
+            data["fields"] = fields
+        return self._send({"action": "search", "data": data})["data"]
+
+    def export(self, chunk_size: Optional[int] = None) -> Iterator[Any]:
+        """Every team and player as ``EXPORT_COLUMNS`` rows, streamed from one server cursor."""
+        return self.stream("export", chunk_size=chunk_size)
+    # ---- Change log ----
+    def changes_since(self, seq: int = 0, limit: Optional[int] = None) -> Tuple[List[Any], int]:
+        """
+        One page of changes committed after ``seq`` as
+        ``[seq, tabella, operazione, id, riga]`` (``riga`` is None for deletes),
+        and the server's latest ``seq``.
+        """
+        data: Dict[str, Any] = {"seq": seq}
+        if limit is not None:
+            data["limit"] = limit
+        resp = self._send({"action": "changes_since", "data": data})
+        return resp["data"], resp["last_seq"]
+
+    def iter_changes(self, seq: int = 0, page_size: int = 1000) -> Iterator[Any]:
+        """
+        Every change after ``seq``, fetched ``page_size`` at a time (the
+        server may send smaller pages: it caps their size).
+        """
+        while True:
+            changes, last = self.changes_since(seq, page_size)
+            yield from changes
+            if not changes or changes[-1][0] >= last:
+                return
+            seq = changes[-1][0]
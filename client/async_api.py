@@ -0,0 +1,328 @@
+import asyncio
+import itertools
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from client.api import ApiError, CampionatoAPI
+from client.protocol import encode_message, decode_message
+
+# max length of one response line
+MAX_LINE = 16 * 1024 * 1024
+
+
+class _Connection:
+    """
+    One socket with any number of requests in flight: every request carries
+    an ``id`` and a reader task hands each reply to the future waiting for it.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._pending: Dict[int, asyncio.Future] = {}
+        self.closed = False
+        self._read_task = asyncio.create_task(self._read_loop())
+
+    async def request(self, req_id: int, payload: bytes) -> Dict[str, Any]:
+        if self.closed:
+            raise ApiError("Connessione al server chiusa.")
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[req_id] = fut
+        try:
+            self._writer.write(payload)
+            await self._writer.drain()
+            return await fut
+        except OSError as e:
+            self._fail(ApiError(f"Connessione al server fallita: {e}"))
+            raise ApiError(f"Connessione al server fallita: {e}") from e
+        finally:
+            self._pending.pop(req_id, None)
+
+    async def close(self) -> None:
+        self._fail(ApiError("Connessione al server chiusa."))
+        self._read_task.cancel()
+        try:
+            await self._writer.wait_closed()
+        except OSError:
+            pass
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                resp = decode_message(line)
+                fut = self._pending.get(resp.get("id"))
+                if fut is not None and not fut.done():
+                    fut.set_result(resp)
+        except (OSError, ValueError) as e:
+            self._fail(ApiError(f"Connessione al server fallita: {e}"))
+        else:
+            self._fail(ApiError("Risposta vuota dal server."))
+
+    def _fail(self, error: ApiError) -> None:
+        if not self.closed:
+            self.closed = True
+            self._writer.close()
+        for fut in self._pending.values():
+            if not fut.done():
+                fut.set_exception(error)
+
+
+class AsyncCampionatoAPI:
+    """
+    asyncio counterpart of ``CampionatoAPI``, with the same methods as
+    coroutines. Requests are spread over up to ``pool_size`` connections and
+    pipelined on each of them, so many calls can run at once::
+
+        async with AsyncCampionatoAPI() as api:
+            rosters = await asyncio.gather(*(api.list_players_by_team(t[0]) for t in teams))
+
+    ``stream``, ``export`` and ``subscribe`` are async iterators, each on a
+    connection of its own. There are no followers: every call goes to
+    ``host``.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 5000,
+                 pool_size: int = 4, timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._conns: List[Optional[_Connection]] = [None] * pool_size
+        self._next = itertools.count()
+        self._ids = itertools.count()
+        self._connect_lock: Optional[asyncio.Lock] = None
+
+    async def __aenter__(self) -> "AsyncCampionatoAPI":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        conns, self._conns = self._conns, [None] * self.pool_size
+        for conn in conns:
+            if conn is not None:
+                await conn.close()
+
+    async def _connection(self) -> _Connection:
+        slot = next(self._next) % self.pool_size
+        conn = self._conns[slot]
+        if conn is not None and not conn.closed:
+            return conn
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            conn = self._conns[slot]
+            if conn is None or conn.closed:
+                conn = self._conns[slot] = _Connection(*await self._open())
+        return conn
+
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        try:
+            return await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, limit=MAX_LINE), self.timeout
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise ApiError(f"Connessione al server fallita: {e}") from e
+
+    async def _send(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        conn = await self._connection()
+        req_id = next(self._ids)
+        try:
+            resp = await asyncio.wait_for(
+                conn.request(req_id, encode_message({**req, "id": req_id})), self.timeout
+            )
+        except asyncio.TimeoutError as e:
+            raise ApiError("Timeout in attesa del server.") from e
+        return CampionatoAPI._check(resp)
+
+    async def _iter_pages(self, action: str, data: Dict[str, Any], page_size: int) -> AsyncIterator[Any]:
+        after = None
+        while True:
+            resp = await self._send({"action": action, "data": {**data, "limit": page_size, "after": after}})
+            for row in resp["data"]:
+                yield row
+            after = resp.get("next")
+            if after is None:
+                return
+
+    async def stream(self, action: str, data: Optional[Dict[str, Any]] = None,
+                     chunk_size: Optional[int] = None) -> AsyncIterator[Any]:
+        """Rows of a list action in streaming mode (see ``CampionatoAPI.stream``)."""
+        data = dict(data or {})
+        if chunk_size is not None:
+            data["chunk_size"] = chunk_size
+        reader, writer = await self._open()
+        try:
+            writer.write(encode_message({"action": action, "data": data, "stream": True}))
+            await writer.drain()
+            while True:
+                line = await asyncio.wait_for(reader.readline(), self.timeout)
+                if not line:
+                    raise ApiError("Stream interrotto dal server.")
+                frame = CampionatoAPI._check(decode_message(line))
+                if frame.get("done"):
+                    return
+                for row in frame["rows"]:
+                    yield row
+        except asyncio.TimeoutError as e:
+            raise ApiError("Timeout in attesa del server.") from e
+        except (OSError, ValueError) as e:
+            raise ApiError(f"Connessione al server fallita: {e}") from e
+        finally:
+            writer.close()
+
+    async def fetch_if_modified(self, action: str, data: Optional[Dict[str, Any]] = None,
+                                if_version: Optional[int] = None) -> Tuple[Optional[List[Any]], int]:
+        """Conditional list read (see ``CampionatoAPI.fetch_if_modified``)."""
+        data = dict(data or {})
+        if if_version is not None:
+            data["if_version"] = if_version
+        resp = await self._send({"action": action, "data": data})
+        if resp.get("not_modified"):
+            return None, resp["version"]
+        return resp["data"], resp["version"]
+
+    async def subscribe(self, types: Optional[List[str]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Change events as the server commits them (see ``CampionatoAPI.subscribe``);
+        the connection closes when the loop stops::
+
+            async for event in api.subscribe(["team_deleted"]):
+                ...
+        """
+        reader, writer = await self._open()
+        try:
+            writer.write(encode_message({"action": "subscribe", "data": {"types": types}}))
+            await writer.drain()
+            # no timeout: events may be minutes apart; heartbeats keep it alive
+            while True:
+                line = await reader.readline()
+                if not line:
+                    raise ApiError("Connessione eventi chiusa dal server.")
+                msg = decode_message(line)
+                if "event" not in msg:
+                    CampionatoAPI._check(msg)
+                elif msg["event"].get("type") != "heartbeat":
+                    yield msg["event"]
+        except (OSError, ValueError) as e:
+            raise ApiError(f"Connessione eventi interrotta: {e}") from e
+        finally:
+            writer.close()
+
+    async def batch(self, requests: List[Dict[str, Any]], atomic: bool = False) -> List[Dict[str, Any]]:
+        resp = await self._send({
+            "action": "batch",
+            "data": {"requests": requests, "atomic": atomic},
+        })
+        return resp["data"]
+
+    # ---- Teams ----
+    async def create_team(self, nome_club: str, citta: str, anno_fondazione: int, budget: float) -> int:
+        resp = await self._send({
+            "action": "create_team",
+            "data": {
+                "nome_club": nome_club,
+                "citta": citta,
+                "anno_fondazione": anno_fondazione,
+                "budget": budget,
+            }
+        })
+        return int(resp["data"]["id_squadra"])
+
+    async def list_teams(self, limit: Optional[int] = None, after: Optional[List[Any]] = None) -> List[Any]:
+        resp = await self._send({"action": "list_teams", "data": CampionatoAPI._page_args(limit, after)})
+        return resp["data"]
+
+    def iter_teams(self, page_size: int = 500) -> AsyncIterator[Any]:
+        return self._iter_pages("list_teams", {}, page_size)
+
+    def stream_teams(self) -> AsyncIterator[Any]:
+        return self.stream("list_teams")
+
+    async def delete_team(self, id_squadra: int) -> None:
+        await self._send({"action": "delete_team", "data": {"id_squadra": id_squadra}})
+
+    # ---- Players ----
+    async def create_player(self, nome: str, cognome: str, ruolo: str, numero_maglia: int,
+                            id_squadra: Optional[int]) -> int:
+        resp = await self._send({
+            "action": "create_player",
+            "data": {
+                "nome": nome,
+                "cognome": cognome,
+                "ruolo": ruolo,
+                "numero_maglia": numero_maglia,
+                "id_squadra": id_squadra,
+            }
+        })
+        return int(resp["data"]["id_giocatore"])
+
+    async def list_players_by_team(self, id_squadra: int, limit: Optional[int] = None,
+                                   after: Optional[List[Any]] = None) -> List[Any]:
+        resp = await self._send({
+            "action": "list_players_by_team",
+            "data": {"id_squadra": id_squadra, **CampionatoAPI._page_args(limit, after)},
+        })
+        return resp["data"]
+
+    def iter_players_by_team(self, id_squadra: int, page_size: int = 500) -> AsyncIterator[Any]:
+        return self._iter_pages("list_players_by_team", {"id_squadra": id_squadra}, page_size)
+
+    def stream_players_by_team(self, id_squadra: int) -> AsyncIterator[Any]:
+        return self.stream("list_players_by_team", {"id_squadra": id_squadra})
+
+    async def update_player(self, id_giocatore: int, nome: str, cognome: str, ruolo: str,
+                            numero_maglia: int) -> None:
+        await self._send({
+            "action": "update_player",
+            "data": {
+                "id_giocatore": id_giocatore,
+                "nome": nome,
+                "cognome": cognome,
+                "ruolo": ruolo,
+                "numero_maglia": numero_maglia,
+            }
+        })
+
+    async def transfer_player(self, id_giocatore: int, id_squadra: Optional[int]) -> None:
+        await self._send({
+            "action": "transfer_player",
+            "data": {"id_giocatore": id_giocatore, "id_squadra": id_squadra}
+        })
+
+    async def delete_player(self, id_giocatore: int) -> None:
+        await self._send({"action": "delete_player", "data": {"id_giocatore": id_giocatore}})
+
+    async def list_free_agents(self, limit: Optional[int] = None, after: Optional[List[Any]] = None):
+        resp = await self._send({"action": "list_free_agents", "data": CampionatoAPI._page_args(limit, after)})
+        return resp["data"]
+
+    def iter_free_agents(self, page_size: int = 500) -> AsyncIterator[Any]:
+        return self._iter_pages("list_free_agents", {}, page_size)
+
+    def stream_free_agents(self) -> AsyncIterator[Any]:
+        return self.stream("list_free_agents")
+
+    def export(self, chunk_size: Optional[int] = None) -> AsyncIterator[Any]:
+        """Every team and player as ``EXPORT_COLUMNS`` rows, streamed from one server cursor."""
+        return self.stream("export", chunk_size=chunk_size)
+
+    # ---- Change log ----
+    async def changes_since(self, seq: int = 0, limit: Optional[int] = None):
+        data: Dict[str, Any] = {"seq": seq}
+        if limit is not None:
+            data["limit"] = limit
+        resp = await self._send({"action": "changes_since", "data": data})
+        return resp["data"], resp["last_seq"]
+
+    async def search(self, q: str, limit: Optional[int] = None, fields: Optional[List[str]] = None):
+        data: Dict[str, Any] = {"q": q}
+        if limit is not None:
+            data["limit"] = limit
+        if fields is not None:
+            data["fields"] = fields
+        resp = await self._send({"action": "search", "data": data})
+        return resp["data"]
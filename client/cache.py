@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from client.api import CampionatoAPI
+
+# seconds a cached read stays valid
+DEFAULT_TTLS = {
+    "list_teams": 30.0,
+    "list_players_by_team": 10.0,
+    "list_free_agents": 10.0,
+}
+
+# read actions made stale by each write; None means all of them
+INVALIDATES = {
+    "create_team": ("list_teams",),
+    "delete_team": None,
+    "create_player": ("list_players_by_team", "list_free_agents"),
+    "update_player": ("list_players_by_team", "list_free_agents"),
+    "transfer_player": ("list_players_by_team", "list_free_agents"),
+    "delete_player": ("list_players_by_team", "list_free_agents"),
+    "batch": None,
+}
+
+# expired entries are swept once the cache grows past this size
+SWEEP_AFTER = 256
+
+
+class CachedCampionatoAPI(CampionatoAPI):
+    """
+    ``CampionatoAPI`` that answers repeated reads from a local cache.
+
+    Each read action has its own TTL (``ttls``, 0 disables caching for it).
+    Writes made through this instance drop the reads they can affect, so the
+    caller always sees its own changes; changes made by other clients show
+    up when the TTL expires or after ``invalidate()``.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 5000,
+                 ttls: Optional[Dict[str, float]] = None, **kwargs):
+        super().__init__(host, port, **kwargs)
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._entries: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+        self._cache_lock = threading.Lock()
+        # bumped by every invalidate(): a read that was in flight across one
+        # may carry the data from before the write and is not stored
+        self._generation = 0
+        self.hits = self.misses = self.invalidations = 0
+
+    def _send(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        action = req.get("action")
+        ttl = self.ttls.get(action, 0)
+        if ttl <= 0:
+            resp = super()._send(req)
+            if action in INVALIDATES:
+                self.invalidate(*(INVALIDATES[action] or ()))
+            return resp
+
+        key = (action, json.dumps(req.get("data", {}), sort_keys=True))
+        now = time.monotonic()
+        with self._cache_lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+        resp = super()._send(req)
+        with self._cache_lock:
+            if self._generation != generation:
+                return resp
+            self._entries[key] = (now + ttl, resp)
+            if len(self._entries) > SWEEP_AFTER:
+                for k in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+                    del self._entries[k]
+        return resp
+
+    def pipeline(self, requests: List[Dict[str, Any]]) -> List[Any]:
+        try:
+            return super().pipeline(requests)
+        finally:
+            for req in requests:
+                if req.get("action") in INVALIDATES:
+                    self.invalidate(*(INVALIDATES[req["action"]] or ()))
+
+    def invalidate(self, *actions: str) -> None:
+        """Drop cached reads of ``actions`` (all of them if none given)."""
+        with self._cache_lock:
+            self._generation += 1
+            keys = [k for k in self._entries if not actions or k[0] in actions]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+
+    def cache_stats(self) -> Dict[str, int]:
+        with self._cache_lock:
+            now = time.monotonic()
+            return {
+                "entries": len(self._entries),
+                "live": sum(1 for expires, _ in self._entries.values() if expires > now),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
@@ -3,6 +3,7 @@ from tkinter import ttk, messagebox
 from pathlib import Path
 from datetime import date
 from client.api import CampionatoAPI, ApiError
+from client.cache import CachedCampionatoAPI
 
 PASSWORD = "mypass" 
 ROLES = ["Portiere", "Difensore", "Centrocampista", "Attaccante"]
@@ -125,7 +126,7 @@ class DisplayWindow(tk.Toplevel):
 
         btns = ttk.Frame(root)
         btns.pack(fill="x", pady=6)
-        ttk.Button(btns, text="Aggiorna tutto", command=self.refresh_all).pack(side="left")
+        ttk.Button(btns, text="Aggiorna tutto", command=self.reload_all).pack(side="left")
 
         # Players for selected team
         ttk.Separator(root).pack(fill="x", pady=10)
@@ -143,6 +144,31 @@ class DisplayWindow(tk.Toplevel):
 
         self.refresh_all()
 
+        # live updates: the event thread only flags changes, Tk reloads from its own loop
+        self._changed = False
+        try:
+            self._events = self.api.subscribe(self._on_event)
+        except ApiError:
+            self._events = None
+        else:
+            self.bind("<Destroy>", self._on_destroy)
+            self._poll_id = self.after(500, self._poll_changes)
+
+    def _on_event(self, _event):
+        self._changed = True
+
+    def _poll_changes(self):
+        if self._changed:
+            self._changed = False
+            self.reload_all()
+        self._poll_id = self.after(500, self._poll_changes)
+
+    def _on_destroy(self, event):
+        if event.widget is self and self._events is not None:
+            self.after_cancel(self._poll_id)
+            self._events.close()
+            self._events = None
+
     def _setup_tree(self, tree, cols):
         for c, title, w in cols:
             tree.heading(c, text=title)
@@ -163,6 +189,12 @@ class DisplayWindow(tk.Toplevel):
         self.refresh_players()
         self.refresh_free_agents()
 
+    def reload_all(self):
+        # explicit refresh: also pick up other clients' changes still in the local cache
+        if isinstance(self.api, CachedCampionatoAPI):
+            self.api.invalidate()
+        self.refresh_all()
+
     def refresh_teams(self):
         try:
             rows = self.api.list_teams()
@@ -513,7 +545,7 @@ class DeleteWindow(tk.Toplevel):
 
 
 def main():
-    api = CampionatoAPI(host="127.0.0.1", port=5000)
+    api = CachedCampionatoAPI(host="127.0.0.1", port=5000)
 
     root = tk.Tk()
     root.title("Campionato Serie A")
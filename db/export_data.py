@@ -0,0 +1,120 @@
+# db/export_data.py
+"""
+Dump of every team and player to CSV (with a header row) or JSONL:
+
+    python db/export_data.py --output campionato.csv
+    python db/export_data.py --format jsonl --port 5000 > campionato.jsonl
+
+One row per player with its team's columns (empty for free agents), plus
+one row for each team without players; columns are ``EXPORT_COLUMNS``.
+Rows come from a single cursor, ``--chunk-size`` at a time, and are written
+as they arrive, so memory use does not grow with the size of the database.
+With ``--port`` the rows are streamed by a running server (``export``
+action) instead of being read from the DB file. Reading the file needs it
+in WAL mode (so the server keeps writing meanwhile); a file still on the
+rollback journal is only converted, permanently, if ``--wal`` is given.
+"""
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Any, Iterator, Sequence, TextIO
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from client.api import EXPORT_COLUMNS, ApiError, CampionatoAPI
+from server import db
+
+DEFAULT_DB = str(Path(__file__).resolve().parent / "campionato.db")
+
+
+def journal_mode(path: str) -> str:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA journal_mode").fetchone()[0].lower()
+    finally:
+        conn.close()
+
+
+def local_rows(path: str, chunk_size: int, convert: bool = False) -> Iterator[Sequence[Any]]:
+    """
+    Rows read from the DB file. Raises ``db.StreamingUnavailable`` right away
+    if the file is not in WAL mode, unless ``convert`` allows switching it.
+    """
+    if not convert and journal_mode(path) != "wal":
+        raise db.StreamingUnavailable(
+            f"{path} non è in modalità WAL: esporta dal server con --port "
+            "oppure convertilo con --wal"
+        )
+    # WAL: the server keeps writing while the export reads
+    db.configure(path, storage_mode="wal")
+    return (row for rows in db.stream_export(chunk_size) for row in rows)
+
+
+def server_rows(host: str, port: int, chunk_size: int) -> Iterator[Sequence[Any]]:
+    with CampionatoAPI(host, port) as api:
+        yield from api.export(chunk_size)
+
+
+def write_rows(rows: Iterator[Sequence[Any]], out: TextIO, fmt: str) -> int:
+    """Write ``rows`` to ``out`` one at a time; returns how many were written."""
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(EXPORT_COLUMNS)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        return count
+    for row in rows:
+        out.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False))
+        out.write("\n")
+        count += 1
+    return count
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Esporta squadre e giocatori in CSV/JSONL")
+    parser.add_argument("--output", help="file di destinazione (default: stdout)")
+    parser.add_argument("--format", choices=("csv", "jsonl"),
+                        help="formato (default: dall'estensione, altrimenti csv)")
+    parser.add_argument("--db", default=DEFAULT_DB, help="database SQLite")
+    parser.add_argument("--wal", action="store_true",
+                        help="converte --db in modalità WAL se non lo è già (permanente)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="legge dal server in ascolto su questa porta")
+    parser.add_argument("--chunk-size", type=int, default=db.STREAM_CHUNK)
+    args = parser.parse_args(argv)
+
+    fmt = args.format
+    if fmt is None:
+        suffix = Path(args.output).suffix.lower() if args.output else ""
+        fmt = "jsonl" if suffix in (".jsonl", ".ndjson", ".json") else "csv"
+
+    if args.port is not None:
+        rows = server_rows(args.host, args.port, args.chunk_size)
+    else:
+        try:
+            rows = local_rows(args.db, args.chunk_size, convert=args.wal)
+        except db.StreamingUnavailable as e:
+            print(f"Esportazione non avviata: {e}", file=sys.stderr)
+            return 1
+
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        count = write_rows(rows, out, fmt)
+    except ApiError as e:
+        print(f"Esportazione interrotta: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"Esportate {count} righe", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+# db/import_data.py
+"""
+Bulk load of teams and players from CSV (with a header row) or JSONL files:
+
+    python db/import_data.py --teams squadre.csv --players giocatori.jsonl
+
+Team columns: nome_club, citta, anno_fondazione, budget.
+Player columns: nome, cognome, ruolo, numero_maglia, gol_segnati (optional),
+squadra (the team's nome_club; empty for a free agent).
+
+Files are read row by row and everything is loaded in one transaction.
+Rejected rows are reported with their reason and skipped.
+"""
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from db.init_db import init_db
+from server import db
+
+DEFAULT_DB = str(Path(__file__).resolve().parent / "campionato.db")
+
+
+def file_format(path: str, fmt: str = None) -> str:
+    if fmt:
+        return fmt
+    return "jsonl" if Path(path).suffix.lower() in (".jsonl", ".ndjson", ".json") else "csv"
+
+
+def read_rows(path: str, fmt: str = None) -> Iterator[Dict[str, Any]]:
+    """Rows of ``path`` one at a time; a JSONL line that is not an object yields ``{}`` (rejected later)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if file_format(path, fmt) == "csv":
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = {}
+            yield row if isinstance(row, dict) else {}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Importa squadre e giocatori da CSV/JSONL")
+    parser.add_argument("--teams", help="file delle squadre")
+    parser.add_argument("--players", help="file dei giocatori")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="formato (default: dall'estensione)")
+    parser.add_argument("--db", default=DEFAULT_DB, help="database SQLite")
+    parser.add_argument("--rejects", help="scrive qui le righe scartate (default: stderr)")
+    parser.add_argument("--chunk-size", type=int, default=db.IMPORT_CHUNK)
+    args = parser.parse_args(argv)
+    if not args.teams and not args.players:
+        parser.error("indica almeno --teams o --players")
+
+    init_db(args.db)
+    db.configure(args.db)
+
+    rejected = 0
+    out = open(args.rejects, "w", encoding="utf-8") if args.rejects else sys.stderr
+
+    def on_reject(kind, numero, row, motivo):
+        nonlocal rejected
+        rejected += 1
+        out.write(f"{kind} riga {numero}: {motivo} {json.dumps(row, ensure_ascii=False)}\n")
+
+    try:
+        teams = read_rows(args.teams, args.format) if args.teams else ()
+        players = read_rows(args.players, args.format) if args.players else ()
+        n_teams, n_players = db.bulk_import(teams, players, on_reject, args.chunk_size)
+    finally:
+        if out is not sys.stderr:
+            out.close()
+
+    print(f"Importate {n_teams} squadre e {n_players} giocatori, {rejected} righe scartate")
+    return 1 if rejected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
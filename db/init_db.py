@@ -29,20 +29,269 @@ CREATE TABLE IF NOT EXISTS giocatori (
 );
 
 CREATE INDEX IF NOT EXISTS idx_giocatori_cognome ON giocatori(cognome);
-CREATE INDEX IF NOT EXISTS idx_giocatori_squadra ON giocatori(id_squadra);
+
+-- indexes matching the list queries in server/db.py (see tests/test_query_plans.py):
+-- each read is answered in ORDER BY order from the index alone, without a sort.
+-- Team list: ORDER BY nome_club, id_squadra.
+CREATE INDEX IF NOT EXISTS idx_squadre_elenco
+  ON squadre(nome_club, id_squadra, citta, anno_fondazione, budget);
+-- A team's roster: WHERE id_squadra = ? ORDER BY cognome, nome, id_giocatore.
+-- Also serves the id_squadra lookup of ON DELETE SET NULL when a team goes,
+-- so it replaces the old idx_giocatori_squadra.
+DROP INDEX IF EXISTS idx_giocatori_squadra;
+CREATE INDEX IF NOT EXISTS idx_giocatori_rosa
+  ON giocatori(id_squadra, cognome, nome, id_giocatore, ruolo, numero_maglia)
+  WHERE id_squadra IS NOT NULL;
+-- Free agents: WHERE id_squadra IS NULL ORDER BY cognome, nome, id_giocatore.
+-- The two partial indexes split giocatori: each row is in exactly one.
+-- (id_squadra is listed so SQLite treats the index as covering.)
+CREATE INDEX IF NOT EXISTS idx_giocatori_svincolati
+  ON giocatori(cognome, nome, id_giocatore, ruolo, numero_maglia, gol_segnati, id_squadra)
+  WHERE id_squadra IS NULL;
+
+-- data versions for conditional reads: 'squadre' (team list),
+-- 'squadra:<id_squadra>' (a roster), 'svincolati' (free agents).
+-- Bumped by the triggers below on every write, whatever the write path.
+CREATE TABLE IF NOT EXISTS versioni (
+  chiave   TEXT PRIMARY KEY,
+  versione INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_versioni_squadre_ins AFTER INSERT ON squadre BEGIN
+  INSERT INTO versioni (chiave, versione) VALUES ('squadre', 1)
+    ON CONFLICT (chiave) DO UPDATE SET versione = versione + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_versioni_squadre_upd AFTER UPDATE ON squadre BEGIN
+  INSERT INTO versioni (chiave, versione) VALUES ('squadre', 1)
+    ON CONFLICT (chiave) DO UPDATE SET versione = versione + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_versioni_squadre_del AFTER DELETE ON squadre BEGIN
+  INSERT INTO versioni (chiave, versione) VALUES ('squadre', 1)
+    ON CONFLICT (chiave) DO UPDATE SET versione = versione + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_versioni_giocatori_ins AFTER INSERT ON giocatori BEGIN
+  INSERT INTO versioni (chiave, versione)
+    VALUES (COALESCE('squadra:' || NEW.id_squadra, 'svincolati'), 1)
+    ON CONFLICT (chiave) DO UPDATE SET versione = versione + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_versioni_giocatori_upd AFTER UPDATE ON giocatori BEGIN
+  INSERT INTO versioni (chiave, versione)
+    VALUES (COALESCE('squadra:' || OLD.id_squadra, 'svincolati'), 1)
+    ON CONFLICT (chiave) DO UPDATE SET versione = versione + 1;
+  INSERT INTO versioni (chiave, versione)
+    SELECT COALESCE('squadra:' || NEW.id_squadra, 'svincolati'), 1
+    WHERE NEW.id_squadra IS NOT OLD.id_squadra
+    ON CONFLICT (chiave) DO UPDATE SET versione = versione + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_versioni_giocatori_del AFTER DELETE ON giocatori BEGIN
+  INSERT INTO versioni (chiave, versione)
+    VALUES (COALESCE('squadra:' || OLD.id_squadra, 'svincolati'), 1)
+    ON CONFLICT (chiave) DO UPDATE SET versione = versione + 1;
+END;
+
+-- change log for incremental sync (changes_since, followers): one row per
+-- inserted/updated/deleted row, in commit order. ``riga`` is the row after
+-- the change as JSON (NULL for deletes); a player update also records the
+-- team before it (id_squadra_prima) and whether that team was just deleted
+-- (squadra_eliminata: the player was released by ON DELETE SET NULL).
+-- Written by the triggers below.
+CREATE TABLE IF NOT EXISTS modifiche (
+  seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+  tabella    TEXT NOT NULL,
+  operazione TEXT NOT NULL,
+  id         INTEGER NOT NULL,
+  riga       TEXT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_modifiche_squadre_ins AFTER INSERT ON squadre BEGIN
+  INSERT INTO modifiche (tabella, operazione, id, riga)
+  VALUES ('squadre', 'insert', NEW.id_squadra,
+          json_object('id_squadra', NEW.id_squadra, 'nome_club', NEW.nome_club, 'citta', NEW.citta,
+                      'anno_fondazione', NEW.anno_fondazione, 'budget', NEW.budget));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_modifiche_squadre_upd AFTER UPDATE ON squadre BEGIN
+  INSERT INTO modifiche (tabella, operazione, id, riga)
+  VALUES ('squadre', 'update', NEW.id_squadra,
+          json_object('id_squadra', NEW.id_squadra, 'nome_club', NEW.nome_club, 'citta', NEW.citta,
+                      'anno_fondazione', NEW.anno_fondazione, 'budget', NEW.budget));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_modifiche_squadre_del AFTER DELETE ON squadre BEGIN
+  INSERT INTO modifiche (tabella, operazione, id, riga)
+  VALUES ('squadre', 'delete', OLD.id_squadra,
+          NULL);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_modifiche_giocatori_ins AFTER INSERT ON giocatori BEGIN
+  INSERT INTO modifiche (tabella, operazione, id, riga)
+  VALUES ('giocatori', 'insert', NEW.id_giocatore,
+          json_object('id_giocatore', NEW.id_giocatore, 'nome', NEW.nome, 'cognome', NEW.cognome,
+                      'ruolo', NEW.ruolo, 'numero_maglia', NEW.numero_maglia,
+                      'gol_segnati', NEW.gol_segnati, 'id_squadra', NEW.id_squadra));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_modifiche_giocatori_upd AFTER UPDATE ON giocatori BEGIN
+  INSERT INTO modifiche (tabella, operazione, id, riga)
+  VALUES ('giocatori', 'update', NEW.id_giocatore,
+          json_object('id_giocatore', NEW.id_giocatore, 'nome', NEW.nome, 'cognome', NEW.cognome,
+                      'ruolo', NEW.ruolo, 'numero_maglia', NEW.numero_maglia,
+                      'gol_segnati', NEW.gol_segnati, 'id_squadra', NEW.id_squadra,
+                      'id_squadra_prima', OLD.id_squadra,
+                      'squadra_eliminata', json(CASE WHEN OLD.id_squadra IS NOT NULL AND NOT EXISTS (
+                        SELECT 1 FROM squadre WHERE id_squadra = OLD.id_squadra) THEN 'true' ELSE 'false' END)));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_modifiche_giocatori_del AFTER DELETE ON giocatori BEGIN
+  INSERT INTO modifiche (tabella, operazione, id, riga)
+  VALUES ('giocatori', 'delete', OLD.id_giocatore,
+          NULL);
+END;
+
+-- notifications to send (server/outbox.py), written in the same transaction
+-- as the change they report; times are unix seconds
+CREATE TABLE IF NOT EXISTS email_outbox (
+  id                 INTEGER PRIMARY KEY AUTOINCREMENT,
+  tipo               TEXT NOT NULL,
+  dati               TEXT NOT NULL,
+  stato              TEXT NOT NULL DEFAULT 'in_attesa',  -- in_attesa | inviata | fallita
+  tentativi          INTEGER NOT NULL DEFAULT 0,
+  prossimo_tentativo REAL NOT NULL,
+  ultimo_errore      TEXT NULL,
+  creata             REAL NOT NULL,
+  inviata            REAL NULL
+);
+-- claim_emails() reads the due rows of 'in_attesa' in prossimo_tentativo order,
+-- outbox_stats() counts per stato from the index alone
+CREATE INDEX IF NOT EXISTS idx_email_outbox_stato
+  ON email_outbox(stato, prossimo_tentativo);
+
+-- on a follower (server/follower.py): last primary change applied here
+CREATE TABLE IF NOT EXISTS replica (
+  chiave TEXT PRIMARY KEY,
+  valore INTEGER NOT NULL
+) WITHOUT ROWID;
+
+-- databases created before the log: record the existing rows as inserts
+INSERT INTO modifiche (tabella, operazione, id, riga)
+  SELECT 'squadre', 'insert', id_squadra,
+         json_object('id_squadra', s.id_squadra, 'nome_club', s.nome_club, 'citta', s.citta,
+                     'anno_fondazione', s.anno_fondazione, 'budget', s.budget)
+  FROM squadre s
+  WHERE NOT EXISTS (SELECT 1 FROM modifiche WHERE tabella = 'squadre')
+  ORDER BY id_squadra;
+
+INSERT INTO modifiche (tabella, operazione, id, riga)
+  SELECT 'giocatori', 'insert', id_giocatore,
+         json_object('id_giocatore', g.id_giocatore, 'nome', g.nome, 'cognome', g.cognome,
+                     'ruolo', g.ruolo, 'numero_maglia', g.numero_maglia,
+                     'gol_segnati', g.gol_segnati, 'id_squadra', g.id_squadra)
+  FROM giocatori g
+  WHERE NOT EXISTS (SELECT 1 FROM modifiche WHERE tabella = 'giocatori')
+  ORDER BY id_giocatore;
 """
 
+# full-text search over players and teams (server/db.py: search), only where
+# SQLite has FTS5. One row per player (rowid = id_giocatore) and one per team
+# (rowid = -id_squadra), kept in sync by the triggers. squadra holds the name
+# on team rows; nome_club is the club on both (a player's team).
+SEARCH_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS ricerca USING fts5(
+  nome, cognome, squadra, ruolo, nome_club,
+  tokenize = 'unicode61 remove_diacritics 2',
+  prefix = '2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_ricerca_squadre_ins AFTER INSERT ON squadre BEGIN
+  INSERT INTO ricerca (rowid, squadra, nome_club) VALUES (-NEW.id_squadra, NEW.nome_club, NEW.nome_club);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ricerca_squadre_upd
+AFTER UPDATE OF id_squadra, nome_club ON squadre BEGIN
+  DELETE FROM ricerca WHERE rowid = -OLD.id_squadra;
+  INSERT INTO ricerca (rowid, squadra, nome_club) VALUES (-NEW.id_squadra, NEW.nome_club, NEW.nome_club);
+  UPDATE ricerca SET nome_club = NEW.nome_club
+    WHERE rowid IN (SELECT id_giocatore FROM giocatori WHERE id_squadra = NEW.id_squadra);
+END;
+
+-- its players are released by ON DELETE SET NULL, which fires trg_ricerca_giocatori_upd
+CREATE TRIGGER IF NOT EXISTS trg_ricerca_squadre_del AFTER DELETE ON squadre BEGIN
+  DELETE FROM ricerca WHERE rowid = -OLD.id_squadra;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ricerca_giocatori_ins AFTER INSERT ON giocatori BEGIN
+  INSERT INTO ricerca (rowid, nome, cognome, ruolo, nome_club)
+    VALUES (NEW.id_giocatore, NEW.nome, NEW.cognome, NEW.ruolo,
+            (SELECT nome_club FROM squadre WHERE id_squadra = NEW.id_squadra));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ricerca_giocatori_upd
+AFTER UPDATE OF id_giocatore, nome, cognome, ruolo, id_squadra ON giocatori BEGIN
+  DELETE FROM ricerca WHERE rowid = OLD.id_giocatore;
+  INSERT INTO ricerca (rowid, nome, cognome, ruolo, nome_club)
+    VALUES (NEW.id_giocatore, NEW.nome, NEW.cognome, NEW.ruolo,
+            (SELECT nome_club FROM squadre WHERE id_squadra = NEW.id_squadra));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_ricerca_giocatori_del AFTER DELETE ON giocatori BEGIN
+  DELETE FROM ricerca WHERE rowid = OLD.id_giocatore;
+END;
+"""
+
+# search ranking: bm25 weights of nome, cognome, squadra, ruolo, nome_club
+SEARCH_RANK = "bm25(2.0, 4.0, 2.0, 1.0, 1.0)"
+
+
 def init_db(db_path: str) -> None:
     Path(db_path).parent.mkdir(parents=True, exist_ok=True)
     with sqlite3.connect(db_path) as conn:
         conn.execute("PRAGMA foreign_keys = ON;")
+        ensure_gol_segnati_column(conn)  # the change log reads it
         conn.executescript(SCHEMA_SQL)
+        ensure_search_index(conn)
+        conn.commit()
+
+def fts5_available(conn: sqlite3.Connection) -> bool:
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+    except sqlite3.OperationalError:
+        return False
+    conn.execute("DROP TABLE temp.fts5_probe")
+    return True
+
+def ensure_search_index(conn: sqlite3.Connection) -> bool:
+    """Create (and fill, the first time) the ``ricerca`` index; False without FTS5."""
+    if not fts5_available(conn):
+        return False
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ricerca'"
+    ).fetchone()
+    conn.executescript(SEARCH_SQL)
+    if row is None:
+        # databases created before the index
+        conn.execute("INSERT INTO ricerca (ricerca, rank) VALUES ('rank', ?)", (SEARCH_RANK,))
+        conn.execute(
+            "INSERT INTO ricerca (rowid, squadra, nome_club) SELECT -id_squadra, nome_club, nome_club FROM squadre"
+        )
+        conn.execute(
+            """
+            INSERT INTO ricerca (rowid, nome, cognome, ruolo, nome_club)
+            SELECT g.id_giocatore, g.nome, g.cognome, g.ruolo, s.nome_club
+            FROM giocatori g LEFT JOIN squadre s ON s.id_squadra = g.id_squadra
+            """
+        )
         conn.commit()
+    return True
 
 def ensure_gol_segnati_column(conn: sqlite3.Connection) -> None:
     cur = conn.execute("PRAGMA table_info(giocatori)")
     cols = {row[1] for row in cur.fetchall()}  # row[1] = name
-    if "gol_segnati" not in cols:
+    if cols and "gol_segnati" not in cols:
         conn.execute("ALTER TABLE giocatori ADD COLUMN gol_segnati INTEGER NOT NULL DEFAULT 0")
         conn.commit()
 
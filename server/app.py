@@ -4,27 +4,141 @@ from datetime import date
 
 load_dotenv(Path(__file__).resolve().parents[1] / ".env")
 current_year = date.today().year
-ALLOWED_ROLES = {"Portiere", "Difensore", "Centrocampista", "Attaccante"}
 
+import argparse
+import asyncio
+import json
 import socket
 import threading
-from typing import Dict, Any
-from .email import send_delete_team_email
+from typing import Dict, Any, Callable, Iterable, Iterator, Optional, Sequence
 from . import db
-from .protocol import encode_message, decode_message
+from .cache import ResponseCache
+from .events import EventBus, Subscription, AsyncSubscription
+from .outbox import OutboxWorker
+from .pool import WorkerPool, Overloaded
+from .protocol import encode_message, decode_message, with_field
+from db.init_db import init_db
+
+ALLOWED_ROLES = db.ROLES
 
 HOST = "127.0.0.1"
 PORT = 5000
+DB_WORKERS = 16
+# requests waiting for a DB worker before new ones are rejected with OVERLOADED
+QUEUE_SIZE = 256
+# max length of a single request line accepted by the asyncio server
+MAX_LINE = 16 * 1024 * 1024
+CACHE_ENTRIES = 1024
+
+# read actions whose encoded responses are cached until a mutation touches them
+CACHEABLE_ACTIONS = {"list_teams", "list_players_by_team", "list_free_agents"}
+response_cache = ResponseCache(CACHE_ENTRIES)
+# actions that never write: a batch made only of these runs in db.snapshot()
+READ_ACTIONS = CACHEABLE_ACTIONS | {"search", "changes_since", "cache_stats", "replica_status"}
+# sends the notifications queued in email_outbox; started by serve()
+outbox = OutboxWorker()
+
+# actions this process answers; None = all. A follower restricts it to reads.
+allowed_actions: Optional[set] = None
+
+# cache tags: every cached response is dropped when one of its tags is invalidated
+TEAMS_TAG = ("teams",)
+FREE_AGENTS_TAG = ("free_agents",)
+
+
+def roster_tag(id_squadra: Optional[Any]) -> tuple:
+    return FREE_AGENTS_TAG if id_squadra is None else ("roster", int(id_squadra))
+
+
+def player_tag(id_giocatore: Any) -> tuple:
+    return ("player", int(id_giocatore))
+
+
+def invalidate(*tags: tuple) -> None:
+    # after the commit, so no reader can cache the old rows again in between
+    db.after_commit(lambda: response_cache.invalidate(*tags))
+
+
+def change_tags(changes: Sequence[Sequence]) -> set:
+    """Cache tags made stale by ``changes`` (rows of ``db.changes_since``)."""
+    tags = set()
+    for _, tabella, operazione, id_, riga in changes:
+        if tabella == "squadre":
+            tags.add(TEAMS_TAG)
+            if operazione == "delete":
+                tags.add(roster_tag(id_))
+        else:
+            # lists already holding the player carry its tag; the new
+            # roster does not hold it yet
+            tags.add(player_tag(id_))
+            if riga is not None:
+                tags.add(roster_tag(riga["id_squadra"]))
+    return tags
+
+
+# change events pushed to the connections that sent "subscribe"
+events = EventBus()
+# seconds between heartbeat frames on an idle subscription (detects dead peers)
+HEARTBEAT = 15.0
+
+# False when a ChangeRelay (server/launcher.py) publishes every change from
+# the change log instead, so events made in other processes are seen too
+local_events = True
+
+
+def notify(event_type: str, **ids: Any) -> None:
+    if local_events:
+        db.after_commit(lambda: events.publish({"type": event_type, **ids}))
+
+
+def player_cursor(row) -> list:
+    return [row[2], row[1], row[0]]  # cognome, nome, id_giocatore
+
+
+def page(rows, data: Dict[str, Any], cursor, version: int) -> Dict[str, Any]:
+    """
+    List response with the ``version`` of the listed data; with ``limit`` it
+    also carries the ``next`` cursor (null on the last page).
+    """
+    resp = {"ok": True, "data": rows, "version": version}
+    if data.get("limit") is not None:
+        full = len(rows) == int(data["limit"])
+        resp["next"] = cursor(rows[-1]) if full and rows else None
+    return resp
+
+
+def list_version(action: str, data: Dict[str, Any]) -> int:
+    """Data version a list action reads; any write to that data bumps it."""
+    if action == "list_teams":
+        return db.get_version(db.TEAMS_VERSION)
+    if action == "list_players_by_team":
+        return db.get_version(db.roster_version(int(data["id_squadra"])))
+    return db.get_version(db.FREE_AGENTS_VERSION)
+
+
+def not_modified(version: int) -> Dict[str, Any]:
+    return {"ok": True, "not_modified": True, "version": version}
 
 
 def handle_request(req: Dict[str, Any]) -> Dict[str, Any]:
     action = req.get("action")
     data = req.get("data", {})
 
+    if allowed_actions is not None and action not in allowed_actions:
+        return {"ok": False, "error": {"code": "READ_ONLY",
+                                       "message": f"Azione non disponibile su questo server: {action}"}}
+
     try:
+        if action in CACHEABLE_ACTIONS:
+            # read before the rows: a write in between makes the version
+            # older than the data, so the client just refetches next time
+            version = list_version(action, data)
+            if data.get("if_version") == version:
+                return not_modified(version)
+
         if action == "list_teams":
-            teams = db.list_teams()
-            return {"ok": True, "data": teams}
+            teams = db.list_teams(data.get("limit"), data.get("after"))
+            return page(teams, data, lambda r: [r[1], r[0]], version)
 
         if action == "create_team":
             anno = int(data["anno_fondazione"])
@@ -41,11 +155,13 @@ def handle_request(req: Dict[str, Any]) -> Dict[str, Any]:
                 anno,
                 float(data["budget"]),
             )
+            invalidate(TEAMS_TAG)
+            notify("team_created", id_squadra=team_id)
             return {"ok": True, "data": {"id_squadra": team_id}}
 
         if action == "list_players_by_team":
-            players = db.list_players_by_team(int(data["id_squadra"]))
-            return {"ok": True, "data": players}
+            players = db.list_players_by_team(int(data["id_squadra"]), data.get("limit"), data.get("after"))
+            return page(players, data, player_cursor, version)
         
         if action == "create_player":
             ruolo = data["ruolo"].strip()
@@ -59,6 +175,8 @@ def handle_request(req: Dict[str, Any]) -> Dict[str, Any]:
                 int(data["numero_maglia"]),
                 data.get("id_squadra"),
             )
+            invalidate(roster_tag(data.get("id_squadra")))
+            notify("player_created", id_giocatore=pid, id_squadra=data.get("id_squadra"))
             return {"ok": True, "data": {"id_giocatore": pid}}
 
 
@@ -67,92 +185,569 @@ def handle_request(req: Dict[str, Any]) -> Dict[str, Any]:
             if ruolo not in ALLOWED_ROLES:
                 return {"ok": False, "error": {"code": "BAD_REQUEST", "message": "Ruolo non valido"}}
 
-            db.update_player(
-                int(data["id_giocatore"]),
+            pid = int(data["id_giocatore"])
+            team_id = db.update_player(
+                pid,
                 data["nome"],
                 data["cognome"],
                 ruolo,
                 int(data["numero_maglia"]),
             )
+            # the new name may move the player into another cached page
+            invalidate(roster_tag(team_id), player_tag(pid))
+            notify("player_updated", id_giocatore=pid, id_squadra=team_id)
             return {"ok": True, "data": {}}
 
 
         if action == "transfer_player":
-            db.transfer_player(int(data["id_giocatore"]), data.get("id_squadra"))
+            pid = int(data["id_giocatore"])
+            db.transfer_player(pid, data.get("id_squadra"))
+            # player_tag drops every cached list the player was in (the old team)
+            invalidate(roster_tag(data.get("id_squadra")), player_tag(pid))
+            notify("player_transferred", id_giocatore=pid, id_squadra=data.get("id_squadra"))
             return {"ok": True, "data": {}}
 
         if action == "delete_player":
-            db.delete_player(int(data["id_giocatore"]))
+            pid = int(data["id_giocatore"])
+            team_id = db.delete_player(pid)
+            invalidate(roster_tag(team_id), player_tag(pid))
+            notify("player_deleted", id_giocatore=pid, id_squadra=team_id)
             return {"ok": True, "data": {}}
 
         if action == "delete_team":
             team_id = int(data["id_squadra"])
 
-            # get name before deletion
-            team = db.get_team_by_id(team_id)
-            team_name = team[1]  # nome_club
-            # delete (svincolo is inside db.delete_team)
-            db.delete_team(team_id)
-
-            # email notification
-            try:
-                send_delete_team_email(team_name, team_id)
-            except Exception:
-                pass
+            with db.transaction():
+                # delete (svincolo is inside db.delete_team), returns nome_club
+                team_name = db.delete_team(team_id)
+                # the email is queued with the delete and sent by the outbox worker
+                db.enqueue_email("team_deleted", {"team_name": team_name, "team_id": team_id})
+                invalidate(TEAMS_TAG, roster_tag(team_id), FREE_AGENTS_TAG)
+                notify("team_deleted", id_squadra=team_id)
+                db.after_commit(outbox.wake)
             return {"ok": True, "data": {}}
 
         
         if action == "list_free_agents":
-            players = db.list_free_agents()
-            return {"ok": True, "data": players}
+            players = db.list_free_agents(data.get("limit"), data.get("after"))
+            return page(players, data, player_cursor, version)
+
+        if action == "search":
+            return {"ok": True, "data": db.search(data["q"], data.get("limit", db.SEARCH_LIMIT),
+                                                  data.get("fields"))}
+
+        if action == "changes_since":
+            # never the whole log in one reply: no limit means the default page
+            limit = data.get("limit")
+            limit = db.CHANGES_PAGE if limit is None else min(int(limit), db.CHANGES_MAX_PAGE)
+            changes, last = db.changes_since(int(data.get("seq", 0)), limit)
+            full = len(changes) == limit
+            return {"ok": True, "data": changes, "last_seq": last,
+                    "next": changes[-1][0] if full and changes else None}
+
+        if action == "export":
+            raise ValueError("export va richiesto in streaming (\"stream\": true, server con --storage wal)")
+
+        if action == "batch":
+            return handle_batch(data["requests"], bool(data.get("atomic", False)))
+
+        if action == "cache_stats":
+            return {"ok": True, "data": response_cache.stats()}
+
+        if action == "replica_status":
+            return {"ok": True, "data": replica_status()}
 
         return {
             "ok": False,
             "error": {"code": "UNKNOWN_ACTION", "message": f"Unknown action: {action}"}
         }
 
-    except KeyError as e:
+    except Exception as e:
+        return error_response(e)
+
+
+def error_response(e: Exception) -> Dict[str, Any]:
+    if isinstance(e, Overloaded):
+        return overloaded_response(e)
+    if isinstance(e, db.StreamingUnavailable):
+        return {"ok": False, "error": {"code": "STREAMING_UNAVAILABLE", "message": str(e)}}
+    if isinstance(e, KeyError):
         return {
             "ok": False,
             "error": {"code": "BAD_REQUEST", "message": f"Missing field: {e}"}
         }
-    except ValueError as e:
+    if isinstance(e, ValueError):
         return {
             "ok": False,
             "error": {"code": "BAD_REQUEST", "message": str(e)}
         }
-    except Exception as e:
+    return {
+        "ok": False,
+        "error": {"code": "SERVER_ERROR", "message": str(e)}
+    }
+
+
+class _Unstreamable(Exception):
+    pass
+
+
+def row_stream(action: Any, data: Dict[str, Any]) -> Iterator[list]:
+    chunk_size = int(data.get("chunk_size", db.STREAM_CHUNK))
+    if action == "list_teams":
+        return db.stream_teams(chunk_size)
+    if action == "list_players_by_team":
+        return db.stream_players_by_team(int(data["id_squadra"]), chunk_size)
+    if action == "list_free_agents":
+        return db.stream_free_agents(chunk_size)
+    if action == "export":
+        return db.stream_export(chunk_size)
+    raise _Unstreamable(action)
+
+
+def stream_response(req: Dict[str, Any], send: Callable[[bytes], None]) -> None:
+    """
+    Streaming mode (``"stream": true``): the rows are written as a sequence
+    of ``{"ok": true, "rows": [...]}`` frames read with ``fetchmany``, closed
+    by ``{"ok": true, "done": true, "count": N}``. An error ends the stream
+    with a normal error frame. ``send`` blocks while the client is slow, so
+    neither side ever holds the whole result. Needs ``--storage wal``, the
+    default (see ``db._stream``); with ``lock`` the reply is STREAMING_UNAVAILABLE.
+    """
+    def frame(obj: Dict[str, Any]) -> bytes:
+        return encode_message(with_id(req, obj))
+
+    count = 0
+    try:
+        if allowed_actions is not None and req.get("action") not in allowed_actions:
+            send(frame(handle_request(req)))  # the READ_ONLY error
+            return
+        try:
+            for rows in row_stream(req.get("action"), req.get("data", {})):
+                count += len(rows)
+                send(frame({"ok": True, "rows": rows}))
+        except OSError:
+            raise
+        except _Unstreamable as e:
+            send(frame({"ok": False, "error": {"code": "UNKNOWN_ACTION",
+                                               "message": f"Action not streamable: {e}"}}))
+            return
+        except Exception as e:
+            send(frame(error_response(e)))
+            return
+        send(frame({"ok": True, "done": True, "count": count}))
+    except OSError:
+        pass  # client went away
+
+
+class _ItemFailed(Exception):
+    def __init__(self, index: int, resp: Dict[str, Any]):
+        super().__init__(index)
+        self.index = index
+        self.resp = resp
+
+
+def handle_batch(requests: Any, atomic: bool) -> Dict[str, Any]:
+    """
+    Run a list of sub-requests in one SQLite transaction.
+
+    Every item gets its own result. A failing item is rolled back on its own;
+    with ``atomic`` the first failure rolls back the whole batch instead.
+    A batch of reads only runs in a read transaction, without the write lock.
+    """
+    if not isinstance(requests, list):
+        raise ValueError("requests deve essere una lista")
+
+    read_only = all(isinstance(sub, dict) and sub.get("action") in READ_ACTIONS for sub in requests)
+    results = []
+    try:
+        with db.snapshot() if read_only else db.transaction():
+            for i, sub in enumerate(requests):
+                if not isinstance(sub, dict) or sub.get("action") == "batch":
+                    resp = {"ok": False,
+                            "error": {"code": "BAD_REQUEST", "message": "Sotto-richiesta non valida"}}
+                else:
+                    try:
+                        with db.savepoint():
+                            resp = handle_request(sub)
+                            if not resp.get("ok"):
+                                raise _ItemFailed(i, resp)
+                    except _ItemFailed:
+                        if atomic:
+                            raise
+                results.append(resp)
+                if atomic and not resp.get("ok"):
+                    raise _ItemFailed(i, resp)
+    except _ItemFailed as e:
+        err = e.resp["error"]
         return {
             "ok": False,
-            "error": {"code": "SERVER_ERROR", "message": str(e)}
+            "error": {"code": err["code"],
+                      "message": f"Operazione {e.index} fallita, batch annullato: {err['message']}",
+                      "index": e.index},
         }
+    return {"ok": True, "data": results}
 
 
-def client_thread(conn: socket.socket, addr):
-    with conn:
-        file = conn.makefile("rb")
-        for line in file:
+def overloaded_response(e: Overloaded) -> Dict[str, Any]:
+    return {"ok": False, "error": {"code": "OVERLOADED", "message": str(e)}}
+
+
+def with_id(req: Any, resp: Dict[str, Any]) -> Dict[str, Any]:
+    # echo the optional request id so pipelined replies can be matched
+    if isinstance(req, dict) and "id" in req:
+        resp["id"] = req["id"]
+    return resp
+
+
+def cache_tags(req: Dict[str, Any], resp: Dict[str, Any]) -> Iterable[tuple]:
+    action = req["action"]
+    if action == "list_teams":
+        return [TEAMS_TAG]
+    if action == "list_players_by_team":
+        base = roster_tag(req["data"]["id_squadra"])
+    else:
+        base = FREE_AGENTS_TAG
+    return [base] + [player_tag(row[0]) for row in resp["data"]]
+
+
+def respond(req: Any) -> bytes:
+    """Encoded response line for ``req``, served from ``response_cache`` when possible."""
+    if not isinstance(req, dict):
+        return encode_message(
+            {"ok": False, "error": {"code": "BAD_REQUEST", "message": "Request must be an object"}}
+        )
+
+    if req.get("action") in CACHEABLE_ACTIONS:
+        data = req.get("data", {})
+        # one versioni lookup: also catches writes made outside this process
+        version = current_version(req["action"], data) if isinstance(data, dict) else None
+        if isinstance(data, dict) and data.get("if_version") is not None:
+            if version == data["if_version"]:
+                return finish(req, encode_message(not_modified(version)))
+            data = {k: v for k, v in data.items() if k != "if_version"}
+            req = {**req, "data": data}
+        key = (req["action"], json.dumps(data, sort_keys=True))
+        payload = response_cache.get(key, version)
+        if payload is None:
+            generation = response_cache.generation
+            resp = handle_request(req)
+            payload = encode_message(resp)
+            if resp.get("ok"):
+                response_cache.put(key, payload, cache_tags(req, resp), generation, resp["version"])
+    else:
+        payload = encode_message(handle_request(req))
+    return finish(req, payload)
+
+
+def current_version(action: str, data: Dict[str, Any]) -> Optional[int]:
+    """``list_version``, or None when ``data`` is invalid (handle_request reports why)."""
+    try:
+        return list_version(action, data)
+    except Exception:
+        return None
+
+
+def finish(req: Dict[str, Any], payload: bytes) -> bytes:
+    if "id" in req:
+        payload = with_field(payload, "id", req["id"])
+    return payload
+
+
+def is_streaming(req: Any) -> bool:
+    return isinstance(req, dict) and bool(req.get("stream"))
+
+
+def is_subscribe(req: Any) -> bool:
+    # where subscribe is not allowed it goes to handle_request and is refused
+    return (isinstance(req, dict) and req.get("action") == "subscribe"
+            and (allowed_actions is None or "subscribe" in allowed_actions))
+
+
+def primary_status() -> Dict[str, Any]:
+    return {"role": "primary", "last_seq": db.last_seq()}
+
+
+# answers ``replica_status``; a follower replaces it with its own
+replica_status: Callable[[], Dict[str, Any]] = primary_status
+
+
+def subscribe_types(req: Dict[str, Any]) -> Optional[list]:
+    types = req.get("data", {}).get("types")
+    if types is not None and not isinstance(types, list):
+        raise ValueError("types deve essere una lista")
+    return types
+
+
+def subscriber_lagging() -> bytes:
+    return encode_message({"ok": False, "error": {"code": "OVERLOADED",
+                                                  "message": "Subscriber too slow, events dropped"}})
+
+
+def push_events(send: Callable[[bytes], None], req: Dict[str, Any]) -> None:
+    """
+    Turn a thread-per-connection socket into an event feed: after the
+    ``subscribe`` reply every committed change is sent as ``{"event": {...}}``
+    until the client disconnects or falls too far behind.
+    """
+    try:
+        sub = Subscription(events, subscribe_types(req))
+    except ValueError as e:
+        send(encode_message(with_id(req, error_response(e))))
+        return
+    try:
+        send(encode_message(with_id(req, {"ok": True, "data": {"subscribed": True}})))
+        while not sub.overflowed:
+            event = sub.get(timeout=HEARTBEAT)
+            send(encode_message({"event": event or {"type": "heartbeat"}}))
+        send(subscriber_lagging())
+    except OSError:
+        pass
+    finally:
+        sub.close()
+
+
+def is_pipelined(req: Any) -> bool:
+    """
+    Requests carrying an ``id`` may run concurrently and be answered out of
+    order; requests without one keep the old strict request/response order.
+    """
+    return isinstance(req, dict) and "id" in req
+
+
+def client_thread(conn: socket.socket, addr, pool: WorkerPool):
+    send_lock = threading.Lock()
+    in_flight = set()
+
+    def send(payload: bytes) -> None:
+        with send_lock:
+            conn.sendall(payload)
+
+    def on_done(fut):
+        in_flight.discard(fut)
+        payload = fut.result()
+        if payload is not None:  # streams have already sent their frames
             try:
-                req = decode_message(line)
-            except Exception:
-                resp = {"ok": False, "error": {"code": "BAD_JSON", "message": "Invalid JSON"}}
-            else:
-                resp = handle_request(req)
+                send(payload)
+            except OSError:
+                pass
+
+    with conn:
+        try:
+            file = conn.makefile("rb")
+            for line in file:
+                try:
+                    req = decode_message(line)
+                except Exception:
+                    send(encode_message({"ok": False, "error": {"code": "BAD_JSON", "message": "Invalid JSON"}}))
+                    continue
+
+                if is_subscribe(req):
+                    push_events(send, req)
+                    break
+
+                try:
+                    if is_streaming(req):
+                        fut = pool.submit(stream_response, req, send)
+                    else:
+                        fut = pool.submit(respond, req)
+                except Overloaded as e:
+                    send(encode_message(with_id(req, overloaded_response(e))))
+                    continue
+
+                if is_pipelined(req):
+                    in_flight.add(fut)
+                    fut.add_done_callback(on_done)
+                else:
+                    payload = fut.result()
+                    if payload is not None:
+                        send(payload)
+        except OSError:
+            pass
 
-            conn.sendall(encode_message(resp))
+        # let pipelined requests finish before the socket is closed
+        for fut in list(in_flight):
+            fut.exception()
 
 
-def main():
+def serve_threads(host: str = HOST, port: int = PORT, pool: WorkerPool = None,
+                  reuse_port: bool = False):
+    pool = pool or WorkerPool(DB_WORKERS, QUEUE_SIZE, name="db")
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        s.bind((HOST, PORT))
+        if reuse_port:
+            # several processes bind the same port; the kernel spreads connections
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        s.bind((host, port))
         s.listen()
-        print(f"Server listening on {HOST}:{PORT}")
+        print(f"Server listening on {host}:{port}")
 
         while True:
             conn, addr = s.accept()
-            t = threading.Thread(target=client_thread, args=(conn, addr), daemon=True)
+            t = threading.Thread(target=client_thread, args=(conn, addr, pool), daemon=True)
             t.start()
 
+
+# -------- ASYNCIO --------
+
+async def client_coroutine(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                           pool: WorkerPool):
+    """
+    Same protocol as ``client_thread``, but an idle connection only costs a
+    coroutine: the blocking DB work runs in the shared ``pool``.
+    """
+    loop = asyncio.get_running_loop()
+    in_flight = set()
+
+    async def write(payload: bytes) -> None:
+        writer.write(payload)
+        await writer.drain()
+
+    def send_from_worker(payload: bytes) -> None:
+        # called by a pool thread while streaming; waits for drain() (backpressure)
+        asyncio.run_coroutine_threadsafe(write(payload), loop).result()
+
+    async def reply(req):
+        try:
+            if is_streaming(req):
+                await asyncio.wrap_future(pool.submit(stream_response, req, send_from_worker))
+                return
+            payload = await asyncio.wrap_future(pool.submit(respond, req))
+        except Overloaded as e:
+            payload = encode_message(with_id(req, overloaded_response(e)))
+        await write(payload)
+
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except (ValueError, asyncio.LimitOverrunError):
+                # line longer than MAX_LINE: the stream can't be resynchronised
+                writer.write(encode_message(
+                    {"ok": False, "error": {"code": "BAD_REQUEST", "message": "Request too large"}}
+                ))
+                break
+            if not line:
+                break
+            try:
+                req = decode_message(line)
+            except Exception:
+                writer.write(encode_message(
+                    {"ok": False, "error": {"code": "BAD_JSON", "message": "Invalid JSON"}}
+                ))
+                await writer.drain()
+                continue
+
+            if is_subscribe(req):
+                await push_events_async(write, req)
+                break
+
+            if is_pipelined(req):
+                task = asyncio.create_task(reply(req))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+            else:
+                await reply(req)
+
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        for task in in_flight:
+            task.cancel()
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def push_events_async(write: Callable, req: Dict[str, Any]) -> None:
+    """``push_events`` for a connection served by the asyncio loop."""
+    try:
+        sub = AsyncSubscription(events, subscribe_types(req))
+    except ValueError as e:
+        await write(encode_message(with_id(req, error_response(e))))
+        return
+    try:
+        await write(encode_message(with_id(req, {"ok": True, "data": {"subscribed": True}})))
+        while not sub.overflowed:
+            event = await sub.get(timeout=HEARTBEAT)
+            await write(encode_message({"event": event or {"type": "heartbeat"}}))
+        await write(subscriber_lagging())
+    finally:
+        sub.close()
+
+
+async def serve_asyncio(host: str = HOST, port: int = PORT, pool: WorkerPool = None,
+                        reuse_port: bool = False):
+    pool = pool or WorkerPool(DB_WORKERS, QUEUE_SIZE, name="db")
+
+    async def on_connect(reader, writer):
+        await client_coroutine(reader, writer, pool)
+
+    server = await asyncio.start_server(on_connect, host, port, limit=MAX_LINE,
+                                        reuse_port=reuse_port or None)
+    print(f"Server (asyncio) listening on {host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        pool.shutdown()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Server Campionato Serie A")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--mode", choices=("threads", "asyncio"), default="threads",
+                        help="threads: un thread per connessione; asyncio: event loop + pool DB")
+    parser.add_argument("--workers", type=int, default=DB_WORKERS,
+                        help="thread che eseguono le richieste sul DB")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE,
+                        help="richieste in attesa oltre le quali si risponde OVERLOADED")
+    parser.add_argument("--pool-size", type=int, default=db.POOL_SIZE,
+                        help="connessioni SQLite tenute aperte e riusate")
+    parser.add_argument("--storage", choices=db.STORAGE_MODES, default="wal",
+                        help="wal (default): WAL + BEGIN IMMEDIATE, letture concorrenti, più "
+                             "processi sullo stesso DB, streaming ed export; il file resta in WAL. "
+                             "lock: giornale di rollback, scritture serializzate nel processo, "
+                             "niente streaming (risponde STREAMING_UNAVAILABLE)")
+    parser.add_argument("--group-commit", action="store_true",
+                        help="un solo thread scrittore che committa le modifiche a gruppi")
+    parser.add_argument("--group-max-batch", type=int, default=64,
+                        help="modifiche massime per commit (con --group-commit)")
+    parser.add_argument("--group-max-wait", type=float, default=2.0,
+                        help="ms di attesa massima per riempire un gruppo (con --group-commit)")
+    parser.add_argument("--cache-entries", type=int, default=CACHE_ENTRIES,
+                        help="risposte di lettura tenute in cache (0 = cache disattivata)")
+    parser.add_argument("--email-digest", type=float, default=None, metavar="SECONDI",
+                        help="unisce in una sola email le notifiche arrivate entro questa finestra")
+    return parser
+
+
+def serve(args: argparse.Namespace, reuse_port: bool = False) -> None:
+    """Configure this process from the parsed options and serve until interrupted."""
+    response_cache.max_entries = args.cache_entries
+    db.configure(pool_size=args.pool_size, storage_mode=args.storage)
+    if args.group_commit:
+        db.start_group_commit(args.group_max_batch, args.group_max_wait / 1000)
+    outbox.digest_window = args.email_digest
+    outbox.start()
+    pool = WorkerPool(args.workers, args.queue_size, name="db")
+    if args.mode == "asyncio":
+        try:
+            asyncio.run(serve_asyncio(args.host, args.port, pool, reuse_port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        serve_threads(args.host, args.port, pool, reuse_port)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    init_db(db._DB_PATH)  # creates tables/triggers added since the DB was made
+    serve(args)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set
+
+
+class ResponseCache:
+    """
+    LRU cache of already-encoded responses for read actions.
+
+    Every entry carries a set of tags (e.g. ``("roster", 3)``); mutations call
+    ``invalidate`` with the tags they affect and every entry holding one of
+    them is dropped. ``generation`` is bumped on each invalidation so a read
+    that started before a write cannot store its (stale) result after it.
+
+    An entry can also carry the data ``version`` it was built from; ``get``
+    with the current version drops it if they differ. This catches writes
+    that never call ``invalidate`` here (other processes, the import CLI,
+    direct SQL).
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.generation = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._by_tag: Dict[Hashable, Set[Hashable]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = self.stale = 0
+
+    def get(self, key: Hashable, version: Optional[int] = None) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and version is not None and entry[2] != version:
+                self._drop(key)
+                self.stale += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, payload: bytes, tags: Iterable[Hashable], generation: int,
+            version: Optional[int] = None) -> None:
+        if self.max_entries <= 0 or len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._drop(key)
+            tags = frozenset(tags)
+            self._entries[key] = (payload, tags, version)
+            self._bytes += len(payload)
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tags: Hashable) -> None:
+        with self._lock:
+            self.generation += 1
+            for tag in tags:
+                for key in self._by_tag.pop(tag, ()):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._by_tag.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stale": self.stale,
+            }
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        payload, tags, _ = entry
+        self._bytes -= len(payload)
+        for tag in tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
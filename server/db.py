@@ -1,37 +1,454 @@
+import functools
+import itertools
+import json
+import queue
 import sqlite3
 import threading
-from typing import List, Tuple, Optional
+import time
+from concurrent.futures import Future
+from datetime import date
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Iterable, Iterator, List, Mapping, Sequence, Tuple, Optional
 from pathlib import Path
 
+from .pool import Overloaded
+
 _DB_PATH = str((Path(__file__).resolve().parents[1] / "db" / "campionato.db"))
 
 _write_lock = threading.Lock()
 
+# "lock": rollback journal, writes serialized by _write_lock (single process).
+# "wal":  WAL journal, writers serialized by SQLite itself via BEGIN IMMEDIATE,
+#         readers never wait for writers; safe with several server processes.
+STORAGE_MODES = ("lock", "wal")
+_storage_mode = "lock"
+BUSY_TIMEOUT_MS = 5000
+
+POOL_SIZE = 16
+# rows per fetchmany() in the stream_* functions
+STREAM_CHUNK = 500
+# idle seconds after which a pooled connection is checked before reuse
+HEALTH_CHECK_AFTER = 30.0
+# seconds a caller waits for a free pooled connection before Overloaded
+ACQUIRE_TIMEOUT = 5.0
+# values accepted for giocatori.ruolo
+ROLES = frozenset({"Portiere", "Difensore", "Centrocampista", "Attaccante"})
+# rows per executemany() in the bulk import
+IMPORT_CHUNK = 1000
+
+# per-thread state of an explicit transaction (see ``transaction()``)
+_local = threading.local()
+
 class NotFoundError(Exception):
     pass
 
 class IntegrityError(Exception):
     pass
 
+class StreamingUnavailable(Exception):
+    pass
+
 
-def _connect() -> sqlite3.Connection:
-    conn = sqlite3.connect(_DB_PATH, check_same_thread=False)
+def _connect(path: Optional[str] = None) -> sqlite3.Connection:
+    conn = sqlite3.connect(path or _DB_PATH, check_same_thread=False, cached_statements=256)
     conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS};")
+    if _storage_mode == "wal":
+        conn.execute("PRAGMA journal_mode = WAL;")
+        conn.execute("PRAGMA synchronous = NORMAL;")
     return conn
 
 
+class ConnectionPool:
+    """
+    Keeps up to ``max_size`` open connections and hands them out to callers,
+    so requests reuse connections (and their prepared statement caches)
+    instead of opening a new one and re-running the PRAGMAs every time.
+    ``acquire`` waits while all ``max_size`` connections are in use, for at
+    most ``acquire_timeout`` seconds, then raises ``Overloaded``.
+    """
+
+    def __init__(self, path: str, max_size: int = POOL_SIZE,
+                 health_check_after: float = HEALTH_CHECK_AFTER,
+                 acquire_timeout: float = ACQUIRE_TIMEOUT):
+        self.path = path
+        self.max_size = max_size
+        self.health_check_after = health_check_after
+        self.acquire_timeout = acquire_timeout
+        self._idle: "queue.LifoQueue[Tuple[sqlite3.Connection, float]]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def acquire(self) -> sqlite3.Connection:
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise Overloaded("Nessuna connessione al DB disponibile, riprova più tardi")
+        try:
+            while True:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return _connect(self.path)
+                if time.monotonic() - last_used < self.health_check_after or self._healthy(conn):
+                    return conn
+                conn.close()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn: sqlite3.Connection, broken: bool = False) -> None:
+        try:
+            if not broken and conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            broken = True
+        if broken:
+            conn.close()
+        else:
+            self._idle.put((conn, time.monotonic()))
+        self._slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            # a connection that can't even roll back is dropped by release()
+            self.release(conn)
+
+    def close(self) -> None:
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+
+    @staticmethod
+    def _healthy(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def configure(db_path: Optional[str] = None, pool_size: Optional[int] = None,
+              storage_mode: Optional[str] = None) -> None:
+    """Point the module at another database file, resize the pool or switch storage mode."""
+    global _DB_PATH, _pool, _storage_mode
+    if storage_mode is not None and storage_mode not in STORAGE_MODES:
+        raise ValueError(f"storage_mode must be one of {STORAGE_MODES}")
+    with _pool_lock:
+        if db_path is not None:
+            _DB_PATH = db_path
+        if storage_mode is not None:
+            _storage_mode = storage_mode
+        old, _pool = _pool, ConnectionPool(_DB_PATH, pool_size or POOL_SIZE)
+    if old is not None:
+        old.close()
+
+
+def _get_pool() -> ConnectionPool:
+    global _pool
+    pool = _pool
+    if pool is None or pool.path != _DB_PATH:
+        # first use, or _DB_PATH was reassigned directly
+        with _pool_lock:
+            if _pool is None or _pool.path != _DB_PATH:
+                _pool = ConnectionPool(_DB_PATH, POOL_SIZE)
+            pool = _pool
+    return pool
+
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    """
+    Run every db call made by this thread inside the block in a single
+    transaction, taking the write lock once for the whole block.
+    Commits on success, rolls everything back if an exception escapes.
+    Nested calls join the outer transaction.
+    """
+    if getattr(_local, "conn", None) is not None:
+        yield _local.conn
+        return
+
+    hooks: List[Callable[[], None]] = []
+    with _write_guard(), _get_pool().connection() as conn:
+        _local.conn, _local.hooks = conn, hooks
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                yield conn
+        finally:
+            _local.conn = _local.hooks = None
+    for hook in hooks:
+        hook()
+
+
+@contextmanager
+def snapshot() -> Iterator[sqlite3.Connection]:
+    """
+    ``transaction()`` for blocks that only read: one connection and one
+    deferred read transaction (a consistent view of the data) without the
+    write lock or ``BEGIN IMMEDIATE``. Nested calls join the outer transaction.
+    """
+    if getattr(_local, "conn", None) is not None:
+        yield _local.conn
+        return
+
+    with _get_pool().connection() as conn:
+        _local.conn = conn
+        try:
+            conn.execute("BEGIN")
+            try:
+                yield conn
+            finally:
+                conn.rollback()  # nothing to keep
+        finally:
+            _local.conn = None
+
+
+@contextmanager
+def savepoint(conn: Optional[sqlite3.Connection] = None) -> Iterator[None]:
+    """
+    Inside ``transaction()``: undo only the changes made in this block if an
+    exception escapes it, keeping the rest of the transaction.
+    """
+    conn = conn or _local.conn
+    hooks = getattr(_local, "hooks", None)
+    registered = len(hooks) if hooks is not None else 0
+    conn.execute("SAVEPOINT item")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK TO item")
+        conn.execute("RELEASE item")
+        if hooks is not None:
+            del hooks[registered:]  # the changes they announce were undone
+        raise
+    conn.execute("RELEASE item")
+
+
+def after_commit(hook: Callable[[], None]) -> None:
+    """Run ``hook`` once the current transaction commits (now, if there is none)."""
+    hooks = getattr(_local, "hooks", None)
+    if hooks is None:
+        hook()
+    else:
+        hooks.append(hook)
+
+
+def _write_guard():
+    # in WAL mode BEGIN IMMEDIATE already makes writers wait for each other,
+    # across threads and processes alike
+    return _write_lock if _storage_mode == "lock" else nullcontext()
+
+
+@contextmanager
+def _writing() -> Iterator[sqlite3.Connection]:
+    if getattr(_local, "conn", None) is not None:
+        yield _local.conn
+        return
+    with _write_guard(), _get_pool().connection() as conn, conn:
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+
+
+@contextmanager
+def _reading() -> Iterator[sqlite3.Connection]:
+    if getattr(_local, "conn", None) is not None:
+        yield _local.conn
+        return
+    with _get_pool().connection() as conn:
+        yield conn
+
+
+def _mutation(fn: Callable) -> Callable:
+    """
+    Turn ``fn(conn, *args)`` into ``fn(*args)`` run as a write: inside the
+    caller's ``transaction()`` if there is one, else through the group-commit
+    writer when it is running, else in its own transaction.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        conn = getattr(_local, "conn", None)
+        if conn is not None:
+            return fn(conn, *args, **kwargs)
+        writer = _group_writer
+        if writer is not None:
+            try:
+                return writer.submit(fn, args, kwargs).result()
+            except WriterStopped:
+                pass  # stopped since we read _group_writer: write on our own
+        with _writing() as conn:
+            return fn(conn, *args, **kwargs)
+    return wrapper
+
+
+class WriterStopped(Exception):
+    """``GroupCommitWriter.submit`` after ``stop()``: the mutation was not run."""
+
+
+class GroupCommitWriter:
+    """
+    Single writer thread that drains queued mutations and commits them
+    together: one ``BEGIN IMMEDIATE``/``COMMIT`` (and one fsync) for up to
+    ``max_batch`` mutations. Each mutation runs in its own savepoint, so a
+    failing one is undone alone and its caller gets its own exception.
+    After picking up the first mutation the writer waits at most
+    ``max_wait`` seconds for more to arrive. Once ``stop()`` is called,
+    ``submit`` raises ``WriterStopped``.
+    """
+
+    def __init__(self, max_batch: int = 64, max_wait: float = 0.002):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        # guards _stopped so no job can be queued behind the stop sentinel
+        self._state_lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable, args: tuple, kwargs: dict) -> Future:
+        fut: Future = Future()
+        with self._state_lock:
+            if self._stopped:
+                raise WriterStopped("Group-commit writer fermato")
+            self._queue.put((fut, fn, args, kwargs))
+        return fut
+
+    def stop(self) -> None:
+        with self._state_lock:
+            self._stopped = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        try:
+            self._drain()
+        finally:
+            # nothing should follow the sentinel, but never leave a caller waiting
+            while True:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None:
+                    job[0].set_exception(WriterStopped("Group-commit writer fermato"))
+
+    def _drain(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            batch = [job]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    job = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if job is None:
+                    self._commit(batch)
+                    return
+                batch.append(job)
+            self._commit(batch)
+
+    def _commit(self, batch: list) -> None:
+        outcomes = []
+        try:
+            with _write_guard(), _get_pool().connection() as conn, conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for fut, fn, args, kwargs in batch:
+                    try:
+                        with savepoint(conn):
+                            outcomes.append((fut, True, fn(conn, *args, **kwargs)))
+                    except Exception as e:
+                        outcomes.append((fut, False, e))
+        except Exception as e:
+            # BEGIN or COMMIT failed: nothing in this group was written
+            for fut, *_ in batch:
+                fut.set_exception(e)
+            return
+        for fut, ok, value in outcomes:
+            if ok:
+                fut.set_result(value)
+            else:
+                fut.set_exception(value)
+
+
+_group_writer: Optional[GroupCommitWriter] = None
+
+
+def start_group_commit(max_batch: int = 64, max_wait: float = 0.002) -> None:
+    global _group_writer
+    stop_group_commit()
+    _group_writer = GroupCommitWriter(max_batch, max_wait)
+
+
+def stop_group_commit() -> None:
+    global _group_writer
+    writer, _group_writer = _group_writer, None
+    if writer is not None:
+        writer.stop()
+
+
+def _limit(limit: Optional[int]) -> int:
+    if limit is None:
+        return -1  # no LIMIT in SQLite
+    if int(limit) < 1:
+        raise ValueError("limit deve essere >= 1")
+    return int(limit)
+
+
+def _cursor(after: Optional[Sequence], size: int) -> tuple:
+    if after is None:
+        return ()
+    if not isinstance(after, (list, tuple)) or len(after) != size:
+        raise ValueError(f"Cursore 'after' non valido: servono {size} valori")
+    return tuple(after)
+
+
+def _stream(query: Tuple[str, tuple], chunk_size: int) -> Iterator[List[Tuple]]:
+    """
+    Yield the rows of ``query`` in lists of at most ``chunk_size`` with
+    ``fetchmany``, so the whole result is never held in memory. The pooled
+    connection stays busy until the generator is exhausted or closed.
+
+    Only in WAL mode (or inside the caller's own transaction): with the
+    rollback journal the open cursor keeps a SHARED lock for as long as the
+    consumer takes to read, and every write in the meantime fails.
+    """
+    if int(chunk_size) < 1:
+        raise ValueError("chunk_size deve essere >= 1")
+    if _storage_mode != "wal" and getattr(_local, "conn", None) is None:
+        raise StreamingUnavailable("Lo streaming richiede --storage wal")
+    with _reading() as conn:
+        cur = conn.execute(*query)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+
+
 # -------- SQUADRE --------
 
-def create_team(nome_club: str, citta: str, anno_fondazione: int, budget: float) -> int:
-    with _write_lock, _connect() as conn:
-        cur = conn.execute(
-            """
-            INSERT INTO squadre (nome_club, citta, anno_fondazione, budget)
-            VALUES (?, ?, ?, ?)
-            """,
-            (nome_club, citta, anno_fondazione, budget),
-        )
-        return cur.lastrowid
+@_mutation
+def create_team(conn: sqlite3.Connection, nome_club: str, citta: str, anno_fondazione: int, budget: float) -> int:
+    cur = conn.execute(
+        """
+        INSERT INTO squadre (nome_club, citta, anno_fondazione, budget)
+        VALUES (?, ?, ?, ?)
+        """,
+        (nome_club, citta, anno_fondazione, budget),
+    )
+    return cur.lastrowid
 
 def team_exists(conn, team_id: int) -> bool:
     """
@@ -45,39 +462,53 @@ def team_exists(conn, team_id: int) -> bool:
     cur = conn.execute("SELECT 1 FROM squadre WHERE id_squadra = ?", (team_id,))
     return cur.fetchone() is not None
 
-def list_teams() -> List[Tuple]:
-    with _connect() as conn:
-        cur = conn.execute(
-            """
-            SELECT id_squadra, nome_club, citta, anno_fondazione, budget
-            FROM squadre
-            ORDER BY nome_club
-            """
-        )
+def _teams_query(limit: Optional[int], after: Optional[Sequence]) -> Tuple[str, tuple]:
+    keyset = "WHERE (nome_club, id_squadra) > (?, ?)" if after is not None else ""
+    sql = f"""
+        SELECT id_squadra, nome_club, citta, anno_fondazione, budget
+        FROM squadre
+        {keyset}
+        ORDER BY nome_club, id_squadra
+        LIMIT ?
+        """
+    return sql, (*_cursor(after, 2), _limit(limit))
+
+
+def list_teams(limit: Optional[int] = None, after: Optional[Sequence] = None) -> List[Tuple]:
+    """
+    Teams ordered by name. With ``limit`` only one page is returned;
+    ``after`` is the ``[nome_club, id_squadra]`` of the previous page's last row.
+    """
+    with _reading() as conn:
+        cur = conn.execute(*_teams_query(limit, after))
         return cur.fetchall()
 
 
-def delete_team(id_squadra: int) -> None:
-    with _write_lock, _connect() as conn:
-        # ensure the team exists before attempting to delete it
-        if not team_exists(conn, id_squadra):
-            raise NotFoundError("Squadra non trovata")
-        # svincola giocatori: set their id_squadra to NULL
-        conn.execute(
-            "UPDATE giocatori SET id_squadra = NULL WHERE id_squadra = ?",
-            (id_squadra,),
-        )
-        # delete the team itself
-        conn.execute(
-            "DELETE FROM squadre WHERE id_squadra = ?",
-            (id_squadra,),
-        )
+def stream_teams(chunk_size: int = STREAM_CHUNK) -> Iterator[List[Tuple]]:
+    """Same rows as ``list_teams()``, ``chunk_size`` at a time."""
+    return _stream(_teams_query(None, None), chunk_size)
+
+
+@_mutation
+def delete_team(conn: sqlite3.Connection, id_squadra: int) -> str:
+    """Delete the team, releasing its players, and return its ``nome_club``."""
+    # ON DELETE SET NULL on giocatori.id_squadra releases (svincola) the
+    # players; no row back means the team never existed
+    row = conn.execute(
+        "DELETE FROM squadre WHERE id_squadra = ? RETURNING nome_club",
+        (id_squadra,),
+    ).fetchone()
+    if row is None:
+        raise NotFoundError("Squadra non trovata")
+    return row[0]
 
 
 
 # -------- GIOCATORI --------
 
+@_mutation
 def create_player(
+    conn: sqlite3.Connection,
     nome: str,
     cognome: str,
     ruolo: str,
@@ -85,15 +516,14 @@ def create_player(
     id_squadra: Optional[int],
     gol_segnati: int = 0,
 ) -> int:
-    with _write_lock, _connect() as conn:
-        cur = conn.execute(
-            """
-            INSERT INTO giocatori (nome, cognome, ruolo, numero_maglia, id_squadra, gol_segnati)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (nome, cognome, ruolo, numero_maglia, id_squadra, gol_segnati),
-        )
-        return cur.lastrowid
+    cur = conn.execute(
+        """
+        INSERT INTO giocatori (nome, cognome, ruolo, numero_maglia, id_squadra, gol_segnati)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (nome, cognome, ruolo, numero_maglia, id_squadra, gol_segnati),
+    )
+    return cur.lastrowid
 
 def player_exists(conn, player_id: int) -> bool:
     cur = conn.execute(
@@ -103,79 +533,107 @@ def player_exists(conn, player_id: int) -> bool:
     return cur.fetchone() is not None
 
 
-def list_players_by_team(id_squadra: int) -> List[Tuple]:
-    with _connect() as conn:
+def _players_query(id_squadra: Optional[int], limit: Optional[int],
+                   after: Optional[Sequence]) -> Tuple[str, tuple]:
+    # id_squadra None selects the free agents, listed with their goals
+    if id_squadra is None:
+        columns, where, params = ", gol_segnati", "id_squadra IS NULL", ()
+    else:
+        columns, where, params = "", "id_squadra = ?", (id_squadra,)
+    keyset = "AND (cognome, nome, id_giocatore) > (?, ?, ?)" if after is not None else ""
+    sql = f"""
+        SELECT id_giocatore, nome, cognome, ruolo, numero_maglia{columns}
+        FROM giocatori
+        WHERE {where}
+        {keyset}
+        ORDER BY cognome, nome, id_giocatore
+        LIMIT ?
+        """
+    return sql, (*params, *_cursor(after, 3), _limit(limit))
+
+
+def list_players_by_team(id_squadra: int, limit: Optional[int] = None,
+                         after: Optional[Sequence] = None) -> List[Tuple]:
+    """
+    Players of a team ordered by surname and name. ``after`` is the
+    ``[cognome, nome, id_giocatore]`` of the previous page's last row.
+    """
+    with _reading() as conn:
+        cur = conn.execute(*_players_query(id_squadra, limit, after))
+        return cur.fetchall()
+
+
+def stream_players_by_team(id_squadra: int, chunk_size: int = STREAM_CHUNK) -> Iterator[List[Tuple]]:
+    return _stream(_players_query(id_squadra, None, None), chunk_size)
+
+
+@_mutation
+def transfer_player(conn: sqlite3.Connection, id_giocatore: int, new_id_squadra: Optional[int]) -> None:
+    try:
         cur = conn.execute(
             """
-            SELECT id_giocatore, nome, cognome, ruolo, numero_maglia
-            FROM giocatori
-            WHERE id_squadra = ?
-            ORDER BY cognome, nome
+            UPDATE giocatori
+            SET id_squadra = ?1
+            WHERE id_giocatore = ?2
+              AND (?1 IS NULL OR EXISTS (SELECT 1 FROM squadre WHERE id_squadra = ?1))
             """,
-            (id_squadra,),
+            (new_id_squadra, id_giocatore),
         )
-        return cur.fetchall()
-
-
-def transfer_player(id_giocatore: int, new_id_squadra: Optional[int]) -> None:
-    with _write_lock, _connect() as conn:
+    except sqlite3.IntegrityError as e:
+        # surface SQLite integrity errors as our own type
+        raise IntegrityError(str(e))
+    if cur.rowcount == 0:
+        # error path only: find out which of the two ids is unknown
         if new_id_squadra is not None and not team_exists(conn, new_id_squadra):
             raise NotFoundError("Squadra non trovata")
-        if not player_exists(conn, id_giocatore):
-            raise NotFoundError("Giocatore non trovato")
-        try:
-            conn.execute(
-                """
-                UPDATE giocatori
-                SET id_squadra = ?
-                WHERE id_giocatore = ?
-                """,
-                (new_id_squadra, id_giocatore),
-            )
-        except sqlite3.IntegrityError as e:
-            # surface SQLite integrity errors as our own type
-            raise IntegrityError(str(e))
+        raise NotFoundError("Giocatore non trovato")
 
 
 
-def delete_player(id_giocatore: int) -> None:
-    with _write_lock, _connect() as conn:
-        cur = conn.execute(
-            "DELETE FROM giocatori WHERE id_giocatore = ?",
-            (id_giocatore,),
-        )
-        if cur.rowcount == 0:
-            raise NotFoundError("Giocatore non trovato")
+@_mutation
+def delete_player(conn: sqlite3.Connection, id_giocatore: int) -> Optional[int]:
+    """Delete the player and return the ``id_squadra`` it belonged to."""
+    row = conn.execute(
+        "DELETE FROM giocatori WHERE id_giocatore = ? RETURNING id_squadra",
+        (id_giocatore,),
+    ).fetchone()
+    if row is None:
+        raise NotFoundError("Giocatore non trovato")
+    return row[0]
 
+@_mutation
 def update_player(
+    conn: sqlite3.Connection,
     id_giocatore: int,
     nome: str,
     cognome: str,
     ruolo: str,
     numero_maglia: int,
     gol_segnati: Optional[int] = None,
-) -> None:
-    with _write_lock, _connect() as conn:
-        if not player_exists(conn, id_giocatore):
-            raise NotFoundError("Giocatore non trovato")
-        try:
-            conn.execute(
-                """
-                UPDATE giocatori
-                SET nome = ?,
-                    cognome = ?,
-                    ruolo = ?,
-                    numero_maglia = ?,
-                    gol_segnati = COALESCE(?, gol_segnati)
-                WHERE id_giocatore = ?
-                """,
-                (nome, cognome, ruolo, numero_maglia, gol_segnati, id_giocatore),
-            )
-        except sqlite3.IntegrityError as e:
-            raise IntegrityError(str(e))
+) -> Optional[int]:
+    """Update the player and return its ``id_squadra``."""
+    try:
+        row = conn.execute(
+            """
+            UPDATE giocatori
+            SET nome = ?,
+                cognome = ?,
+                ruolo = ?,
+                numero_maglia = ?,
+                gol_segnati = COALESCE(?, gol_segnati)
+            WHERE id_giocatore = ?
+            RETURNING id_squadra
+            """,
+            (nome, cognome, ruolo, numero_maglia, gol_segnati, id_giocatore),
+        ).fetchone()
+    except sqlite3.IntegrityError as e:
+        raise IntegrityError(str(e))
+    if row is None:
+        raise NotFoundError("Giocatore non trovato")
+    return row[0]
 
 def get_team_by_id(id_squadra: int):
-    with _connect() as conn:
+    with _reading() as conn:
         cur = conn.execute(
             "SELECT id_squadra, nome_club, citta, anno_fondazione, budget FROM squadre WHERE id_squadra = ?",
             (id_squadra,),
@@ -185,14 +643,428 @@ def get_team_by_id(id_squadra: int):
             raise NotFoundError("Squadra non trovata")
         return row
         
-def list_free_agents():
-    with _connect() as conn:
-        cur = conn.execute(
-            """
-            SELECT id_giocatore, nome, cognome, ruolo, numero_maglia, gol_segnati
-            FROM giocatori
-            WHERE id_squadra IS NULL
-            ORDER BY cognome, nome
+def list_free_agents(limit: Optional[int] = None, after: Optional[Sequence] = None):
+    """Players without a team; paginated like ``list_players_by_team``."""
+    with _reading() as conn:
+        cur = conn.execute(*_players_query(None, limit, after))
+        return cur.fetchall()
+
+
+def stream_free_agents(chunk_size: int = STREAM_CHUNK) -> Iterator[List[Tuple]]:
+    return _stream(_players_query(None, None, None), chunk_size)
+
+
+
+# -------- EXPORT --------
+
+# one row per player, with its team's columns (all None for free agents);
+# a team without players gets one row with the player columns None
+EXPORT_COLUMNS = (
+    "id_squadra", "nome_club", "citta", "anno_fondazione", "budget",
+    "id_giocatore", "nome", "cognome", "ruolo", "numero_maglia", "gol_segnati",
+)
+
+
+def stream_export(chunk_size: int = STREAM_CHUNK) -> Iterator[List[Tuple]]:
+    """
+    Every team and player, ``EXPORT_COLUMNS`` per row, from a single cursor.
+    Raises ``StreamingUnavailable`` outside WAL mode: a long export must never
+    hold the lock that writers need.
+    """
+    return _stream((
+        """
+        SELECT s.id_squadra, s.nome_club, s.citta, s.anno_fondazione, s.budget,
+               g.id_giocatore, g.nome, g.cognome, g.ruolo, g.numero_maglia, g.gol_segnati
+        FROM squadre s
+        LEFT JOIN giocatori g ON g.id_squadra = s.id_squadra
+        UNION ALL
+        SELECT NULL, NULL, NULL, NULL, NULL,
+               id_giocatore, nome, cognome, ruolo, numero_maglia, gol_segnati
+        FROM giocatori
+        WHERE id_squadra IS NULL
+        """,
+        (),
+    ), chunk_size)
+
+
+# -------- RICERCA --------
+# FTS5 index ``ricerca`` kept up to date by triggers in init_db (where SQLite
+# has FTS5): players have rowid = id_giocatore, teams rowid = -id_squadra.
+
+SEARCH_LIMIT = 20
+SEARCH_MAX = 100
+# shorter words only match whole words: a one-letter prefix would match
+# (and rank) a large part of the table
+SEARCH_MIN_PREFIX = 2
+# columns of ricerca a search looks in unless told otherwise: the names.
+# A role or a club name is on many player rows, so matching ruolo and
+# nome_club is left to callers who ask for it.
+SEARCH_FIELDS = ("nome", "cognome", "squadra")
+SEARCH_ALL_FIELDS = SEARCH_FIELDS + ("ruolo", "nome_club")
+
+
+def _match_expression(query: str, fields: Sequence[str]) -> str:
+    # every word must appear in one of fields, as a word or as the start of
+    # one: Ros Ju -> {nome cognome squadra} : ("Ros"* "Ju"*)
+    words = query.split()
+    if not words:
+        raise ValueError("testo di ricerca vuoto")
+    unknown = [f for f in fields if f not in SEARCH_ALL_FIELDS]
+    if not fields or unknown:
+        raise ValueError(f"Campi di ricerca non validi: {unknown or 'nessuno'}")
+    phrases = " ".join(
+        '"' + word.replace('"', '""') + ('"*' if len(word) >= SEARCH_MIN_PREFIX else '"')
+        for word in words
+    )
+    return "{" + " ".join(fields) + "} : (" + phrases + ")"
+
+
+def search(query: str, limit: Optional[int] = SEARCH_LIMIT,
+           fields: Optional[Sequence[str]] = None) -> List[Tuple]:
+    """
+    Players and teams whose nome and cognome (players) or nome_club (teams)
+    match every word of ``query`` as a prefix, best first, as
+    ``(tipo, id, nome, cognome, ruolo, nome_club)``; ``tipo`` is
+    ``"giocatore"`` or ``"squadra"`` (then only ``nome_club`` is set).
+    ``fields`` (from ``SEARCH_ALL_FIELDS``) replaces the columns matched,
+    e.g. ``SEARCH_ALL_FIELDS`` to find players by role or club too.
+    """
+    limit = min(_limit(SEARCH_LIMIT if limit is None else limit), SEARCH_MAX)
+    fields = SEARCH_FIELDS if fields is None else fields
+    with _reading() as conn:
+        try:
+            cur = conn.execute(
+                """
+                SELECT CASE WHEN rowid < 0 THEN 'squadra' ELSE 'giocatore' END,
+                       abs(rowid), nome, cognome, ruolo, nome_club
+                FROM ricerca
+                WHERE ricerca MATCH ?
+                ORDER BY rank
+                LIMIT ?
+                """,
+                (_match_expression(query, fields), limit),
+            )
+        except sqlite3.OperationalError as e:
+            if "no such table" in str(e):
+                raise RuntimeError("Ricerca non disponibile: SQLite senza FTS5") from e
+            raise
+        return cur.fetchall()
+
+# -------- VERSIONI --------
+# Counters bumped by the ``versioni`` triggers in init_db on every write.
+
+TEAMS_VERSION = "squadre"
+FREE_AGENTS_VERSION = "svincolati"
+
+
+def roster_version(id_squadra: Optional[int]) -> str:
+    """Version key of a team's roster (the free agents for ``None``)."""
+    return FREE_AGENTS_VERSION if id_squadra is None else f"squadra:{int(id_squadra)}"
+
+
+def get_version(key: str) -> int:
+    """Current version of ``key``; 0 if it was never written."""
+    with _reading() as conn:
+        row = conn.execute("SELECT versione FROM versioni WHERE chiave = ?", (key,)).fetchone()
+        return row[0] if row is not None else 0
+
+
+# -------- MODIFICHE --------
+# Change log written by the ``modifiche`` triggers in init_db.
+
+CHANGES_PAGE = 1000
+# largest page a client may ask ``changes_since`` for over the protocol
+CHANGES_MAX_PAGE = 10000
+
+
+def changes_since(seq: int, limit: Optional[int] = CHANGES_PAGE) -> Tuple[List[Tuple], int]:
+    """
+    Changes committed after ``seq``, oldest first, as
+    ``(seq, tabella, operazione, id, riga)`` with ``riga`` decoded (None for
+    deletes); also returns the latest ``seq`` so callers can tell their lag.
+    """
+    with _reading() as conn:
+        rows = conn.execute(
             """
+            SELECT seq, tabella, operazione, id, riga
+            FROM modifiche
+            WHERE seq > ?
+            ORDER BY seq
+            LIMIT ?
+            """,
+            (int(seq), _limit(limit)),
+        ).fetchall()
+        # read after the rows, so it is never behind them
+        last = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM modifiche").fetchone()[0]
+    return [(s, t, op, i, json.loads(r) if r is not None else None) for s, t, op, i, r in rows], last
+
+
+def last_seq() -> int:
+    """``seq`` of the latest logged change (0 if none)."""
+    with _reading() as conn:
+        return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM modifiche").fetchone()[0]
+
+
+# -------- REPLICA --------
+# A follower DB replays the primary's change log; ``replica.applied_seq``
+# records how far, in the same transaction as the rows themselves.
+
+_REPLICATED = {
+    "squadre": ("id_squadra", ("nome_club", "citta", "anno_fondazione", "budget")),
+    "giocatori": ("id_giocatore", ("nome", "cognome", "ruolo", "numero_maglia", "gol_segnati", "id_squadra")),
+}
+
+
+def _upsert_sql(tabella: str) -> str:
+    pk, cols = _REPLICATED[tabella]
+    return f"""
+        INSERT INTO {tabella} ({pk}, {", ".join(cols)})
+        VALUES ({", ".join("?" * (len(cols) + 1))})
+        ON CONFLICT ({pk}) DO UPDATE SET {", ".join(f"{c} = excluded.{c}" for c in cols)}
+        """
+
+
+@_mutation
+def apply_changes(conn: sqlite3.Connection, changes: Sequence[Sequence]) -> int:
+    """
+    Replay ``changes_since`` rows from the primary, in order, and return the
+    new applied ``seq``. Rows keep the primary's ids; updates and inserts are
+    upserts (never ``REPLACE``, which would fire ``ON DELETE SET NULL``).
+    """
+    applied = applied_seq(conn)
+    for seq, tabella, operazione, id_, riga in changes:
+        if seq <= applied:
+            continue  # already here (e.g. a page fetched twice)
+        pk, cols = _REPLICATED[tabella]
+        if operazione == "delete":
+            conn.execute(f"DELETE FROM {tabella} WHERE {pk} = ?", (id_,))
+        else:
+            conn.execute(_upsert_sql(tabella), (id_, *(riga[c] for c in cols)))
+        applied = seq
+    conn.execute(
+        """
+        INSERT INTO replica (chiave, valore) VALUES ('applied_seq', ?)
+        ON CONFLICT (chiave) DO UPDATE SET valore = excluded.valore
+        """,
+        (applied,),
+    )
+    return applied
+
+
+def applied_seq(conn: Optional[sqlite3.Connection] = None) -> int:
+    """Last primary ``seq`` applied to this DB (0 for a new follower)."""
+    if conn is None:
+        with _reading() as conn:
+            return applied_seq(conn)
+    row = conn.execute("SELECT valore FROM replica WHERE chiave = 'applied_seq'").fetchone()
+    return row[0] if row is not None else 0
+
+
+# -------- EMAIL OUTBOX --------
+
+@_mutation
+def enqueue_email(conn: sqlite3.Connection, tipo: str, dati: dict) -> int:
+    """Queue a notification; call it inside the transaction of the change it reports."""
+    now = time.time()
+    cur = conn.execute(
+        """
+        INSERT INTO email_outbox (tipo, dati, prossimo_tentativo, creata)
+        VALUES (?, ?, ?, ?)
+        """,
+        (tipo, json.dumps(dati), now, now),
+    )
+    return cur.lastrowid
+
+
+@_mutation
+def claim_emails(conn: sqlite3.Connection, lease: float, limit: int = 1,
+                 settle: float = 0.0) -> List[Tuple[int, str, dict, int]]:
+    """
+    Take up to ``limit`` due notifications, oldest first, as
+    ``(id, tipo, dati, tentativi)``. They are not due again for ``lease``
+    seconds, so other workers (and other processes) skip them; if the sender
+    dies they are retried after that. With ``settle`` nothing is taken until
+    the oldest due one has waited that long (used to build digests).
+    """
+    now = time.time()
+    rows = conn.execute(
+        """
+        UPDATE email_outbox
+        SET tentativi = tentativi + 1, prossimo_tentativo = ?2
+        WHERE id IN (
+            SELECT id FROM email_outbox
+            WHERE stato = 'in_attesa' AND prossimo_tentativo <= ?1
+            ORDER BY prossimo_tentativo, id
+            LIMIT ?3
         )
-        return cur.fetchall()
+        AND EXISTS (
+            SELECT 1 FROM email_outbox
+            WHERE stato = 'in_attesa' AND prossimo_tentativo <= ?1 - ?4
+        )
+        RETURNING id, tipo, dati, tentativi
+        """,
+        (now, now + lease, limit, settle),
+    ).fetchall()
+    return sorted((i, tipo, json.loads(dati), n) for i, tipo, dati, n in rows)
+
+
+@_mutation
+def email_sent(conn: sqlite3.Connection, id_email: int) -> None:
+    conn.execute(
+        "UPDATE email_outbox SET stato = 'inviata', inviata = ?, ultimo_errore = NULL WHERE id = ?",
+        (time.time(), id_email),
+    )
+
+
+@_mutation
+def email_failed(conn: sqlite3.Connection, id_email: int, error: str, retry_at: Optional[float]) -> None:
+    """Record a failed attempt: retry at ``retry_at``, or give up if it is None."""
+    conn.execute(
+        """
+        UPDATE email_outbox
+        SET ultimo_errore = ?,
+            stato = CASE WHEN ? IS NULL THEN 'fallita' ELSE stato END,
+            prossimo_tentativo = COALESCE(?, prossimo_tentativo)
+        WHERE id = ?
+        """,
+        (error, retry_at, retry_at, id_email),
+    )
+
+
+def outbox_stats() -> dict:
+    with _reading() as conn:
+        rows = conn.execute("SELECT stato, COUNT(*) FROM email_outbox GROUP BY stato").fetchall()
+        return dict(rows)
+
+
+# -------- IMPORT --------
+# Rows are validated in Python first, so executemany() never fails halfway
+# through a chunk; rejected rows go to ``on_reject(numero, riga, motivo)``
+# with their 1-based position in the input.
+
+Rejecter = Callable[[int, Mapping[str, Any], str], None]
+
+
+def _text(row: Mapping[str, Any], field: str) -> str:
+    value = row.get(field)
+    if value is None or not str(value).strip():
+        raise ValueError(f"{field} mancante")
+    return str(value).strip()
+
+
+def _number(row: Mapping[str, Any], field: str, kind=int, default=None):
+    value = row.get(field)
+    if value is None or str(value).strip() == "":
+        if default is None:
+            raise ValueError(f"{field} mancante")
+        return default
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} non valido: {value!r}") from None
+
+
+def _chunks(rows: Iterable, size: int) -> Iterator[list]:
+    it = iter(rows)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _import(conn: sqlite3.Connection, sql: str, rows: Iterable[Mapping[str, Any]],
+            parse: Callable[[Mapping[str, Any]], tuple], on_reject: Optional[Rejecter],
+            chunk_size: int) -> int:
+    inserted = 0
+    for chunk in _chunks(enumerate(rows, 1), chunk_size):
+        params = []
+        for numero, row in chunk:
+            try:
+                params.append(parse(row))
+            except ValueError as e:
+                if on_reject is not None:
+                    on_reject(numero, row, str(e))
+        conn.executemany(sql, params)
+        inserted += len(params)
+    return inserted
+
+
+@_mutation
+def import_teams(conn: sqlite3.Connection, rows: Iterable[Mapping[str, Any]],
+                 on_reject: Optional[Rejecter] = None, chunk_size: int = IMPORT_CHUNK) -> int:
+    """
+    Insert teams (``nome_club``, ``citta``, ``anno_fondazione``, ``budget``)
+    and return how many. Names already in the DB or repeated in ``rows`` are
+    rejected.
+    """
+    names = {name for (name,) in conn.execute("SELECT nome_club FROM squadre")}
+    this_year = date.today().year
+
+    def parse(row):
+        nome_club = _text(row, "nome_club")
+        anno = _number(row, "anno_fondazione")
+        if not (1850 <= anno <= this_year):
+            raise ValueError(f"anno_fondazione non valido (1850..{this_year}): {anno}")
+        if nome_club in names:
+            raise ValueError(f"squadra già presente: {nome_club}")
+        team = (nome_club, _text(row, "citta"), anno, _number(row, "budget", float, 0.0))
+        names.add(nome_club)
+        return team
+
+    return _import(
+        conn,
+        "INSERT INTO squadre (nome_club, citta, anno_fondazione, budget) VALUES (?, ?, ?, ?)",
+        rows, parse, on_reject, chunk_size,
+    )
+
+
+@_mutation
+def import_players(conn: sqlite3.Connection, rows: Iterable[Mapping[str, Any]],
+                   on_reject: Optional[Rejecter] = None, chunk_size: int = IMPORT_CHUNK) -> int:
+    """
+    Insert players (``nome``, ``cognome``, ``ruolo``, ``numero_maglia``,
+    optional ``gol_segnati``) and return how many. The team is given by name
+    in ``squadra`` (or ``nome_club``), resolved with one map of every team
+    loaded up front; no team means a free agent.
+    """
+    team_ids = dict(conn.execute("SELECT nome_club, id_squadra FROM squadre"))
+
+    def parse(row):
+        ruolo = _text(row, "ruolo")
+        if ruolo not in ROLES:
+            raise ValueError(f"ruolo non valido: {ruolo}")
+        squadra = row.get("squadra", row.get("nome_club"))
+        squadra = str(squadra).strip() if squadra is not None else ""
+        if squadra and squadra not in team_ids:
+            raise ValueError(f"squadra sconosciuta: {squadra}")
+        return (_text(row, "nome"), _text(row, "cognome"), ruolo, _number(row, "numero_maglia"),
+                _number(row, "gol_segnati", int, 0), team_ids.get(squadra))
+
+    return _import(
+        conn,
+        """
+        INSERT INTO giocatori (nome, cognome, ruolo, numero_maglia, gol_segnati, id_squadra)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        rows, parse, on_reject, chunk_size,
+    )
+
+
+def bulk_import(teams: Iterable[Mapping[str, Any]] = (), players: Iterable[Mapping[str, Any]] = (),
+                on_reject: Optional[Callable[[str, int, Mapping[str, Any], str], None]] = None,
+                chunk_size: int = IMPORT_CHUNK) -> Tuple[int, int]:
+    """
+    Load ``teams`` then ``players`` in a single transaction (players may use
+    the teams just imported) and return ``(teams, players)`` inserted.
+    ``on_reject`` also receives ``"squadre"`` or ``"giocatori"`` first.
+    """
+    def rejecter(kind: str) -> Optional[Rejecter]:
+        if on_reject is None:
+            return None
+        return lambda numero, row, motivo: on_reject(kind, numero, row, motivo)
+
+    with transaction():
+        n_teams = import_teams(teams, rejecter("squadre"), chunk_size)
+        n_players = import_players(players, rejecter("giocatori"), chunk_size)
+    return n_teams, n_players
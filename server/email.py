@@ -1,40 +1,164 @@
+import logging
 import os
 import smtplib
+import threading
+import time
 from email.message import EmailMessage
+from typing import Optional, Sequence, Tuple
 
+logger = logging.getLogger(__name__)
 
-def send_delete_team_email(team_name: str, team_id: int) -> None:
-    smtp_host = os.getenv("SMTP_HOST", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
+# an unused SMTP session is closed after this many seconds
+IDLE_TIMEOUT = 30.0
+SMTP_TIMEOUT = 30.0
 
-    sender = os.getenv("SMTP_SENDER")
-    password = os.getenv("SMTP_PASSWORD")
-    recipient = os.getenv("SMTP_RECIPIENT")
 
-    # DEBUG (you can remove later)
-    print("SMTP_SENDER =", sender)
-    print("SMTP_RECIPIENT =", recipient)
-    print("SMTP_PASSWORD set? =", bool(password))
+class SMTPConfig:
+    """SMTP settings, read from the environment once by ``from_env``."""
 
-    # Fail-safe: if not configured, do nothing
-    if not sender or not password or not recipient:
-        print("EMAIL SKIPPED: SMTP variables not set")
-        return
+    def __init__(self, host: str, port: int, sender: Optional[str], password: Optional[str],
+                 recipient: Optional[str], starttls: bool = True):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.password = password
+        self.recipient = recipient
+        self.starttls = starttls
 
+    @classmethod
+    def from_env(cls) -> "SMTPConfig":
+        return cls(
+            host=os.getenv("SMTP_HOST", "smtp.gmail.com"),
+            port=int(os.getenv("SMTP_PORT", "587")),
+            sender=os.getenv("SMTP_SENDER"),
+            password=os.getenv("SMTP_PASSWORD"),
+            recipient=os.getenv("SMTP_RECIPIENT"),
+            # SMTP_STARTTLS=0 only for local relays (e.g. the test stand-in)
+            starttls=os.getenv("SMTP_STARTTLS", "1") != "0",
+        )
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.sender and self.password and self.recipient)
+
+
+def team_deleted_message(teams: Sequence[Tuple[str, int]]) -> EmailMessage:
+    """Notification for the deleted ``(nome_club, id_squadra)`` teams; a digest if more than one."""
     msg = EmailMessage()
-    msg["Subject"] = f"[Serie A] Squadra eliminata: {team_name} (ID {team_id})"
-    msg["From"] = sender
-    msg["To"] = recipient
-
-    msg.set_content(
-        f"La squadra '{team_name}' (ID {team_id}) è stata eliminata dal sistema.\n"
-        f"I giocatori associati sono stati svincolati (id_squadra = NULL).\n"
-    )
-
-    with smtplib.SMTP(smtp_host, smtp_port) as server:
-        server.ehlo()
-        server.starttls()
-        server.login(sender, password)
-        server.send_message(msg)
-
-    print("EMAIL SENT SUCCESSFULLY")
+    if len(teams) == 1:
+        team_name, team_id = teams[0]
+        msg["Subject"] = f"[Serie A] Squadra eliminata: {team_name} (ID {team_id})"
+        msg.set_content(
+            f"La squadra '{team_name}' (ID {team_id}) è stata eliminata dal sistema.\n"
+            f"I giocatori associati sono stati svincolati (id_squadra = NULL).\n"
+        )
+    else:
+        msg["Subject"] = f"[Serie A] {len(teams)} squadre eliminate"
+        lines = "".join(f"- {team_name} (ID {team_id})\n" for team_name, team_id in teams)
+        msg.set_content(
+            f"Le seguenti squadre sono state eliminate dal sistema:\n{lines}"
+            f"I giocatori associati sono stati svincolati (id_squadra = NULL).\n"
+        )
+    return msg
+
+
+class Mailer:
+    """
+    Sends notifications over one authenticated SMTP session, opened on the
+    first message and reused until it has been idle for ``idle_timeout``
+    seconds (or the server drops it, in which case the next send reconnects).
+    Digests are built by the outbox (server/outbox.py), not here.
+    """
+
+    def __init__(self, config: Optional[SMTPConfig] = None, idle_timeout: float = IDLE_TIMEOUT):
+        self._config = config
+        self.idle_timeout = idle_timeout
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._idle_timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+
+    @property
+    def config(self) -> SMTPConfig:
+        if self._config is None:
+            self._config = SMTPConfig.from_env()
+        return self._config
+
+    def send(self, msg: EmailMessage) -> bool:
+        """Send ``msg`` to the configured recipient; False if SMTP is not configured."""
+        config = self.config
+        if not config.configured:
+            logger.warning("Email non inviata: variabili SMTP non impostate (%s)", msg["Subject"])
+            return False
+        if "From" not in msg:
+            msg["From"] = config.sender
+        if "To" not in msg:
+            msg["To"] = config.recipient
+        with self._lock:
+            for attempt in range(2):
+                smtp = self._session()
+                try:
+                    smtp.send_message(msg)
+                    break
+                except smtplib.SMTPServerDisconnected:
+                    # idle session closed by the server: once more on a new one
+                    self._disconnect()
+                    if attempt:
+                        raise
+                except smtplib.SMTPResponseException:
+                    raise  # the server refused this message; the session is still fine
+                except Exception:
+                    self._disconnect()
+                    raise
+            self._touch()
+        return True
+
+    def close(self) -> None:
+        """End the SMTP session."""
+        with self._lock:
+            self._disconnect()
+
+    def _session(self) -> smtplib.SMTP:
+        if self._smtp is None:
+            config = self.config
+            smtp = smtplib.SMTP(config.host, config.port, timeout=SMTP_TIMEOUT)
+            try:
+                smtp.ehlo()
+                if config.starttls:
+                    smtp.starttls()
+                    smtp.ehlo()
+                smtp.login(config.sender, config.password)
+            except Exception:
+                smtp.close()
+                raise
+            self._smtp = smtp
+        return self._smtp
+
+    def _touch(self) -> None:
+        self._last_used = time.monotonic()
+        if self._idle_timer is None:
+            self._idle_timer = threading.Timer(self.idle_timeout, self._close_if_idle)
+            self._idle_timer.daemon = True
+            self._idle_timer.start()
+
+    def _close_if_idle(self) -> None:
+        with self._lock:
+            self._idle_timer = None
+            idle = time.monotonic() - self._last_used
+            if idle >= self.idle_timeout:
+                self._disconnect()
+            elif self._smtp is not None:
+                self._idle_timer = threading.Timer(self.idle_timeout - idle, self._close_if_idle)
+                self._idle_timer.daemon = True
+                self._idle_timer.start()
+
+    def _disconnect(self) -> None:
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None:
+            try:
+                smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                smtp.close()
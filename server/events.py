@@ -0,0 +1,100 @@
+import asyncio
+import itertools
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+Event = Dict[str, Any]
+
+# events a subscriber may fall behind by before it is disconnected
+SUBSCRIBER_BACKLOG = 1000
+
+
+class EventBus:
+    """
+    Fan-out of change events to the connections that sent ``subscribe``.
+    ``publish`` calls every callback inline, so callbacks must not block.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[int, tuple] = {}
+        self._tokens = itertools.count()
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[Event], None], types: Optional[Iterable[str]] = None) -> int:
+        with self._lock:
+            token = next(self._tokens)
+            self._subscribers[token] = (callback, frozenset(types) if types else None)
+            return token
+
+    def unsubscribe(self, token: int) -> None:
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def publish(self, event: Event) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for callback, types in subscribers:
+            if types is None or event["type"] in types:
+                callback(event)
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+
+class Subscription:
+    """Bounded queue of events for a thread-per-connection subscriber."""
+
+    def __init__(self, bus: EventBus, types: Optional[Iterable[str]] = None,
+                 backlog: int = SUBSCRIBER_BACKLOG):
+        self.overflowed = False
+        self._queue: "queue.Queue[Event]" = queue.Queue(maxsize=backlog)
+        self._bus = bus
+        self._token = bus.subscribe(self._push, types)
+
+    def _push(self, event: Event) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout: float) -> Optional[Event]:
+        """Next event, or None if nothing arrived within ``timeout`` seconds."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        self._bus.unsubscribe(self._token)
+
+
+class AsyncSubscription:
+    """Same as ``Subscription`` for a connection served by the asyncio loop."""
+
+    def __init__(self, bus: EventBus, types: Optional[Iterable[str]] = None,
+                 backlog: int = SUBSCRIBER_BACKLOG):
+        self.overflowed = False
+        self._loop = asyncio.get_running_loop()
+        self._queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize=backlog)
+        self._bus = bus
+        self._token = bus.subscribe(self._push, types)
+
+    def _push(self, event: Event) -> None:
+        # publish() runs in a DB worker thread
+        self._loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: Event) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout: float) -> Optional[Event]:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self._bus.unsubscribe(self._token)
@@ -0,0 +1,152 @@
+import argparse
+import asyncio
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from client.api import ApiError, CampionatoAPI
+from db.init_db import init_db
+
+from . import app, db
+from .pool import WorkerPool
+
+FOLLOWER_PORT = 5001
+FOLLOWER_DB = str(Path(__file__).resolve().parents[1] / "db" / "follower.db")
+# actions a follower answers; every other one gets READ_ONLY
+FOLLOWER_ACTIONS = app.CACHEABLE_ACTIONS | {"export", "search", "replica_status", "cache_stats"}
+# seconds between polls when no change event arrives
+POLL_INTERVAL = 1.0
+
+
+class Follower:
+    """
+    Copies the primary's committed changes into the local DB. A subscription
+    to the primary wakes it up as soon as a change is committed; every
+    ``poll_interval`` seconds it also checks on its own, in case events were
+    missed. Run it as a read-only server next to the primary::
+
+        python -m server.follower --primary-port 5000 --port 5001 --db db/follower.db
+    """
+
+    def __init__(self, primary: CampionatoAPI, page_size: int = db.CHANGES_PAGE,
+                 poll_interval: float = POLL_INTERVAL):
+        self.primary = primary
+        self.page_size = page_size
+        self.poll_interval = poll_interval
+        self.applied_seq = db.applied_seq()
+        self.primary_seq: Optional[int] = None
+        self.synced_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._events = None
+
+    def sync(self) -> int:
+        """Apply every change the primary has; returns how many were applied."""
+        total = 0
+        while True:
+            changes, last = self.primary.changes_since(self.applied_seq, self.page_size)
+            if changes:
+                with db.transaction():
+                    applied = db.apply_changes(changes)
+                    app.invalidate(*app.change_tags(changes))
+                self.applied_seq = applied
+                total += len(changes)
+            self.primary_seq = last
+            self.synced_at = time.monotonic()
+            self.error = None
+            # the primary may cap pages below page_size: stop on its last seq
+            if not changes or changes[-1][0] >= last:
+                return total
+
+    def status(self) -> Dict[str, Any]:
+        lag = None if self.primary_seq is None else max(self.primary_seq - self.applied_seq, 0)
+        return {
+            "role": "follower",
+            "primary": f"{self.primary.host}:{self.primary.port}",
+            "applied_seq": self.applied_seq,
+            "primary_seq": self.primary_seq,
+            "lag": lag,
+            "seconds_since_sync": None if self.synced_at is None else round(time.monotonic() - self.synced_at, 3),
+            "error": self.error,
+        }
+
+    def run(self) -> None:
+        """Sync until ``stop()``, right after each primary event or every ``poll_interval``."""
+        while not self._stop.is_set():
+            self._wake.clear()
+            if self._events is None:
+                self._subscribe()
+            try:
+                self.sync()
+            except ApiError as e:
+                self.error = str(e)
+            except Exception as e:  # a bad change must not kill the thread silently
+                self.error = f"{type(e).__name__}: {e}"
+            self._wake.wait(self.poll_interval)
+        if self._events is not None:
+            self._events.close()
+
+    def start(self) -> threading.Thread:
+        t = threading.Thread(target=self.run, name="follower", daemon=True)
+        t.start()
+        return t
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def _subscribe(self) -> None:
+        try:
+            self._events = self.primary.subscribe(lambda event: self._wake.set(),
+                                                  on_error=self._events_lost)
+        except ApiError:
+            self._events = None  # polling only until the next attempt
+
+    def _events_lost(self, error: ApiError) -> None:
+        self._events = None
+        self._wake.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Follower in sola lettura del server Campionato")
+    parser.add_argument("--primary-host", default=app.HOST)
+    parser.add_argument("--primary-port", type=int, default=app.PORT)
+    parser.add_argument("--host", default=app.HOST)
+    parser.add_argument("--port", type=int, default=FOLLOWER_PORT)
+    parser.add_argument("--db", default=FOLLOWER_DB, help="file SQLite del follower")
+    parser.add_argument("--mode", choices=("threads", "asyncio"), default="threads")
+    parser.add_argument("--workers", type=int, default=app.DB_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=app.QUEUE_SIZE)
+    parser.add_argument("--pool-size", type=int, default=db.POOL_SIZE)
+    parser.add_argument("--poll", type=float, default=POLL_INTERVAL,
+                        help="secondi tra due controlli se non arrivano eventi dal primario")
+    parser.add_argument("--page-size", type=int, default=db.CHANGES_PAGE,
+                        help="modifiche lette dal primario per richiesta")
+    parser.add_argument("--cache-entries", type=int, default=app.CACHE_ENTRIES)
+    args = parser.parse_args(argv)
+
+    init_db(args.db)
+    # WAL: readers keep going while a batch of changes is applied
+    db.configure(args.db, pool_size=args.pool_size, storage_mode="wal")
+    app.response_cache.max_entries = args.cache_entries
+    app.allowed_actions = FOLLOWER_ACTIONS
+
+    follower = Follower(CampionatoAPI(args.primary_host, args.primary_port),
+                        args.page_size, args.poll)
+    app.replica_status = follower.status
+    follower.start()
+
+    pool = WorkerPool(args.workers, args.queue_size, name="db")
+    if args.mode == "asyncio":
+        try:
+            asyncio.run(app.serve_asyncio(args.host, args.port, pool))
+        except KeyboardInterrupt:
+            pass
+    else:
+        app.serve_threads(args.host, args.port, pool)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from db.init_db import init_db
+
+from . import app, db
+
+# seconds between two reads of the change log by a worker's relay
+RELAY_INTERVAL = 0.05
+# a worker that dies sooner than this after starting is restarted only after
+# RESTART_DELAY, so a worker crashing at startup doesn't spin the CPU
+MIN_UPTIME = 1.0
+RESTART_DELAY = 1.0
+
+# change log row -> event type sent to subscribers
+_EVENT_TYPES = {
+    ("squadre", "insert"): "team_created",
+    ("squadre", "update"): "team_updated",
+    ("squadre", "delete"): "team_deleted",
+    ("giocatori", "insert"): "player_created",
+    ("giocatori", "update"): "player_updated",
+    ("giocatori", "delete"): "player_deleted",
+}
+
+
+def change_event(change: Sequence) -> Optional[Dict[str, Any]]:
+    """
+    The event ``handle_request`` publishes for a change log row, or None
+    when it publishes none: a player released because their team was
+    deleted is covered by that team's ``team_deleted``.
+    """
+    seq, tabella, operazione, id_, riga = change
+    if tabella == "squadre":
+        return {"type": _EVENT_TYPES[tabella, operazione], "id_squadra": id_}
+    event_type = _EVENT_TYPES[tabella, operazione]
+    if operazione == "update":
+        if riga["squadra_eliminata"]:
+            return None
+        if riga["id_squadra_prima"] != riga["id_squadra"]:
+            event_type = "player_transferred"
+    return {"type": event_type, "id_giocatore": id_,
+            "id_squadra": riga["id_squadra"] if riga is not None else None}
+
+
+class ChangeRelay:
+    """
+    Keeps one worker process in step with writes made by the others: it
+    tails the change log, drops the cached responses the changes affect and
+    publishes them to this process's subscribers with the same events
+    ``handle_request`` sends (see ``change_event``).
+    """
+
+    def __init__(self, interval: float = RELAY_INTERVAL):
+        self.interval = interval
+        self.seq = db.last_seq()
+        self._stop = threading.Event()
+
+    def poll(self) -> int:
+        """Handle the changes committed since the last call; returns how many."""
+        changes, _ = db.changes_since(self.seq)
+        if changes:
+            self.seq = changes[-1][0]
+            app.response_cache.invalidate(*app.change_tags(changes))
+            for change in changes:
+                event = change_event(change)
+                if event is not None:
+                    app.events.publish(event)
+        return len(changes)
+
+    def run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:  # keep relaying; the next poll retries
+                print(f"[relay {os.getpid()}] {type(e).__name__}: {e}", file=sys.stderr)
+
+    def start(self) -> threading.Thread:
+        t = threading.Thread(target=self.run, name="change-relay", daemon=True)
+        t.start()
+        return t
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+class Supervisor:
+    """
+    Forks ``processes`` children running ``target`` and forks a new one
+    whenever a child exits, until SIGTERM/SIGINT, which is passed on to the
+    children.
+    """
+
+    def __init__(self, processes: int, target: Callable[[], None],
+                 restart_delay: float = RESTART_DELAY):
+        self.processes = processes
+        self.target = target
+        self.restart_delay = restart_delay
+        self.restarts = 0
+        self._children: Dict[int, float] = {}  # pid -> start time
+        self._stopping = False
+
+    def run(self) -> None:
+        previous = {sig: signal.signal(sig, self._on_signal) for sig in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            self._supervise()
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+
+    def _supervise(self) -> None:
+        for _ in range(self.processes):
+            self._spawn()
+        while self._children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self._children.pop(pid, None)
+            if started is None or self._stopping:
+                continue
+            print(f"[supervisor] worker {pid} terminato ({self._describe(status)}), riavvio",
+                  file=sys.stderr)
+            if time.monotonic() - started < MIN_UPTIME:
+                time.sleep(self.restart_delay)
+            if not self._stopping:
+                self.restarts += 1
+                self._spawn()
+
+    def stop(self) -> None:
+        self._stopping = True
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _on_signal(self, signum, frame) -> None:
+        self.stop()
+
+    def _spawn(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                signal.signal(signal.SIGINT, signal.SIG_IGN)  # the supervisor sends SIGTERM
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                self.target()
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        self._children[pid] = time.monotonic()
+        return pid
+
+    @staticmethod
+    def _describe(status: int) -> str:
+        if os.WIFSIGNALED(status):
+            return f"segnale {os.WTERMSIG(status)}"
+        return f"codice {os.WEXITSTATUS(status)}"
+
+
+def worker(args) -> None:
+    """Body of one worker process: relay + the normal server on the shared port."""
+    app.local_events = False
+    db.configure(pool_size=args.pool_size, storage_mode=args.storage)
+    ChangeRelay().start()  # from the current end of the log
+    app.serve(args, reuse_port=True)
+
+
+def main(argv: Optional[list] = None):
+    parser = app.build_parser()
+    parser.description = "Server Campionato Serie A su più processi (SO_REUSEPORT)"
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1,
+                        help="processi worker che condividono la porta")
+    args = parser.parse_args(argv)
+    if not hasattr(socket, "SO_REUSEPORT"):
+        parser.error("SO_REUSEPORT non è disponibile su questa piattaforma")
+    if args.storage != "wal":
+        # the lock mode's write lock only serialises threads of one process
+        parser.error("con più processi serve --storage wal")
+
+    # schema changes once, before any worker opens the DB
+    init_db(db._DB_PATH)
+    print(f"Avvio di {args.processes} worker su {args.host}:{args.port}")
+    Supervisor(args.processes, lambda: worker(args)).run()
+
+
+if __name__ == "__main__":
+    main()
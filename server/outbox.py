@@ -0,0 +1,112 @@
+import sys
+import threading
+import time
+from email.message import EmailMessage
+from typing import Any, Callable, Dict, List, Optional
+
+from . import db
+from .email import Mailer, team_deleted_message
+
+# seconds between checks for due notifications when nobody calls wake()
+POLL_INTERVAL = 5.0
+# attempts before a notification is marked 'fallita'
+MAX_ATTEMPTS = 8
+# retry n waits BASE_DELAY * 2**(n-1) seconds, at most MAX_DELAY
+BASE_DELAY = 2.0
+MAX_DELAY = 600.0
+# a claimed notification is not picked again for this long (covers the send)
+LEASE = 120.0
+# notifications claimed per DB round trip (and at most per digest)
+CLAIM_BATCH = 50
+
+
+def _team_deleted(dati: List[Dict[str, Any]]) -> EmailMessage:
+    return team_deleted_message([(d["team_name"], d["team_id"]) for d in dati])
+
+
+# email_outbox.tipo -> message for one or more (digest) notifications of that type
+MESSAGES: Dict[str, Callable[[List[Dict[str, Any]]], EmailMessage]] = {
+    "team_deleted": _team_deleted,
+}
+
+
+def retry_delay(attempt: int) -> float:
+    return min(BASE_DELAY * 2 ** (attempt - 1), MAX_DELAY)
+
+
+class OutboxWorker:
+    """
+    Background thread sending the notifications queued in ``email_outbox``,
+    so requests never wait for the mail relay. Everything due is sent over
+    the same ``Mailer`` session. Failed sends are retried with exponential
+    backoff up to ``max_attempts`` times. Claims go through the DB, so
+    several workers or processes can drain the same outbox.
+
+    With ``digest_window`` a notification waits until it is that many seconds
+    old, and every notification of the same type queued meanwhile goes out
+    with it in one message.
+    """
+
+    def __init__(self, mailer: Optional[Mailer] = None, interval: float = POLL_INTERVAL,
+                 max_attempts: int = MAX_ATTEMPTS, digest_window: Optional[float] = None):
+        self.mailer = mailer or Mailer()
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.digest_window = digest_window
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+    def run_once(self) -> int:
+        """Send every notification due now; returns how many were sent."""
+        sent = 0
+        while True:
+            if self.digest_window is None:
+                claimed = db.claim_emails(LEASE, CLAIM_BATCH)
+                groups = [[row] for row in claimed]
+            else:
+                claimed = db.claim_emails(LEASE, CLAIM_BATCH, settle=self.digest_window)
+                by_type: Dict[str, list] = {}
+                for row in claimed:
+                    by_type.setdefault(row[1], []).append(row)
+                groups = list(by_type.values())
+            if not claimed:
+                return sent
+            for group in groups:
+                sent += self._send(group)
+
+    def _send(self, rows: list) -> int:
+        try:
+            if not self.mailer.send(MESSAGES[rows[0][1]]([dati for _, _, dati, _ in rows])):
+                # not sent: keep it queued and retry, SMTP may be configured later
+                raise RuntimeError("SMTP non configurato")
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            for id_email, _, _, attempt in rows:
+                retry_at = time.time() + retry_delay(attempt) if attempt < self.max_attempts else None
+                db.email_failed(id_email, error, retry_at)
+            return 0
+        for id_email, _, _, _ in rows:
+            db.email_sent(id_email)
+        return len(rows)
+
+    def run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.run_once()
+            except Exception as e:  # e.g. DB busy: try again on the next round
+                print(f"[outbox] {type(e).__name__}: {e}", file=sys.stderr)
+            self._wake.wait(self.interval)
+
+    def wake(self) -> None:
+        """Check the outbox now instead of at the next poll."""
+        self._wake.set()
+
+    def start(self) -> threading.Thread:
+        t = threading.Thread(target=self.run, name="email-outbox", daemon=True)
+        t.start()
+        return t
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
@@ -0,0 +1,56 @@
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+
+class Overloaded(Exception):
+    pass
+
+
+class WorkerPool:
+    """
+    Fixed number of worker threads fed by a bounded queue.
+
+    ``submit`` never blocks: when ``queue_size`` jobs are already waiting it
+    raises ``Overloaded`` so the caller can reject the request right away
+    instead of letting latency grow for everybody.
+    """
+
+    def __init__(self, workers: int = 16, queue_size: int = 256, name: str = "worker"):
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        for i in range(workers):
+            t = threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, fn: Callable, *args) -> Future:
+        fut: Future = Future()
+        try:
+            self._queue.put_nowait((fut, fn, args))
+        except queue.Full:
+            raise Overloaded("Server sovraccarico, riprova più tardi") from None
+        return fut
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def shutdown(self) -> None:
+        for _ in self._threads:
+            self._queue.put(None)
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            fut, fn, args = job
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                fut.set_exception(e)
+            else:
+                fut.set_result(result)
@@ -6,3 +6,8 @@ def encode_message(obj: Dict[str, Any]) -> bytes:
 
 def decode_message(line: bytes) -> Dict[str, Any]:
     return json.loads(line.decode("utf-8"))
+
+def with_field(line: bytes, key: str, value: Any) -> bytes:
+    """Add ``key`` to an already-encoded message without decoding it again."""
+    extra = f", {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)}}}\n"
+    return line[:-2] + extra.encode("utf-8")
@@ -0,0 +1,56 @@
+"""
+Round-trip latency of CampionatoAPI: a new TCP connection per call (the
+old ``_send`` behaviour) against the persistent connection.
+
+    python -m tests.bench_api [calls]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+os.environ["SMTP_SENDER"] = ""
+
+from client.api import CampionatoAPI
+from db.init_db import init_db
+from server import app, db
+
+PORT = 5099
+
+
+def timed(label: str, fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    per_call = (time.perf_counter() - start) / calls * 1e6
+    print(f"{label:<32} {per_call:8.1f} us/call")
+    return per_call
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "bench.db")
+        init_db(path)
+        db.configure(path)
+        for i in range(20):
+            db.create_team(f"Club {i}", "Roma", 1900 + i, 1000.0)
+
+        threading.Thread(target=app.serve_threads, args=(app.HOST, PORT), daemon=True).start()
+        time.sleep(0.3)
+
+        def new_connection_each_call():
+            api = CampionatoAPI(port=PORT)
+            api.list_teams()
+            api.close()
+
+        persistent = CampionatoAPI(port=PORT)
+        before = timed("list_teams (connect per call)", new_connection_each_call, calls)
+        after = timed("list_teams (persistent)", persistent.list_teams, calls)
+        print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Per-request overhead of server/db.py: a new connection per call (the old
+``_connect()`` behaviour) against the pooled connections.
+
+    python -m tests.bench_db [calls]
+"""
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from db.init_db import init_db
+from server import db
+
+
+def fresh_connection_list_teams(path: str):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    with conn:
+        rows = conn.execute(
+            "SELECT id_squadra, nome_club, citta, anno_fondazione, budget FROM squadre ORDER BY nome_club"
+        ).fetchall()
+    conn.close()
+    return rows
+
+
+def timed(label: str, fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    per_call = (time.perf_counter() - start) / calls * 1e6
+    print(f"{label:<28} {per_call:8.1f} us/call")
+    return per_call
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "bench.db")
+        init_db(path)
+        db.configure(path)
+        for i in range(20):
+            db.create_team(f"Club {i}", "Roma", 1900 + i, 1000.0)
+        team_id = db.list_teams()[0][0]
+
+        before = timed("list_teams (new conn)", lambda: fresh_connection_list_teams(path), calls)
+        after = timed("list_teams (pooled)", db.list_teams, calls)
+        timed("get_team_by_id (pooled)", lambda: db.get_team_by_id(team_id), calls)
+        print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import asyncio
+import email
+import os
+import socket
+import socketserver
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+# never reach the real mail relay configured in .env from the test suite
+os.environ["SMTP_SENDER"] = ""
+os.environ["SMTP_PASSWORD"] = ""
+
+from db.init_db import init_db
+from server import app, db
+from server.cache import ResponseCache
+from server.pool import WorkerPool
+from server.protocol import decode_message
+
+
+@pytest.fixture
+def temp_db(tmp_path):
+    """Fresh, initialised database file; server.db points at it for the test."""
+    old_path, old_mode = db._DB_PATH, db._storage_mode
+    path = str(tmp_path / "campionato.db")
+    init_db(path)
+    db.configure(path)
+    yield path
+    db.configure(old_path, storage_mode=old_mode)
+
+
+@pytest.fixture
+def wal_db(temp_db):
+    """``temp_db`` in WAL mode (needed by streaming)."""
+    db.configure(storage_mode="wal")
+    return temp_db
+
+
+@pytest.fixture
+def league(temp_db, monkeypatch):
+    """Two teams and one player of the first, behind an empty response cache."""
+    monkeypatch.setattr(app, "response_cache", ResponseCache(max_entries=16))
+    team_a = db.create_team("Team A", "Roma", 1900, 1_000_000.0)
+    team_b = db.create_team("Team B", "Milano", 1910, 2_000_000.0)
+    player = db.create_player("Mario", "Rossi", "Attaccante", 9, team_a)
+    return team_a, team_b, player
+
+
+@pytest.fixture
+def call():
+    """``call(action, **data)``: the decoded reply of ``app.respond``."""
+    return lambda action, **data: decode_message(app.respond({"action": action, "data": data}))
+
+
+class RecordingConnection:
+    """Connection wrapper recording ``(sql, params)`` for each statement executed."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.queries = []
+
+    def execute(self, sql, params=()):
+        self.queries.append((sql, params))
+        return self._conn.execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        if seq_of_params:
+            self.queries.append((sql, seq_of_params[0]))
+        return self._conn.executemany(sql, seq_of_params)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+@pytest.fixture
+def recording():
+    """
+    ``with recording() as rec:`` inside ``db.transaction()`` collects in
+    ``rec.queries`` the statements the db functions run. Statements run by
+    triggers (e.g. the ``versioni`` bumps) are not seen.
+    """
+    @contextmanager
+    def record():
+        conn = db._local.conn
+        rec = db._local.conn = RecordingConnection(conn)
+        try:
+            yield rec
+        finally:
+            db._local.conn = conn
+    return record
+
+
+class LocalServer:
+    """``client_thread`` or ``client_coroutine`` serving a local port from a background thread."""
+
+    def __init__(self, mode, pool):
+        self.pool = pool
+        self._sock = socket.create_server(("127.0.0.1", 0))
+        self.port = self._sock.getsockname()[1]
+        if mode == "threads":
+            threading.Thread(target=self._accept, daemon=True).start()
+            self._loop = None
+        else:
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._loop.run_forever, daemon=True).start()
+            self._server = asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, addr = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=app.client_thread, args=(conn, addr, self.pool), daemon=True).start()
+
+    async def _start(self):
+        return await asyncio.start_server(
+            lambda r, w: app.client_coroutine(r, w, self.pool), sock=self._sock, limit=app.MAX_LINE)
+
+    def connect(self):
+        conn = socket.create_connection(("127.0.0.1", self.port), timeout=5)
+        return conn, conn.makefile("rb")
+
+    def close(self):
+        if self._loop is None:
+            self._sock.close()
+        else:
+            async def stop():
+                self._server.close()
+                await self._server.wait_closed()
+            asyncio.run_coroutine_threadsafe(stop(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self.pool.shutdown()
+
+
+@pytest.fixture(params=["threads", "asyncio"])
+def serve(request, temp_db):
+    """``serve(workers=4, queue_size=QUEUE_SIZE)`` -> a running ``LocalServer`` in each mode."""
+    servers = []
+
+    def start(workers=4, queue_size=app.QUEUE_SIZE):
+        server = LocalServer(request.param, WorkerPool(workers, queue_size, name="test-db"))
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+class StandInSMTP:
+    """
+    Minimal local SMTP server (EHLO, AUTH, MAIL/RCPT/DATA, RSET, NOOP, QUIT)
+    recording every message it accepts. ``fail_next`` makes that many
+    deliveries fail with a temporary 451 error.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = 0
+        self.logins = 0
+        self.fail_next = 0
+        self._lock = threading.Lock()
+        outer = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                with outer._lock:
+                    outer.sessions += 1
+                self.reply("220 stand-in ESMTP")
+                for line in self.rfile:
+                    command = line.decode().strip()
+                    verb = command.split(" ", 1)[0].upper()
+                    if verb in ("EHLO", "HELO"):
+                        self.reply("250-stand-in\r\n250 AUTH PLAIN LOGIN")
+                    elif verb == "AUTH":
+                        with outer._lock:
+                            outer.logins += 1
+                        self.reply("235 ok")
+                    elif verb == "MAIL":
+                        with outer._lock:
+                            failing = outer.fail_next > 0
+                            outer.fail_next -= failing
+                        self.reply("451 try again later" if failing else "250 ok")
+                    elif verb in ("RCPT", "RSET", "NOOP"):
+                        self.reply("250 ok")
+                    elif verb == "DATA":
+                        self.reply("354 go ahead")
+                        data = []
+                        for body in self.rfile:
+                            if body == b".\r\n":
+                                break
+                            data.append(body)
+                        with outer._lock:
+                            outer.messages.append(email.message_from_bytes(b"".join(data)))
+                        self.reply("250 queued")
+                    elif verb == "QUIT":
+                        self.reply("221 bye")
+                        return
+                    else:
+                        self.reply("502 not implemented")
+
+            def reply(self, text):
+                self.wfile.write(text.encode() + b"\r\n")
+
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    """A ``StandInSMTP`` on localhost, with the SMTP_* variables pointing at it."""
+    server = StandInSMTP()
+    for name, value in {"SMTP_HOST": "127.0.0.1", "SMTP_PORT": str(server.port),
+                        "SMTP_SENDER": "lega@example.test", "SMTP_PASSWORD": "secret",
+                        "SMTP_RECIPIENT": "admin@example.test", "SMTP_STARTTLS": "0"}.items():
+        monkeypatch.setenv(name, value)
+    yield server
+    server.close()
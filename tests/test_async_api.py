@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from client.api import ApiError
+from client.async_api import AsyncCampionatoAPI
+from server import db
+
+
+@pytest.fixture
+def run(serve):
+    """``run(coro_fn)``: await ``coro_fn(api)`` against a local server."""
+    server = serve()
+
+    def run(coro_fn, **kwargs):
+        async def main():
+            async with AsyncCampionatoAPI("127.0.0.1", server.port, **kwargs) as api:
+                return await coro_fn(api)
+        return asyncio.run(main())
+
+    return run
+
+
+def test_concurrent_calls_get_their_own_replies(run):
+    async def scenario(api):
+        teams = await asyncio.gather(*(api.create_team(f"Team {i}", "Roma", 1900, 1.0) for i in range(20)))
+        players = await asyncio.gather(*(api.create_player("Mario", f"Rossi{i}", "Attaccante", 9, t)
+                                         for i, t in enumerate(teams)))
+        rosters = await asyncio.gather(*(api.list_players_by_team(t) for t in teams))
+        return players, rosters
+
+    players, rosters = run(scenario, pool_size=2)
+    assert [[row[0] for row in roster] for roster in rosters] == [[p] for p in players]
+
+
+def test_errors_raise_api_error(run):
+    async def scenario(api):
+        with pytest.raises(ApiError, match="Squadra non trovata"):
+            await api.delete_team(9999)
+        return await api.list_teams()  # the connection is still usable
+
+    assert run(scenario) == []
+
+
+def test_fetch_if_modified(run):
+    async def scenario(api):
+        rows, version = await api.fetch_if_modified("list_teams")
+        unchanged = await api.fetch_if_modified("list_teams", if_version=version)
+        await api.create_team("Team A", "Roma", 1900, 1.0)
+        changed = await api.fetch_if_modified("list_teams", if_version=version)
+        return rows, version, unchanged, changed
+
+    rows, version, unchanged, changed = run(scenario)
+    assert rows == [] and unchanged == (None, version)
+    assert [row[1] for row in changed[0]] == ["Team A"] and changed[1] > version
+
+
+def test_stream_and_export(run, wal_db):
+    team = db.create_team("Team A", "Roma", 1900, 1.0)
+    for i in range(5):
+        db.create_player("Mario", f"Rossi{i}", "Attaccante", i + 1, team)
+
+    async def scenario(api):
+        streamed = [row async for row in api.stream("list_players_by_team", {"id_squadra": team}, chunk_size=2)]
+        exported = [row async for row in api.export(chunk_size=2)]
+        return streamed, exported, await api.list_players_by_team(team)
+
+    streamed, exported, listed = run(scenario)
+    assert streamed == listed
+    assert len(exported) == 5
+
+
+def test_stream_needs_wal(run):
+    async def scenario(api):
+        return [row async for row in api.stream_teams()]
+
+    with pytest.raises(ApiError, match="STREAMING_UNAVAILABLE"):
+        run(scenario)
@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+from server import app, db
+
+
+def batch(requests, atomic=False):
+    return app.handle_request({"action": "batch", "data": {"requests": requests, "atomic": atomic}})
+
+
+def create_team(name):
+    return {"action": "create_team",
+            "data": {"nome_club": name, "citta": "Roma", "anno_fondazione": 1900, "budget": 1.0}}
+
+
+def teams():
+    return [row[1] for row in db.list_teams()]
+
+
+@pytest.fixture
+def team(temp_db):
+    return db.create_team("Team A", "Roma", 1900, 1.0)
+
+
+def test_failing_item_is_rolled_back_alone(team, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("outbox down")
+
+    # delete_team deletes the team, then fails queueing its email
+    monkeypatch.setattr(db, "enqueue_email", fail)
+    resp = batch([create_team("Team B"), {"action": "delete_team", "data": {"id_squadra": team}},
+                  create_team("Team C")])
+
+    assert resp["ok"] is True
+    assert [item["ok"] for item in resp["data"]] == [True, False, True]
+    assert teams() == ["Team A", "Team B", "Team C"]
+
+
+def test_atomic_batch_is_rolled_back_whole(team):
+    resp = batch([create_team("Team B"), {"action": "delete_team", "data": {"id_squadra": 9999}}],
+                 atomic=True)
+
+    assert resp["ok"] is False
+    assert resp["error"]["index"] == 1
+    assert resp["error"]["message"].startswith("Operazione 1 fallita, batch annullato")
+    assert teams() == ["Team A"]
+
+
+def test_nested_batch_is_rejected(team):
+    resp = batch([{"action": "batch", "data": {"requests": [create_team("Team B")]}}, create_team("Team C")])
+
+    assert resp["data"][0]["error"]["code"] == "BAD_REQUEST"
+    assert resp["data"][1]["ok"] is True
+    assert teams() == ["Team A", "Team C"]
+
+
+def test_rolled_back_item_drops_its_after_commit_hooks(temp_db):
+    ran = []
+    with db.transaction():
+        db.after_commit(lambda: ran.append("kept"))
+        with pytest.raises(RuntimeError):
+            with db.savepoint():
+                db.after_commit(lambda: ran.append("dropped"))
+                raise RuntimeError("undo")
+        assert ran == []
+    assert ran == ["kept"]
+
+
+def test_failed_item_publishes_no_event(team, monkeypatch):
+    events = []
+    token = app.events.subscribe(events.append)
+    monkeypatch.setattr(app, "local_events", True)
+    try:
+        batch([create_team("Team B"), {"action": "delete_team", "data": {"id_squadra": 9999}}])
+    finally:
+        app.events.unsubscribe(token)
+    assert [e["type"] for e in events] == ["team_created"]
+
+
+def test_read_only_batch_skips_the_write_lock(team, monkeypatch):
+    monkeypatch.setattr(db, "_storage_mode", "lock")
+    done = threading.Event()
+    with db._write_lock:  # a writer holding the lock
+        t = threading.Thread(target=lambda: done.set() if batch([
+            {"action": "list_teams", "data": {}},
+            {"action": "list_free_agents", "data": {}},
+        ])["ok"] else None)
+        t.start()
+        assert done.wait(2)
+    t.join()
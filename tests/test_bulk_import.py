@@ -0,0 +1,71 @@
+import json
+
+from db import import_data
+from server import db
+
+
+def test_bulk_import_resolves_team_names(temp_db):
+    existing = db.create_team("Team A", "Roma", 1900, 1.0)
+    teams = [{"nome_club": "Team B", "citta": "Milano", "anno_fondazione": "1910", "budget": "2.5"}]
+    players = [
+        {"nome": "Mario", "cognome": "Rossi", "ruolo": "Attaccante", "numero_maglia": 9, "squadra": "Team A"},
+        {"nome": "Luca", "cognome": "Bianchi", "ruolo": "Portiere", "numero_maglia": "1",
+         "gol_segnati": "3", "squadra": "Team B"},
+        {"nome": "Paolo", "cognome": "Verdi", "ruolo": "Difensore", "numero_maglia": 4, "squadra": ""},
+    ]
+
+    assert db.bulk_import(teams, players, chunk_size=2) == (1, 3)
+
+    team_b = [t for t in db.list_teams() if t[1] == "Team B"][0]
+    assert team_b[2:] == ("Milano", 1910, 2.5)
+    assert [p[2] for p in db.list_players_by_team(existing)] == ["Rossi"]
+    assert [p[2] for p in db.list_players_by_team(team_b[0])] == ["Bianchi"]
+    assert [(p[2], p[5]) for p in db.list_free_agents()] == [("Verdi", 0)]
+
+
+def test_rejected_rows_are_reported_and_skipped(temp_db):
+    db.create_team("Team A", "Roma", 1900, 1.0)
+    rejects = []
+    teams = [
+        {"nome_club": "Team A", "citta": "Roma", "anno_fondazione": 1900},
+        {"nome_club": "Team B", "citta": "Milano", "anno_fondazione": 1800},
+        {"nome_club": "Team C", "citta": "Napoli", "anno_fondazione": 1926},
+        {"nome_club": "Team C", "citta": "Napoli", "anno_fondazione": 1926},
+    ]
+    players = [
+        {"nome": "Mario", "cognome": "Rossi", "ruolo": "Mago", "numero_maglia": 9},
+        {"nome": "Mario", "cognome": "Rossi", "ruolo": "Attaccante", "numero_maglia": "nove"},
+        {"nome": "Mario", "cognome": "Rossi", "ruolo": "Attaccante", "numero_maglia": 9, "squadra": "Team Z"},
+        {"cognome": "Rossi", "ruolo": "Attaccante", "numero_maglia": 9},
+        {"nome": "Mario", "cognome": "Rossi", "ruolo": "Attaccante", "numero_maglia": 9, "squadra": "Team C"},
+    ]
+
+    counts = db.bulk_import(teams, players, lambda kind, n, row, why: rejects.append((kind, n, why)))
+
+    assert counts == (1, 1)
+    assert [(kind, n) for kind, n, _ in rejects] == [
+        ("squadre", 1), ("squadre", 2), ("squadre", 4),
+        ("giocatori", 1), ("giocatori", 2), ("giocatori", 3), ("giocatori", 4),
+    ]
+    assert rejects[0][2] == "squadra già presente: Team A"
+    assert rejects[5][2] == "squadra sconosciuta: Team Z"
+
+
+def test_cli_reads_csv_and_jsonl(temp_db, tmp_path, capsys):
+    teams = tmp_path / "squadre.csv"
+    teams.write_text("nome_club,citta,anno_fondazione,budget\nTeam A,Roma,1900,10\n", encoding="utf-8")
+    players = tmp_path / "giocatori.jsonl"
+    players.write_text(
+        json.dumps({"nome": "Mario", "cognome": "Rossi", "ruolo": "Attaccante",
+                    "numero_maglia": 9, "squadra": "Team A"}) + "\nnot json\n",
+        encoding="utf-8",
+    )
+    rejects = tmp_path / "scarti.txt"
+
+    code = import_data.main(["--teams", str(teams), "--players", str(players),
+                             "--db", temp_db, "--rejects", str(rejects)])
+
+    assert code == 1
+    assert "Importate 1 squadre e 1 giocatori, 1 righe scartate" in capsys.readouterr().out
+    assert rejects.read_text(encoding="utf-8").startswith("giocatori riga 2: ")
+    assert [p[2] for p in db.list_players_by_team(db.list_teams()[0][0])] == ["Rossi"]
@@ -0,0 +1,79 @@
+import sqlite3
+
+import pytest
+
+from client.api import CampionatoAPI
+from server import db
+
+
+def test_every_mutation_is_logged_in_order(league):
+    team_a, _, player = league
+    teammate = db.create_player("Luca", "Bianchi", "Portiere", 1, team_a)
+    _, start = db.changes_since(0)
+    db.update_player(player, "Luca", "Rossi", "Attaccante", 9)
+    db.transfer_player(player, None)
+    db.delete_player(teammate)
+
+    changes, last = db.changes_since(start)
+    assert [(c[1], c[2], c[3]) for c in changes] == [
+        ("giocatori", "update", player),
+        ("giocatori", "update", player),
+        ("giocatori", "delete", teammate),
+    ]
+    assert changes[0][4]["nome"] == "Luca"
+    assert changes[1][4]["id_squadra"] is None
+    assert changes[2][4] is None
+    assert last == changes[-1][0]
+
+
+def test_delete_team_logs_each_released_player(league, call):
+    team_a, _, player = league
+    teammate = db.create_player("Luca", "Bianchi", "Portiere", 1, team_a)
+    _, start = db.changes_since(0)
+    call("delete_team", id_squadra=team_a)
+
+    changes, _ = db.changes_since(start)
+    assert [(c[1], c[2], c[3]) for c in changes] == [
+        ("giocatori", "update", player),
+        ("giocatori", "update", teammate),
+        ("squadre", "delete", team_a),
+    ]
+
+
+def test_rolled_back_writes_are_not_logged(league):
+    _, start = db.changes_since(0)
+    with pytest.raises(sqlite3.IntegrityError):
+        db.create_team("Team A", "Roma", 1900, 1.0)
+    assert db.changes_since(start) == ([], start)
+
+
+def test_changes_since_action_pages(league, call):
+    first = call("changes_since", seq=0, limit=2)
+    assert [c[0] for c in first["data"]] == [1, 2]
+    assert first["next"] == 2
+    assert first["last_seq"] == 3
+
+    rest = call("changes_since", seq=first["next"], limit=2)
+    assert [c[0] for c in rest["data"]] == [3]
+    assert rest["next"] is None
+
+
+def test_changes_since_action_caps_the_page(league, call, monkeypatch):
+    monkeypatch.setattr(db, "CHANGES_PAGE", 1)
+    monkeypatch.setattr(db, "CHANGES_MAX_PAGE", 2)
+
+    assert [c[0] for c in call("changes_since", seq=0, limit=None)["data"]] == [1]
+    assert [c[0] for c in call("changes_since", seq=0)["data"]] == [1]
+    resp = call("changes_since", seq=0, limit=100)
+    assert [c[0] for c in resp["data"]] == [1, 2]
+    assert resp["next"] == 2
+
+
+def test_iter_changes_follows_capped_pages(serve, monkeypatch):
+    server = serve()
+    monkeypatch.setattr(db, "CHANGES_MAX_PAGE", 5)
+    for i in range(12):
+        db.create_team(f"Team {i}", "Roma", 1900, 1.0)
+
+    with CampionatoAPI("127.0.0.1", server.port) as api:
+        assert [c[0] for c in api.iter_changes(page_size=20)] == list(range(1, 13))
@@ -0,0 +1,131 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from client.api import ApiError, CampionatoAPI
+
+
+class ScriptedServer:
+    """
+    Line server answering the n-th request of the c-th connection as
+    ``scripts[c][n]`` says: ``"reply"``, ``"close"`` (reply, then close the
+    connection), ``"drop"`` (close without replying) or ``"hang"`` (never
+    reply). Past the end of its script a connection keeps replying.
+    Every request received is recorded in ``actions``.
+    """
+
+    def __init__(self, *scripts):
+        self.scripts = list(scripts)
+        self.actions = []
+        self._sock = socket.create_server(("127.0.0.1", 0))
+        self.port = self._sock.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            script = self.scripts.pop(0) if self.scripts else []
+            threading.Thread(target=self._serve, args=(conn, script), daemon=True).start()
+
+    def _serve(self, conn, script):
+        with conn:
+            for n, line in enumerate(conn.makefile("rb")):
+                req = json.loads(line)
+                self.actions.append(req["action"])
+                step = script[n] if n < len(script) else "reply"
+                if step == "drop":
+                    return
+                if step == "hang":
+                    time.sleep(2)
+                    return
+                data = [] if req["action"] == "list_teams" else {"id_giocatore": 1}
+                reply = {"ok": True, "data": data, "version": 1}
+                conn.sendall(json.dumps(reply).encode() + b"\n")
+                if step == "close":
+                    return
+
+    def close(self):
+        self._sock.close()
+
+
+@pytest.fixture
+def scripted():
+    """``scripted(*scripts)`` -> ``(server, client)`` talking to a ScriptedServer."""
+    servers = []
+
+    def make(*scripts):
+        server = ScriptedServer(*scripts)
+        servers.append(server)
+        return server, CampionatoAPI("127.0.0.1", server.port, timeout=0.3)
+
+    yield make
+    for server in servers:
+        server.close()
+
+
+def create_player(api):
+    return api.create_player("Mario", "Rossi", "Attaccante", 9, None)
+
+
+def test_connection_is_reused(scripted):
+    server, api = scripted()
+    api.list_teams()
+    create_player(api)
+    assert server.actions == ["list_teams", "create_player"]
+
+
+def test_idle_connection_closed_by_the_server_is_replaced(scripted):
+    server, api = scripted(["close"])
+    api.list_teams()
+    time.sleep(0.1)
+
+    assert create_player(api) == 1
+    assert server.actions == ["list_teams", "create_player"]
+
+
+def test_write_is_not_sent_again_when_the_reply_is_lost(scripted):
+    server, api = scripted(["reply", "drop"])
+    api.list_teams()
+
+    with pytest.raises(ApiError):
+        create_player(api)
+    time.sleep(0.1)
+    assert server.actions == ["list_teams", "create_player"]
+
+
+def test_read_is_sent_again_when_the_reply_is_lost(scripted):
+    server, api = scripted(["reply", "drop"])
+    api.list_teams()
+
+    assert api.list_teams() == []
+    assert server.actions == ["list_teams"] * 3
+
+
+def test_timeout_is_not_retried(scripted):
+    server, api = scripted(["hang"])
+
+    with pytest.raises(ApiError, match="Timeout"):
+        create_player(api)
+    time.sleep(0.1)
+    assert server.actions == ["create_player"]
+    assert api.list_teams() == []  # on a new connection
+
+
+def test_conditional_reads_go_to_the_primary(scripted):
+    primary, _ = scripted()
+    follower, _ = scripted()
+    api = CampionatoAPI("127.0.0.1", primary.port, timeout=0.3,
+                        followers=[("127.0.0.1", follower.port)])
+
+    api.list_teams()
+    rows, version = api.fetch_if_modified("list_teams")
+    api.fetch_if_modified("list_teams", if_version=version)
+
+    assert follower.actions == ["list_teams"]
+    assert primary.actions == ["list_teams", "list_teams"]
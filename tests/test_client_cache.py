@@ -0,0 +1,51 @@
+import pytest
+
+from client.api import CampionatoAPI
+from client.cache import CachedCampionatoAPI
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Fake server behind ``CampionatoAPI._send``: a team list, plus a hook run mid-read."""
+    state = {"teams": ["Team A"], "during_read": None, "reads": 0}
+
+    def send(api, req):
+        if req["action"] == "create_team":
+            state["teams"].append(req["data"]["nome_club"])
+            return {"ok": True, "data": {"id_squadra": len(state["teams"])}}
+        state["reads"] += 1
+        data = list(state["teams"])  # the server answers before the write below commits
+        if state["during_read"]:
+            hook, state["during_read"] = state["during_read"], None
+            hook()
+        return {"ok": True, "data": data}
+
+    monkeypatch.setattr(CampionatoAPI, "_send", send)
+    return state
+
+
+@pytest.fixture
+def api():
+    return CachedCampionatoAPI(ttls={"list_teams": 60.0})
+
+
+def test_repeated_read_is_a_hit(server, api):
+    assert api.list_teams() == ["Team A"]
+    assert api.list_teams() == ["Team A"]
+    assert server["reads"] == 1
+    assert api.cache_stats()["hits"] == 1
+
+
+def test_own_write_drops_the_cached_read(server, api):
+    api.list_teams()
+    api.create_team("Team B", "Milano", 1899, 1.0)
+    assert api.list_teams() == ["Team A", "Team B"]
+
+
+def test_read_overtaken_by_a_write_is_not_stored(server, api):
+    # another thread writes while the read is on the wire
+    server["during_read"] = lambda: api.create_team("Team B", "Milano", 1899, 1.0)
+
+    assert api.list_teams() == ["Team A"]
+    assert api.list_teams() == ["Team A", "Team B"]
+    assert server["reads"] == 2
@@ -0,0 +1,113 @@
+import sqlite3
+import threading
+
+import pytest
+
+from server import db
+from server.pool import Overloaded
+
+
+class FailingRollback:
+    """Stand-in for a connection left in a transaction it can no longer roll back."""
+
+    in_transaction = True
+
+    def __init__(self):
+        self.closed = False
+
+    def rollback(self):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def make_pool(temp_db):
+    """Build ``db.ConnectionPool``s on the test database; all closed afterwards."""
+    pools = []
+
+    def make(**kwargs):
+        kwargs.setdefault("acquire_timeout", 0.1)
+        pool = db.ConnectionPool(temp_db, **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def test_released_connections_are_reused(make_pool):
+    pool = make_pool(max_size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+
+
+def test_acquire_is_capped_at_max_size(make_pool):
+    pool = make_pool(max_size=2)
+    held = [pool.acquire(), pool.acquire()]
+    with pytest.raises(Overloaded):
+        pool.acquire()
+
+    pool.release(held.pop())
+    assert pool.acquire() is not None
+
+
+def test_acquire_waits_for_a_release(make_pool):
+    pool = make_pool(max_size=1, acquire_timeout=5.0)
+    conn = pool.acquire()
+    timer = threading.Timer(0.1, pool.release, (conn,))
+    timer.start()
+    try:
+        assert pool.acquire() is conn
+    finally:
+        timer.cancel()
+
+
+def test_release_rolls_back_an_open_transaction(make_pool):
+    pool = make_pool(max_size=1)
+    with pool.connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("INSERT INTO squadre (nome_club, citta, anno_fondazione, budget) "
+                     "VALUES ('Team A', 'Roma', 1900, 1.0)")
+    with pool.connection() as conn:
+        assert not conn.in_transaction
+        assert conn.execute("SELECT COUNT(*) FROM squadre").fetchone()[0] == 0
+
+
+def test_connection_that_fails_to_roll_back_is_dropped(make_pool):
+    pool = make_pool(max_size=1)
+    broken = FailingRollback()
+    pool.acquire()
+    pool.release(broken)
+
+    assert broken.closed
+    # the slot is free again and the next caller gets a fresh connection
+    conn = pool.acquire()
+    assert conn is not broken
+    assert conn.execute("SELECT 1").fetchone() == (1,)
+
+
+def test_idle_connections_are_checked_before_reuse(make_pool):
+    pool = make_pool(max_size=1, health_check_after=0.0)
+    with pool.connection() as stale:
+        pass
+    stale.close()
+
+    with pool.connection() as conn:
+        assert conn is not stale
+        assert conn.execute("SELECT 1").fetchone() == (1,)
+
+
+def test_recently_used_connections_skip_the_check(make_pool, monkeypatch):
+    pool = make_pool(max_size=1, health_check_after=3600.0)
+    checked = []
+    monkeypatch.setattr(pool, "_healthy", lambda conn: checked.append(conn) or True)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    assert checked == []
@@ -0,0 +1,54 @@
+import pytest
+
+from server import db
+
+
+def versions(team_a, team_b):
+    return (db.get_version(db.TEAMS_VERSION), db.get_version(db.roster_version(team_a)),
+            db.get_version(db.roster_version(team_b)), db.get_version(db.FREE_AGENTS_VERSION))
+
+
+def test_list_responses_carry_the_version(league, call):
+    team_a, _, _ = league
+    assert call("list_teams")["version"] == db.get_version(db.TEAMS_VERSION) == 2
+    assert call("list_players_by_team", id_squadra=team_a)["version"] == 1
+    assert call("list_free_agents")["version"] == 0
+
+
+def test_each_write_bumps_only_what_it_changes(league):
+    team_a, team_b, player = league
+    before = versions(team_a, team_b)
+
+    db.transfer_player(player, team_b)
+    after = versions(team_a, team_b)
+    assert [a - b for a, b in zip(after, before)] == [0, 1, 1, 0]
+
+    db.update_player(player, "Mario", "Rossi", "Portiere", 1)
+    assert [a - b for a, b in zip(versions(team_a, team_b), after)] == [0, 0, 1, 0]
+
+
+def test_delete_team_bumps_teams_roster_and_free_agents(league, call):
+    team_a, team_b, _ = league
+    before = versions(team_a, team_b)
+    call("delete_team", id_squadra=team_a)
+    assert [a - b for a, b in zip(versions(team_a, team_b), before)] == [1, 1, 0, 1]
+
+
+def test_if_version_answers_not_modified_until_a_write(league, call):
+    team_a, _, player = league
+    version = call("list_players_by_team", id_squadra=team_a)["version"]
+
+    resp = call("list_players_by_team", id_squadra=team_a, if_version=version)
+    assert resp == {"ok": True, "not_modified": True, "version": version}
+
+    call("update_player", id_giocatore=player, nome="Luca", cognome="Rossi",
+         ruolo="Attaccante", numero_maglia=9)
+    resp = call("list_players_by_team", id_squadra=team_a, if_version=version)
+    assert resp["version"] == version + 1
+    assert resp["data"][0][1] == "Luca"
+
+
+def test_if_version_inside_batch(league, call):
+    version = call("list_teams")["version"]
+    resp = call("batch", requests=[{"action": "list_teams", "data": {"if_version": version}}])
+    assert resp["data"] == [{"ok": True, "not_modified": True, "version": version}]
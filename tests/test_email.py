@@ -0,0 +1,52 @@
+import time
+
+from server.email import Mailer, SMTPConfig, team_deleted_message
+
+
+def test_messages_reuse_one_session(smtp_server):
+    mailer = Mailer()
+    for i in range(3):
+        mailer.send(team_deleted_message([(f"Team {i}", i)]))
+    mailer.close()
+
+    assert len(smtp_server.messages) == 3
+    assert smtp_server.sessions == smtp_server.logins == 1
+    assert smtp_server.messages[0]["From"] == "lega@example.test"
+
+
+def test_config_is_read_once(smtp_server, monkeypatch):
+    mailer = Mailer()
+    mailer.send(team_deleted_message([("Team A", 1)]))
+    monkeypatch.setenv("SMTP_RECIPIENT", "other@example.test")
+    mailer.send(team_deleted_message([("Team B", 2)]))
+    mailer.close()
+
+    assert [m["To"] for m in smtp_server.messages] == ["admin@example.test"] * 2
+
+
+def test_reconnects_when_the_session_was_dropped(smtp_server):
+    mailer = Mailer()
+    mailer.send(team_deleted_message([("Team A", 1)]))
+    mailer._smtp.close()  # as if the server had closed the idle connection
+    mailer.send(team_deleted_message([("Team B", 2)]))
+    mailer.close()
+
+    assert len(smtp_server.messages) == 2
+    assert smtp_server.sessions == 2
+
+
+def test_idle_session_is_closed(smtp_server):
+    mailer = Mailer(idle_timeout=0.05)
+    mailer.send(team_deleted_message([("Team A", 1)]))
+    time.sleep(0.3)
+    assert mailer._smtp is None
+    mailer.send(team_deleted_message([("Team B", 2)]))
+    mailer.close()
+    assert smtp_server.sessions == 2
+
+
+def test_unconfigured_mailer_skips(smtp_server, caplog):
+    config = SMTPConfig("127.0.0.1", smtp_server.port, None, None, None)
+    assert Mailer(config).send(team_deleted_message([("Team A", 1)])) is False
+    assert smtp_server.sessions == 0
+    assert "variabili SMTP non impostate" in caplog.text
@@ -0,0 +1,88 @@
+import csv
+import json
+import sqlite3
+
+import pytest
+
+from client.api import EXPORT_COLUMNS
+from db import export_data
+from server import app, db
+
+
+def _fill(path):
+    team_a = db.create_team("Team A", "Roma", 1900, 10.0)
+    db.create_team("Team B", "Milano", 1910, 5.0)
+    rossi = db.create_player("Mario", "Rossi", "Attaccante", 9, team_a)
+    db.create_player("Paolo", "Verdi", "Difensore", 4, None)
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE giocatori SET gol_segnati = 7 WHERE id_giocatore = ?", (rossi,))
+    return team_a
+
+
+def test_stream_export_covers_teams_and_players_in_chunks(wal_db):
+    team_a = _fill(wal_db)
+
+    chunks = list(db.stream_export(chunk_size=2))
+
+    assert [len(c) for c in chunks] == [2, 1]
+    rows = {(r[1], r[7]): r for c in chunks for r in c}
+    assert set(rows) == {("Team A", "Rossi"), ("Team B", None), (None, "Verdi")}
+    assert rows["Team A", "Rossi"][0] == team_a
+    assert rows["Team A", "Rossi"][10] == 7
+    assert rows[None, "Verdi"][:5] == (None,) * 5
+    assert rows[None, "Verdi"][10] == 0
+    assert db.EXPORT_COLUMNS == EXPORT_COLUMNS
+
+
+def test_export_needs_streaming(wal_db):
+    _fill(wal_db)
+    resp = app.handle_request({"action": "export", "data": {}})
+    assert resp["ok"] is False and resp["error"]["code"] == "BAD_REQUEST"
+
+    frames = []
+    app.stream_response({"action": "export", "data": {"chunk_size": 1}, "stream": True},
+                        lambda b: frames.append(json.loads(b)))
+    assert [len(f["rows"]) for f in frames[:-1]] == [1, 1, 1]
+    assert frames[-1] == {"ok": True, "done": True, "count": 3}
+
+
+def test_cli_writes_csv_and_jsonl(wal_db, tmp_path):
+    _fill(wal_db)
+    out_csv, out_jsonl = tmp_path / "out.csv", tmp_path / "out.jsonl"
+
+    assert export_data.main(["--db", wal_db, "--output", str(out_csv), "--chunk-size", "1"]) == 0
+    assert export_data.main(["--db", wal_db, "--output", str(out_jsonl)]) == 0
+
+    with open(out_csv, newline="", encoding="utf-8") as f:
+        table = list(csv.reader(f))
+    assert table[0] == list(EXPORT_COLUMNS)
+    assert len(table) == 4
+    lines = [json.loads(line) for line in out_jsonl.read_text(encoding="utf-8").splitlines()]
+    assert {(r["nome_club"], r["cognome"], r["gol_segnati"]) for r in lines} == {
+        ("Team A", "Rossi", 7), ("Team B", None, None), (None, "Verdi", 0),
+    }
+
+
+def test_cli_converts_to_wal_only_when_asked(temp_db, tmp_path):
+    db.configure(storage_mode="lock")
+    _fill(temp_db)
+    out = tmp_path / "out.csv"
+
+    assert export_data.main(["--db", temp_db, "--output", str(out)]) == 1
+    assert export_data.journal_mode(temp_db) == "delete"
+    assert not out.exists()
+
+    assert export_data.main(["--db", temp_db, "--output", str(out), "--wal"]) == 0
+    assert export_data.journal_mode(temp_db) == "wal"
+    assert len(out.read_text(encoding="utf-8").splitlines()) == 4
+
+
+def test_export_refused_without_wal(temp_db):
+    _fill(temp_db)
+
+    with pytest.raises(db.StreamingUnavailable):
+        next(db.stream_export())
+    frames = []
+    app.stream_response({"action": "export", "data": {}, "stream": True},
+                        lambda b: frames.append(json.loads(b)))
+    assert [f["error"]["code"] for f in frames] == ["STREAMING_UNAVAILABLE"]
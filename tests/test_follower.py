@@ -0,0 +1,118 @@
+import pytest
+
+from db.init_db import init_db
+from server import app, db
+from server.cache import ResponseCache
+from server.follower import FOLLOWER_ACTIONS, Follower
+from server.protocol import decode_message
+
+
+class LogPrimary:
+    """Serves a change log captured from a primary DB, like ``CampionatoAPI.changes_since``."""
+
+    host, port = "primary", 5000
+
+    def __init__(self, max_page=None):
+        self.changes, self.last = db.changes_since(0, None)
+        self.max_page = max_page
+        self.requests = 0
+
+    def changes_since(self, seq, limit):
+        self.requests += 1
+        if self.max_page is not None:
+            limit = min(limit, self.max_page)
+        page = [c for c in self.changes if c[0] > seq][:limit]
+        return page, self.last
+
+
+@pytest.fixture
+def follower_db(temp_db, tmp_path, monkeypatch):
+    """Path of an empty follower DB; ``temp_db`` is the primary."""
+    monkeypatch.setattr(app, "response_cache", ResponseCache(max_entries=16))
+    path = str(tmp_path / "follower.db")
+    init_db(path)
+    return path
+
+
+def replicate(primary_db, follower_db, follower=None):
+    """Capture the primary's log, then sync the follower DB from it."""
+    db.configure(primary_db)
+    primary = LogPrimary()
+    db.configure(follower_db)
+    if follower is None:
+        follower = Follower(primary, page_size=2)
+    follower.primary = primary
+    follower.sync()
+    return follower
+
+
+def snapshot(team_ids):
+    return (db.list_teams(), db.list_free_agents(),
+            [db.list_players_by_team(t) for t in team_ids])
+
+
+def test_follower_reaches_the_primary_state(temp_db, follower_db):
+    team_a = db.create_team("Team A", "Roma", 1900, 1.0)
+    team_b = db.create_team("Team B", "Milano", 1910, 1.0)
+    players = [db.create_player("Mario", f"Rossi{i}", "Attaccante", i, team_a) for i in range(5)]
+    db.transfer_player(players[0], team_b)
+    db.update_player(players[1], "Luca", "Bianchi", "Portiere", 1)
+    db.delete_player(players[2])
+    db.delete_team(team_a)
+    expected = snapshot([team_a, team_b])
+
+    follower = replicate(temp_db, follower_db)
+
+    assert snapshot([team_a, team_b]) == expected
+    status = follower.status()
+    assert status["lag"] == 0
+    assert status["applied_seq"] == db.applied_seq() == status["primary_seq"]
+
+
+def test_sync_resumes_from_the_applied_seq(temp_db, follower_db):
+    db.create_team("Team A", "Roma", 1900, 1.0)
+    replicate(temp_db, follower_db)
+    assert Follower(None).applied_seq == 1  # persisted in the follower DB
+
+    db.configure(temp_db)
+    db.create_team("Team B", "Milano", 1910, 1.0)
+    follower = replicate(temp_db, follower_db, Follower(None))
+
+    assert follower.applied_seq == 2
+    assert [t[1] for t in db.list_teams()] == ["Team A", "Team B"]
+
+
+def test_replayed_changes_invalidate_cached_reads(temp_db, follower_db):
+    team = db.create_team("Team A", "Roma", 1900, 1.0)
+    follower = replicate(temp_db, follower_db)
+    req = {"action": "list_players_by_team", "data": {"id_squadra": team}}
+    assert decode_message(app.respond(req))["data"] == []
+
+    db.configure(temp_db)
+    player = db.create_player("Mario", "Rossi", "Attaccante", 9, team)
+    replicate(temp_db, follower_db, follower)
+
+    assert [p[0] for p in decode_message(app.respond(req))["data"]] == [player]
+
+
+def test_follower_refuses_writes_and_subscribe(temp_db, monkeypatch):
+    monkeypatch.setattr(app, "allowed_actions", FOLLOWER_ACTIONS)
+    for req in ({"action": "create_team", "data": {"nome_club": "X", "citta": "Y",
+                                                   "anno_fondazione": 1900, "budget": 1}},
+                {"action": "subscribe", "data": {}},
+                {"action": "batch", "data": {"requests": []}}):
+        assert not app.is_subscribe(req)
+        assert decode_message(app.respond(req))["error"]["code"] == "READ_ONLY"
+    assert decode_message(app.respond({"action": "list_teams", "data": {}}))["ok"]
+
+
+def test_sync_catches_up_through_capped_pages(temp_db, follower_db):
+    for i in range(7):
+        db.create_team(f"Team {i}", "Roma", 1900, 1.0)
+    primary = LogPrimary(max_page=2)
+    db.configure(follower_db)
+
+    follower = Follower(primary, page_size=100)
+    assert follower.sync() == 7
+    assert follower.applied_seq == primary.last
+    assert primary.requests == 4
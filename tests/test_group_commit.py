@@ -0,0 +1,142 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from server import db
+
+
+class RecordingWriter(db.GroupCommitWriter):
+    """``GroupCommitWriter`` recording the size of every group it commits."""
+
+    def __init__(self, *args):
+        self.groups = []
+        super().__init__(*args)
+
+    def _commit(self, batch):
+        self.groups.append(len(batch))
+        super()._commit(batch)
+
+
+@pytest.fixture
+def writer(temp_db, monkeypatch):
+    """Start a ``RecordingWriter(max_batch, max_wait)`` that the db mutations go through."""
+    writers = []
+
+    def start(max_batch=64, max_wait=0.2):
+        w = RecordingWriter(max_batch, max_wait)
+        writers.append(w)
+        monkeypatch.setattr(db, "_group_writer", w)
+        return w
+
+    yield start
+    for w in writers:
+        w.stop()
+
+
+def create_team(name):
+    return (db.create_team.__wrapped__, (name, "Roma", 1900, 1.0), {})
+
+
+def teams():
+    return [row[1] for row in db.list_teams()]
+
+
+def test_each_caller_gets_its_own_result_or_error(writer):
+    w = writer()
+    team = db.create_team("Team A", "Roma", 1900, 1.0)
+    futures = [
+        w.submit(*create_team("Team B")),
+        w.submit(db.create_player.__wrapped__, ("Mario", "Rossi", "Attaccante", 9, 9999), {}),
+        w.submit(*create_team("Team C")),
+    ]
+
+    b, c = futures[0].result(), futures[2].result()
+    with pytest.raises(sqlite3.IntegrityError):  # no team 9999
+        futures[1].result()
+    assert len({team, b, c}) == 3
+    assert w.groups == [1, 3]
+    assert teams() == ["Team A", "Team B", "Team C"]
+
+
+def test_failing_mutation_is_undone_alone(writer):
+    w = writer()
+
+    def insert_then_fail(conn):
+        conn.execute("INSERT INTO squadre (nome_club, citta, anno_fondazione, budget) "
+                     "VALUES ('Team X', 'Roma', 1900, 1.0)")
+        raise RuntimeError("boom")
+
+    futures = [w.submit(*create_team("Team A")), w.submit(insert_then_fail, (), {}),
+               w.submit(*create_team("Team B"))]
+
+    futures[0].result()
+    futures[2].result()
+    with pytest.raises(RuntimeError, match="boom"):
+        futures[1].result()
+    assert w.groups == [3]
+    assert teams() == ["Team A", "Team B"]
+
+
+def test_groups_are_at_most_max_batch(writer):
+    w = writer(max_batch=2, max_wait=0.05)
+    futures = [w.submit(*create_team(f"Team {i}")) for i in range(5)]
+    for fut in futures:
+        fut.result()
+
+    assert sum(w.groups) == 5
+    assert max(w.groups) <= 2
+    assert len(teams()) == 5
+
+
+def test_writer_waits_at_most_max_wait(writer):
+    w = writer(max_wait=0.05)
+    start = time.monotonic()
+    db.create_team("Team A", "Roma", 1900, 1.0)
+    assert time.monotonic() - start < 0.5
+
+    time.sleep(0.1)  # past max_wait: the next mutation starts a new group
+    db.create_team("Team B", "Milano", 1910, 1.0)
+    assert w.groups == [1, 1]
+
+
+def test_concurrent_callers_share_a_commit(writer):
+    w = writer(max_wait=0.1)
+    ids = []
+    threads = [threading.Thread(target=lambda i=i: ids.append(db.create_team(f"Team {i}", "Roma", 1900, 1.0)))
+               for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(ids) == list(range(1, 9))
+    assert len(w.groups) < 8
+
+
+def test_submit_after_stop_is_refused_and_mutations_write_directly(writer):
+    w = writer()
+    w.stop()
+    with pytest.raises(db.WriterStopped):
+        w.submit(*create_team("Team A"))
+
+    # a caller that read _group_writer just before it was stopped
+    assert db.create_team("Team A", "Roma", 1900, 1.0) == 1
+    assert teams() == ["Team A"]
+
+
+def test_jobs_behind_the_stop_sentinel_fail(writer):
+    w = writer(max_wait=0.0)
+    gate = threading.Event()
+    blocked = w.submit(lambda conn: gate.wait(5), (), {})
+    time.sleep(0.05)  # the writer thread is inside the first job
+    late = Future()
+    w._queue.put(None)
+    w._queue.put((late, *create_team("Team B")))
+    gate.set()
+
+    assert blocked.result(timeout=2) is True
+    with pytest.raises(db.WriterStopped):
+        late.result(timeout=2)
@@ -0,0 +1,112 @@
+import os
+import threading
+
+import pytest
+
+from server import app, db
+from server.cache import ResponseCache
+from server.launcher import ChangeRelay, Supervisor
+from server.protocol import decode_message
+
+
+@pytest.fixture
+def relay(temp_db, monkeypatch):
+    monkeypatch.setattr(app, "response_cache", ResponseCache(max_entries=16))
+    return ChangeRelay()
+
+
+def test_relay_sees_writes_from_other_processes(relay):
+    received = []
+    token = app.events.subscribe(received.append)
+    try:
+        assert decode_message(app.respond({"action": "list_teams", "data": {}}))["data"] == []
+        # written straight to the DB, as another worker process would
+        team = db.create_team("Team A", "Roma", 1900, 1.0)
+        player = db.create_player("Mario", "Rossi", "Attaccante", 9, team)
+
+        assert relay.poll() == 2
+        assert relay.poll() == 0
+    finally:
+        app.events.unsubscribe(token)
+
+    assert [t[0] for t in decode_message(app.respond({"action": "list_teams", "data": {}}))["data"]] == [team]
+    assert received == [
+        {"type": "team_created", "id_squadra": team},
+        {"type": "player_created", "id_giocatore": player, "id_squadra": team},
+    ]
+
+
+def test_relay_events_match_handle_request(relay):
+    team = db.create_team("Team A", "Roma", 1900, 1.0)
+    other = db.create_team("Team B", "Milano", 1910, 1.0)
+    player = db.create_player("Mario", "Rossi", "Attaccante", 9, team)
+    teammate = db.create_player("Luca", "Bianchi", "Portiere", 1, team)
+    relay.poll()
+
+    app.local_events = True
+    local = []
+    token = app.events.subscribe(local.append)
+    try:
+        for req in [
+            {"action": "update_player", "data": {"id_giocatore": player, "nome": "Mario", "cognome": "Rossi",
+                                                 "ruolo": "Attaccante", "numero_maglia": 10}},
+            {"action": "transfer_player", "data": {"id_giocatore": player, "id_squadra": other}},
+            {"action": "transfer_player", "data": {"id_giocatore": player, "id_squadra": None}},
+            {"action": "delete_team", "data": {"id_squadra": team}},
+        ]:
+            assert decode_message(app.respond(req))["ok"]
+    finally:
+        app.events.unsubscribe(token)
+
+    relayed = []
+    token = app.events.subscribe(relayed.append)
+    try:
+        relay.poll()
+    finally:
+        app.events.unsubscribe(token)
+
+    assert teammate  # released with its team: no event of its own
+    assert relayed == local == [
+        {"type": "player_updated", "id_giocatore": player, "id_squadra": team},
+        {"type": "player_transferred", "id_giocatore": player, "id_squadra": other},
+        {"type": "player_transferred", "id_giocatore": player, "id_squadra": None},
+        {"type": "team_deleted", "id_squadra": team},
+    ]
+
+
+def test_relay_starts_at_the_end_of_the_log(temp_db):
+    db.create_team("Team A", "Roma", 1900, 1.0)
+    assert ChangeRelay().poll() == 0
+
+
+def test_supervisor_restarts_crashed_workers():
+    read_fd, write_fd = os.pipe()
+
+    def crash():
+        os.write(write_fd, b"x")
+        raise RuntimeError("worker crashed")
+
+    supervisor = Supervisor(2, crash, restart_delay=0.01)
+
+    def stop_after_restarts():
+        starts = 0
+        while starts < 5:
+            starts += len(os.read(read_fd, 16))
+        supervisor.stop()
+
+    watcher = threading.Thread(target=stop_after_restarts, daemon=True)
+    watcher.start()
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    stderr = os.dup(2)
+    os.dup2(devnull, 2)  # the crashing children print tracebacks
+    try:
+        supervisor.run()
+    finally:
+        os.dup2(stderr, 2)
+        os.close(devnull)
+        os.close(stderr)
+    watcher.join(5)
+
+    assert supervisor.restarts >= 3
+    os.close(read_fd)
+    os.close(write_fd)
@@ -0,0 +1,103 @@
+import pytest
+
+from server import app, db, outbox
+from server.outbox import OutboxWorker
+
+
+@pytest.fixture
+def team(temp_db):
+    return db.create_team("Team A", "Roma", 1900, 1.0)
+
+
+def delete(team_id):
+    return app.handle_request({"action": "delete_team", "data": {"id_squadra": team_id}})
+
+
+def test_delete_team_queues_the_email_instead_of_sending_it(team, smtp_server):
+    assert delete(team)["ok"]
+    assert smtp_server.sessions == 0
+    assert db.outbox_stats() == {"in_attesa": 1}
+
+    assert OutboxWorker().run_once() == 1
+
+    [message] = smtp_server.messages
+    assert message["Subject"] == f"[Serie A] Squadra eliminata: Team A (ID {team})"
+    assert message["To"] == "admin@example.test"
+    assert db.outbox_stats() == {"inviata": 1}
+
+
+def test_failed_send_is_retried(team, smtp_server, monkeypatch):
+    monkeypatch.setattr(outbox, "BASE_DELAY", 0.0)  # due again right away
+    smtp_server.fail_next = 2
+    delete(team)
+
+    assert OutboxWorker().run_once() == 1
+    assert len(smtp_server.messages) == 1
+    assert smtp_server.sessions == 1  # a refused message doesn't end the session
+
+
+def test_gives_up_after_max_attempts(team, smtp_server, monkeypatch):
+    monkeypatch.setattr(outbox, "BASE_DELAY", 0.0)
+    smtp_server.fail_next = 10
+    delete(team)
+
+    assert OutboxWorker(max_attempts=3).run_once() == 0
+    assert smtp_server.fail_next == 7
+    assert db.outbox_stats() == {"fallita": 1}
+
+
+def test_unconfigured_smtp_keeps_the_email_queued(team, monkeypatch):
+    monkeypatch.setenv("SMTP_SENDER", "")
+    delete(team)
+
+    assert OutboxWorker().run_once() == 0
+    assert db.outbox_stats() == {"in_attesa": 1}
+    with db.transaction() as conn:
+        error, = conn.execute("SELECT ultimo_errore FROM email_outbox").fetchone()
+    assert "SMTP non configurato" in error
+
+
+def test_retry_waits_with_backoff(team, smtp_server):
+    smtp_server.fail_next = 1
+    delete(team)
+
+    assert OutboxWorker().run_once() == 0
+    assert OutboxWorker().run_once() == 0  # not due yet
+    assert smtp_server.fail_next == 0 and not smtp_server.messages
+    assert [outbox.retry_delay(n) for n in (1, 2, 3)] == [2.0, 4.0, 8.0]
+    assert outbox.retry_delay(50) == outbox.MAX_DELAY
+
+
+def test_rolled_back_delete_queues_nothing(team):
+    resp = app.handle_request({"action": "batch", "data": {"atomic": True, "requests": [
+        {"action": "delete_team", "data": {"id_squadra": team}},
+        {"action": "delete_team", "data": {"id_squadra": 9999}},
+    ]}})
+    assert resp["ok"] is False
+    assert db.outbox_stats() == {}
+
+
+def test_due_notifications_share_one_session(temp_db, smtp_server):
+    teams = [db.create_team(f"Team {i}", "Roma", 1900, 1.0) for i in range(3)]
+    for team in teams:
+        delete(team)
+
+    assert OutboxWorker().run_once() == 3
+    assert len(smtp_server.messages) == 3
+    assert smtp_server.sessions == smtp_server.logins == 1
+
+
+def test_digest_merges_queued_deletions(temp_db, smtp_server):
+    teams = [db.create_team(f"Team {i}", "Roma", 1900, 1.0) for i in range(3)]
+    for team in teams:
+        delete(team)
+    worker = OutboxWorker(digest_window=60.0)
+
+    assert worker.run_once() == 0  # still inside the window
+    worker.digest_window = 0.0
+    assert worker.run_once() == 3
+
+    [message] = smtp_server.messages
+    assert message["Subject"] == "[Serie A] 3 squadre eliminate"
+    body = message.get_payload(decode=True).decode()
+    assert all(f"(ID {team})" in body for team in teams)
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from client.api import CampionatoAPI
+from client.async_api import AsyncCampionatoAPI
+from server import db
+
+# (cognome, nome): ties on both leave only id_giocatore to order by
+NAMES = [("Rossi", "Mario")] * 5 + [("Rossi", "Luca")] * 2 + [("Bianchi", "Mario")] * 2
+
+
+@pytest.fixture
+def roster(serve):
+    server = serve()
+    team = db.create_team("Team A", "Roma", 1900, 1.0)
+    for i, (cognome, nome) in enumerate(NAMES):
+        db.create_player(nome, cognome, "Attaccante", i + 1, team)
+        db.create_player(nome, cognome, "Difensore", i + 1, None)
+    return server, team
+
+
+def expected(rows):
+    return sorted(rows, key=lambda r: (r[2], r[1], r[0]))
+
+
+def test_pages_walk_ties_in_order(roster):
+    server, team = roster
+    with CampionatoAPI("127.0.0.1", server.port) as api:
+        for page_size in (1, 2, 4, 100):
+            players = list(api.iter_players_by_team(team, page_size))
+            free_agents = list(api.iter_free_agents(page_size))
+            assert players == expected(api.list_players_by_team(team))
+            assert free_agents == expected(api.list_free_agents())
+            assert len(players) == len(free_agents) == len(NAMES)
+
+
+def test_page_cursor_is_the_last_row(roster):
+    server, team = roster
+    with CampionatoAPI("127.0.0.1", server.port) as api:
+        first = api.list_players_by_team(team, limit=3)
+        rest = api.list_players_by_team(team, after=[first[-1][2], first[-1][1], first[-1][0]])
+        assert first + rest == expected(api.list_players_by_team(team))
+
+
+def test_async_pages_walk_ties_in_order(roster):
+    server, team = roster
+
+    async def walk():
+        async with AsyncCampionatoAPI("127.0.0.1", server.port) as api:
+            return [row async for row in api.iter_players_by_team(team, 2)]
+
+    players = asyncio.run(walk())
+    assert [p[0] for p in players] == [p[0] for p in expected(players)]
+    assert len({p[0] for p in players}) == len(NAMES)
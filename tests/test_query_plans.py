@@ -0,0 +1,123 @@
+"""
+Query-plan regression suite: every statement issued by the functions in
+``server/db.py`` is run through ``EXPLAIN QUERY PLAN`` and must be answered
+through an index, without a full table scan or a temporary B-tree sort.
+"""
+import inspect
+import re
+
+import pytest
+
+from server import db
+
+# plans a function may have on purpose, with the reason
+ALLOWED = {
+    # the export reads every team anyway: a plain scan of the table is the
+    # cheapest way (its players are then looked up by idx_giocatori_rosa)
+    ("stream_export", "SCAN s"),
+}
+
+# functions of server.db that run SQL but are not queries of their own
+NOT_QUERIES = {"_connect", "transaction", "snapshot", "savepoint", "_reading", "_writing", "_stream", "_import"}
+
+_FULL_SCAN = re.compile(r"SCAN \w+")  # "SCAN t USING [COVERING] INDEX ..." is fine
+
+
+def _calls(team, other_team, player, free_agent, email):
+    """``(function name, call)`` for every function of server.db that queries the DB."""
+    seq = db.last_seq()
+    return [
+        ("create_team", lambda: db.create_team("Team C", "Napoli", 1926, 1.0)),
+        ("team_exists", lambda: db.team_exists(db._local.conn, team)),
+        ("get_team_by_id", lambda: db.get_team_by_id(team)),
+        ("list_teams", lambda: db.list_teams()),
+        ("list_teams", lambda: db.list_teams(limit=1, after=["Team A", team])),
+        ("stream_teams", lambda: list(db.stream_teams(1))),
+        ("create_player", lambda: db.create_player("Luca", "Bianchi", "Portiere", 1, team)),
+        ("player_exists", lambda: db.player_exists(db._local.conn, player)),
+        ("list_players_by_team", lambda: db.list_players_by_team(team)),
+        ("list_players_by_team", lambda: db.list_players_by_team(team, 1, ["Rossi", "Mario", player])),
+        ("stream_players_by_team", lambda: list(db.stream_players_by_team(team, 1))),
+        ("list_free_agents", lambda: db.list_free_agents()),
+        ("list_free_agents", lambda: db.list_free_agents(1, ["Verdi", "Paolo", free_agent])),
+        ("stream_free_agents", lambda: list(db.stream_free_agents(1))),
+        ("stream_export", lambda: list(db.stream_export(1))),
+        ("update_player", lambda: db.update_player(player, "Mario", "Rossi", "Attaccante", 10)),
+        ("transfer_player", lambda: db.transfer_player(player, other_team)),
+        ("delete_player", lambda: db.delete_player(free_agent)),
+        ("delete_team", lambda: db.delete_team(other_team)),
+        ("search", lambda: db.search("Ros")),
+        ("get_version", lambda: db.get_version(db.TEAMS_VERSION)),
+        ("changes_since", lambda: db.changes_since(0, 10)),
+        ("last_seq", lambda: db.last_seq()),
+        ("apply_changes", lambda: db.apply_changes([
+            (seq + 1, "squadre", "insert", 900,
+             {"id_squadra": 900, "nome_club": "Team R", "citta": "Bari",
+              "anno_fondazione": 1908, "budget": 1.0}),
+            (seq + 2, "squadre", "delete", 900, None),
+        ])),
+        ("applied_seq", lambda: db.applied_seq()),
+        ("enqueue_email", lambda: db.enqueue_email("team_deleted", {"team_name": "X", "team_id": 1})),
+        ("claim_emails", lambda: db.claim_emails(60.0, 10)),
+        ("email_sent", lambda: db.email_sent(email)),
+        ("email_failed", lambda: db.email_failed(email, "boom", None)),
+        ("outbox_stats", lambda: db.outbox_stats()),
+        ("import_teams", lambda: db.import_teams([{"nome_club": "Team I", "citta": "Como",
+                                                   "anno_fondazione": 1907}])),
+        ("import_players", lambda: db.import_players([{"nome": "Ugo", "cognome": "Neri",
+                                                       "ruolo": "Difensore", "numero_maglia": 3,
+                                                       "squadra": "Team A"}])),
+    ]
+
+
+@pytest.fixture
+def recorded(temp_db, recording):
+    """``(function name, sql, params, plan details)`` of every statement server.db issues."""
+    team = db.create_team("Team A", "Roma", 1900, 1.0)
+    other_team = db.create_team("Team B", "Milano", 1910, 1.0)
+    player = db.create_player("Mario", "Rossi", "Attaccante", 9, team)
+    free_agent = db.create_player("Paolo", "Verdi", "Difensore", 4, None)
+    email = db.enqueue_email("team_deleted", {"team_name": "Team Z", "team_id": 99})
+
+    results = []
+    with db.transaction() as conn, recording() as rec:
+        for name, call in _calls(team, other_team, player, free_agent, email):
+            rec.queries = []
+            call()
+            for sql, params in rec.queries:
+                if not re.match(r"\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", sql, re.I):
+                    continue  # BEGIN, SAVEPOINT, ...
+                plan = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+                results.append((name, sql, params, [row[3] for row in plan]))
+    return results
+
+
+def test_every_query_function_is_covered(recorded):
+    # a new function running SQL must be added to _calls()
+    queries = {
+        name for name, fn in vars(db).items()
+        if inspect.isfunction(fn) and fn.__module__ == db.__name__
+        and ".execute" in inspect.getsource(fn) and name not in NOT_QUERIES
+    }
+    assert queries - {name for name, _, _, _ in recorded} == set()
+
+
+def test_no_full_scans_or_temp_sorts(recorded):
+    bad = []
+    for name, sql, params, details in recorded:
+        for detail in details:
+            if (name, detail) in ALLOWED:
+                continue
+            if _FULL_SCAN.fullmatch(detail) or "TEMP B-TREE" in detail:
+                bad.append(f"{name}: {detail}\n{' '.join(sql.split())}")
+    assert not bad, "\n\n".join(bad)
+
+
+@pytest.mark.parametrize("name, index", [
+    ("list_teams", "idx_squadre_elenco"),
+    ("list_players_by_team", "idx_giocatori_rosa"),
+    ("list_free_agents", "idx_giocatori_svincolati"),
+])
+def test_list_queries_use_their_covering_index(recorded, name, index):
+    details = [d for n, _, _, plan in recorded if n == name for d in plan]
+    assert details and all(f"USING COVERING INDEX {index}" in d for d in details)
@@ -0,0 +1,91 @@
+import sqlite3
+
+import pytest
+
+from server import app, db
+from server.cache import ResponseCache
+from server.protocol import decode_message
+
+
+@pytest.fixture
+def cache(temp_db, monkeypatch):
+    cache = ResponseCache(max_entries=16)
+    monkeypatch.setattr(app, "response_cache", cache)
+    return cache
+
+
+def test_hit_after_miss_and_id_is_echoed(cache, call):
+    call("list_teams")
+    resp = decode_message(app.respond({"action": "list_teams", "data": {}, "id": 7}))
+    assert resp == {"ok": True, "data": [], "version": 0, "id": 7}
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_transfer_invalidates_both_rosters_only(cache, call):
+    team_a = db.create_team("Team A", "Roma", 1900, 1.0)
+    team_b = db.create_team("Team B", "Milano", 1910, 1.0)
+    team_c = db.create_team("Team C", "Napoli", 1920, 1.0)
+    player = call("create_player", nome="Mario", cognome="Rossi", ruolo="Attaccante",
+                  numero_maglia=9, id_squadra=team_a)["data"]["id_giocatore"]
+    for team in (team_a, team_b, team_c):
+        call("list_players_by_team", id_squadra=team)
+    call("list_teams")
+
+    call("transfer_player", id_giocatore=player, id_squadra=team_b)
+
+    assert call("list_players_by_team", id_squadra=team_a)["data"] == []
+    assert [p[0] for p in call("list_players_by_team", id_squadra=team_b)["data"]] == [player]
+    hits = cache.hits
+    call("list_players_by_team", id_squadra=team_c)
+    call("list_teams")
+    assert cache.hits == hits + 2
+
+
+def test_delete_team_invalidates_teams_and_free_agents(cache, call):
+    team = db.create_team("Team A", "Roma", 1900, 1.0)
+    player = db.create_player("Mario", "Rossi", "Attaccante", 9, team)
+    assert call("list_free_agents")["data"] == []
+    assert len(call("list_teams")["data"]) == 1
+
+    call("delete_team", id_squadra=team)
+
+    assert call("list_teams")["data"] == []
+    assert [p[0] for p in call("list_free_agents")["data"]] == [player]
+
+
+def test_write_from_another_connection_is_seen(cache, temp_db, call):
+    db.create_team("Team A", "Roma", 1900, 1.0)
+    assert len(call("list_teams")["data"]) == 1
+
+    # e.g. db/import_data.py or another server process: no invalidate() here
+    with sqlite3.connect(temp_db) as conn:
+        conn.execute("INSERT INTO squadre (nome_club, citta, anno_fondazione) VALUES ('Team B', 'Bari', 1908)")
+
+    assert [t[1] for t in call("list_teams")["data"]] == ["Team A", "Team B"]
+    assert cache.stats()["stale"] == 1
+    hits = cache.hits
+    call("list_teams")
+    assert cache.hits == hits + 1
+
+
+def test_errors_are_not_cached(cache, call):
+    assert call("list_players_by_team")["ok"] is False
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_and_size_limit():
+    cache = ResponseCache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, b"{}\n", [("t",)], cache.generation)
+    assert cache.get("a") is None
+    assert cache.get("c") == b"{}\n"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_stale_fill_is_rejected():
+    cache = ResponseCache()
+    generation = cache.generation
+    cache.invalidate(("teams",))
+    cache.put("k", b"{}\n", [("teams",)], generation)
+    assert cache.get("k") is None
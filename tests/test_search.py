@@ -0,0 +1,99 @@
+import sqlite3
+
+import pytest
+
+from db.init_db import init_db
+from server import app, db
+
+
+@pytest.fixture
+def clubs(temp_db):
+    juve = db.create_team("Juventus", "Torino", 1897, 1.0)
+    roma = db.create_team("Roma", "Roma", 1927, 1.0)
+    rossi = db.create_player("Mario", "Rossi", "Attaccante", 9, juve)
+    rossini = db.create_player("Paolo", "Rossini", "Difensore", 3, None)
+    db.create_player("Ugo", "Juventini", "Portiere", 1, roma)
+    return juve, roma, rossi, rossini
+
+
+def test_prefix_search_matches_players_and_teams(clubs):
+    juve, roma, rossi, rossini = clubs
+
+    assert {(r[0], r[1]) for r in db.search("ros")} == {("giocatore", rossi), ("giocatore", rossini)}
+    assert ("squadra", juve, None, None, None, "Juventus") in db.search("juv")
+    # every word must match
+    assert db.search("mar ross") == [("giocatore", rossi, "Mario", "Rossi", "Attaccante", "Juventus")]
+    assert len(db.search("ros", limit=1)) == 1
+
+
+def test_roles_and_one_letter_words_do_not_match_everything(clubs):
+    assert db.search("difensore") == []  # names only unless asked
+    assert db.search("r") == []  # whole word only
+    db.create_player("R", "Bianchi", "Portiere", 2, None)
+    assert [r[3] for r in db.search("r")] == ["Bianchi"]
+
+
+def test_role_and_club_matches_are_opt_in(clubs):
+    juve, _, rossi, rossini = clubs
+
+    assert [r[1] for r in db.search("dif", fields=["ruolo"])] == [rossini]
+    by_club = db.search("juventus", fields=db.SEARCH_ALL_FIELDS)
+    assert {(r[0], r[1]) for r in by_club} == {("squadra", juve), ("giocatore", rossi)}
+    assert [r[1] for r in db.search("mario juv", fields=db.SEARCH_ALL_FIELDS)] == [rossi]
+    with pytest.raises(ValueError):
+        db.search("rossi", fields=["citta"])
+
+
+def test_best_match_is_found_among_many(temp_db):
+    team = db.create_team("Team A", "Roma", 1900, 1.0)
+    for i in range(300):
+        db.create_player(f"Nome{i}", "Rossi", "Difensore", 5, team)
+    best = db.create_player("Rossi", "Rossi", "Attaccante", 9, team)
+
+    assert db.search("rossi", limit=1)[0][1] == best
+
+
+def test_index_follows_writes(clubs):
+    juve, roma, rossi, rossini = clubs
+
+    db.update_player(rossini, "Paolo", "Bianchi", "Difensore", 3)
+    db.transfer_player(rossi, roma)
+    assert db.search("rossini") == []
+    assert db.search("rossi")[0][5] == "Roma"
+
+    db.delete_team(roma)  # its players are released
+    assert db.search("roma") == []
+    assert db.search("rossi")[0][5] is None
+
+    db.delete_player(rossi)
+    assert db.search("rossi") == []
+
+
+def test_existing_database_is_indexed(tmp_path):
+    path = str(tmp_path / "vecchio.db")
+    init_db(path)
+    with sqlite3.connect(path) as conn:
+        # as before the index
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE name LIKE 'trg_ricerca_%'").fetchall():
+            conn.execute(f"DROP TRIGGER {name}")
+        conn.execute("DROP TABLE ricerca")
+        conn.execute("INSERT INTO squadre (nome_club, citta, anno_fondazione) VALUES ('Lazio', 'Roma', 1900)")
+        conn.execute("INSERT INTO giocatori (nome, cognome, ruolo, numero_maglia, id_squadra) "
+                     "VALUES ('Ciro', 'Immobile', 'Attaccante', 17, 1)")
+
+    init_db(path)
+    with sqlite3.connect(path) as conn:
+        hits = conn.execute("SELECT rowid, nome_club FROM ricerca WHERE ricerca MATCH 'laz* OR imm*' "
+                            "ORDER BY rowid").fetchall()
+    assert hits == [(-1, "Lazio"), (1, "Lazio")]
+
+
+def test_search_action(clubs):
+    juve, _, rossi, _ = clubs
+
+    resp = app.handle_request({"action": "search", "data": {"q": "Mar Ross"}})
+    assert resp == {"ok": True, "data": [("giocatore", rossi, "Mario", "Rossi", "Attaccante", "Juventus")]}
+    assert app.handle_request({"action": "search", "data": {"q": "  "}})["error"]["code"] == "BAD_REQUEST"
+    assert app.handle_request({"action": "search", "data": {"q": "r", "limit": 0}})["error"]["code"] == "BAD_REQUEST"
+    resp = app.handle_request({"action": "search", "data": {"q": "attaccante", "fields": ["ruolo"]}})
+    assert [r[1] for r in resp["data"]] == [rossi]
@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+
+import pytest
+
+from server import app
+
+
+def send(conn, *requests):
+    conn.sendall(b"".join(json.dumps(req).encode() + b"\n" for req in requests))
+
+
+def receive(file, count=1):
+    return [json.loads(file.readline()) for _ in range(count)]
+
+
+@pytest.fixture
+def slow_respond(monkeypatch):
+    """Requests whose ``data`` has ``"wait"`` are held until that event is set."""
+    gates = {}
+    respond = app.respond
+
+    def held(req):
+        gate = req.get("data", {}).pop("wait", None)
+        if gate is not None:
+            gates[gate].wait(5)
+        return respond(req)
+
+    monkeypatch.setattr(app, "respond", held)
+    return lambda name: gates.setdefault(name, threading.Event())
+
+
+def test_requests_share_one_connection(serve):
+    conn, file = serve().connect()
+    with conn:
+        send(conn, {"action": "create_team", "data": {"nome_club": "Team A", "citta": "Roma",
+                                                      "anno_fondazione": 1900, "budget": 1.0}})
+        assert receive(file)[0]["ok"] is True
+        send(conn, {"action": "list_teams", "data": {}})
+        assert [row[1] for row in receive(file)[0]["data"]] == ["Team A"]
+
+
+def test_bad_json_keeps_the_connection(serve):
+    conn, file = serve().connect()
+    with conn:
+        conn.sendall(b"{not json\n")
+        assert receive(file)[0]["error"]["code"] == "BAD_JSON"
+        send(conn, {"action": "list_teams", "data": {}})
+        assert receive(file)[0] == {"ok": True, "data": [], "version": 0}
+
+
+def test_pipelined_replies_come_back_by_id(serve, slow_respond):
+    gate = slow_respond("slow")
+    conn, file = serve().connect()
+    with conn:
+        send(conn, {"id": "slow", "action": "list_teams", "data": {"wait": "slow"}},
+             {"id": "fast", "action": "list_free_agents", "data": {}})
+        first = receive(file)[0]
+        gate.set()
+        second = receive(file)[0]
+
+    assert (first["id"], second["id"]) == ("fast", "slow")
+    assert first["ok"] and second["ok"]
+
+
+def test_full_queue_answers_overloaded(serve, slow_respond):
+    gate = slow_respond("busy")
+    conn, file = serve(workers=1, queue_size=1).connect()
+    with conn:
+        send(conn, {"id": 1, "action": "list_teams", "data": {"wait": "busy"}})
+        time.sleep(0.1)  # the only worker is busy with it
+        send(conn, {"id": 2, "action": "list_teams", "data": {}},
+             {"id": 3, "action": "list_teams", "data": {}})
+        shed = receive(file)[0]
+        gate.set()
+        rest = receive(file, 2)
+
+    assert shed["id"] == 3 and shed["error"]["code"] == "OVERLOADED"
+    assert sorted(resp["id"] for resp in rest) == [1, 2]
+    assert all(resp["ok"] for resp in rest)
@@ -0,0 +1,108 @@
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from server import db
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def other_writer(wal_db):
+    """A second connection to the WAL database, as another process would have."""
+    conn = sqlite3.connect(wal_db, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    yield conn
+    if conn.in_transaction:
+        conn.rollback()
+    conn.close()
+
+
+def in_thread(fn, *args):
+    """Run ``fn(*args)`` in a thread; returns the thread and its result list."""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(fn(*args)), daemon=True)
+    thread.start()
+    return thread, result
+
+
+def team_names():
+    return sorted(row[1] for row in db.list_teams())
+
+
+def test_reads_do_not_wait_for_a_writer(other_writer):
+    db.create_team("Team A", "Roma", 1900, 1.0)
+    other_writer.execute("BEGIN IMMEDIATE")
+    other_writer.execute("INSERT INTO squadre (nome_club, citta, anno_fondazione, budget) "
+                         "VALUES ('Team B', 'Milano', 1910, 1.0)")
+
+    started = time.monotonic()
+    assert team_names() == ["Team A"]  # the uncommitted row is not seen
+    assert time.monotonic() - started < db.BUSY_TIMEOUT_MS / 1000 / 2
+
+    other_writer.commit()
+    assert team_names() == ["Team A", "Team B"]
+
+
+def test_writes_wait_for_another_connection_then_go_through(other_writer):
+    other_writer.execute("BEGIN IMMEDIATE")
+    other_writer.execute("INSERT INTO squadre (nome_club, citta, anno_fondazione, budget) "
+                         "VALUES ('Team A', 'Roma', 1900, 1.0)")
+
+    thread, result = in_thread(db.create_team, "Team B", "Milano", 1910, 1.0)
+    thread.join(0.3)
+    assert thread.is_alive()  # SQLite holds it at BEGIN IMMEDIATE
+
+    other_writer.commit()
+    thread.join(5)
+    assert result and team_names() == ["Team A", "Team B"]
+
+
+def test_wal_writes_skip_the_write_lock(wal_db):
+    with db._write_lock:
+        thread, result = in_thread(db.create_team, "Team A", "Roma", 1900, 1.0)
+        thread.join(5)
+        assert result
+
+
+def test_lock_writes_take_the_write_lock(temp_db):
+    db.configure(storage_mode="lock")
+    with db._write_lock:
+        thread, result = in_thread(db.create_team, "Team A", "Roma", 1900, 1.0)
+        thread.join(0.3)
+        assert thread.is_alive()
+    thread.join(5)
+    assert result
+
+
+WRITER = """
+import sys
+from server import db
+db.configure(sys.argv[1], storage_mode="wal")
+for i in range(int(sys.argv[3])):
+    db.create_team(f"{sys.argv[2]} {i}", "Roma", 1900, 1.0)
+"""
+
+
+def test_processes_writing_the_same_file_serialise(wal_db):
+    per_process = 50
+    procs = [
+        subprocess.Popen([sys.executable, "-c", WRITER, wal_db, name, str(per_process)],
+                         cwd=ROOT, stderr=subprocess.PIPE, text=True)
+        for name in ("Primo", "Secondo")
+    ]
+    for i in range(per_process):
+        db.create_team(f"Terzo {i}", "Roma", 1900, 1.0)
+    for proc in procs:
+        _, err = proc.communicate(timeout=60)
+        assert proc.returncode == 0, err
+
+    names = team_names()
+    assert len(names) == 3 * per_process
+    for name in ("Primo", "Secondo", "Terzo"):
+        assert sum(n.startswith(name) for n in names) == per_process
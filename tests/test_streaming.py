@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from server import app, db
+
+
+def frames_of(req):
+    frames = []
+    app.stream_response(req, lambda b: frames.append(json.loads(b)))
+    return frames
+
+
+@pytest.fixture
+def teams(wal_db):
+    return [db.create_team(f"Team {i}", "Roma", 1900, 1.0) for i in range(5)]
+
+
+def test_streaming_needs_wal(temp_db):
+    db.create_team("Team A", "Roma", 1900, 1.0)
+    with pytest.raises(db.StreamingUnavailable):
+        next(db.stream_teams(1))
+    frames = frames_of({"action": "list_teams", "data": {}, "stream": True})
+    assert [f["error"]["code"] for f in frames] == ["STREAMING_UNAVAILABLE"]
+
+
+def test_server_streams_by_default():
+    assert app.build_parser().parse_args([]).storage == "wal"
+    assert app.build_parser().parse_args(["--storage", "lock"]).storage == "lock"
+
+
+def test_writes_go_on_while_a_stream_is_open(teams):
+    stream = db.stream_teams(chunk_size=2)
+    first = next(stream)  # cursor open, the rest not read yet
+    try:
+        new_team = db.create_team("Team Z", "Bari", 1908, 1.0)
+        db.delete_team(teams[-1])
+    finally:
+        rest = [row for chunk in stream for row in chunk]
+    # the stream keeps the snapshot it started from
+    assert len(first) + len(rest) == 5
+    assert new_team in [t[0] for t in db.list_teams()]
+
+
+def test_pool_exhausted_answers_overloaded(teams):
+    db.configure(pool_size=1)
+    db._get_pool().acquire_timeout = 0.05
+    stream = db.stream_teams(chunk_size=1)
+    next(stream)  # holds the only connection
+    try:
+        resp = app.handle_request({"action": "list_teams", "data": {}})
+        assert resp["error"]["code"] == "OVERLOADED"
+        frames = frames_of({"action": "list_teams", "data": {}, "stream": True})
+        assert [f["error"]["code"] for f in frames] == ["OVERLOADED"]
+    finally:
+        stream.close()
+    assert len(app.handle_request({"action": "list_teams", "data": {}})["data"]) == 5
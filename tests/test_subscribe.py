@@ -0,0 +1,57 @@
+import asyncio
+import queue
+
+import pytest
+
+from client.api import ApiError, CampionatoAPI
+from client.async_api import AsyncCampionatoAPI
+
+
+def test_events_are_pushed_to_subscribers(serve):
+    server = serve()
+    events = queue.Queue()
+    with CampionatoAPI("127.0.0.1", server.port) as api:
+        sub = api.subscribe(events.put, types=["team_created", "player_transferred"])
+        try:
+            team = api.create_team("Team A", "Roma", 1900, 1.0)
+            player = api.create_player("Mario", "Rossi", "Attaccante", 9, None)  # not subscribed
+            api.transfer_player(player, team)
+
+            assert events.get(timeout=2) == {"type": "team_created", "id_squadra": team}
+            assert events.get(timeout=2) == {"type": "player_transferred", "id_giocatore": player,
+                                             "id_squadra": team}
+            assert events.empty()
+        finally:
+            sub.close()
+
+
+def test_bad_types_are_refused(serve):
+    server = serve()
+    with CampionatoAPI("127.0.0.1", server.port) as api:
+        with pytest.raises(ApiError, match="types deve essere una lista"):
+            api.subscribe(print, types="team_created")
+
+
+def test_async_subscribe(serve):
+    server = serve()
+
+    async def scenario():
+        async with AsyncCampionatoAPI("127.0.0.1", server.port) as api:
+            received = []
+            subscription = api.subscribe(["team_created"])
+
+            async def listen():
+                async for event in subscription:
+                    received.append(event)
+                    if len(received) == 2:
+                        return
+
+            listener = asyncio.create_task(listen())
+            await asyncio.sleep(0.1)  # subscribed before the writes
+            teams = [await api.create_team(f"Team {i}", "Roma", 1900, 1.0) for i in range(2)]
+            await asyncio.wait_for(listener, 2)
+            await subscription.aclose()
+            return teams, received
+
+    teams, received = asyncio.run(scenario())
+    assert received == [{"type": "team_created", "id_squadra": t} for t in teams]
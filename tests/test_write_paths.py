@@ -0,0 +1,122 @@
+import pytest
+
+from server import db
+
+
+@pytest.fixture
+def count_statements(recording):
+    """``count_statements(fn, *args)``: the SQL statements ``fn`` issues inside a transaction."""
+    def count(fn, *args):
+        with db.transaction(), recording() as rec:
+            fn(*args)
+        return [sql for sql, _ in rec.queries]
+    return count
+
+
+def test_transfer_player_moves_player(league):
+    team_a, team_b, player = league
+    db.transfer_player(player, team_b)
+    assert [p[0] for p in db.list_players_by_team(team_b)] == [player]
+    assert db.list_players_by_team(team_a) == []
+
+
+def test_transfer_player_to_free_agents(league):
+    _, _, player = league
+    db.transfer_player(player, None)
+    assert [p[0] for p in db.list_free_agents()] == [player]
+
+
+def test_transfer_player_unknown_team(league):
+    _, _, player = league
+    with pytest.raises(db.NotFoundError, match="Squadra non trovata"):
+        db.transfer_player(player, 9999)
+
+
+def test_transfer_player_unknown_player(league):
+    _, team_b, _ = league
+    with pytest.raises(db.NotFoundError, match="Giocatore non trovato"):
+        db.transfer_player(9999, team_b)
+    with pytest.raises(db.NotFoundError, match="Giocatore non trovato"):
+        db.transfer_player(9999, None)
+
+
+def test_transfer_player_unknown_team_and_player_reports_team(league):
+    # same precedence as the old team_exists/player_exists checks
+    with pytest.raises(db.NotFoundError, match="Squadra non trovata"):
+        db.transfer_player(9999, 9999)
+
+
+def test_transfer_player_is_one_statement(league, count_statements):
+    _, team_b, player = league
+    statements = count_statements(db.transfer_player, player, team_b)
+    assert len(statements) == 1
+
+
+def test_update_player(league):
+    team_a, _, player = league
+    db.update_player(player, "Mario", "Rossi", "Centrocampista", 8)
+    assert db.list_players_by_team(team_a) == [(player, "Mario", "Rossi", "Centrocampista", 8)]
+
+
+def test_update_player_unknown(league):
+    with pytest.raises(db.NotFoundError, match="Giocatore non trovato"):
+        db.update_player(9999, "Mario", "Rossi", "Centrocampista", 8)
+
+
+def test_update_player_is_one_statement(league, count_statements):
+    _, _, player = league
+    statements = count_statements(db.update_player, player, "Mario", "Rossi", "Portiere", 1)
+    assert len(statements) == 1
+
+
+def test_delete_team_returns_name_and_releases_players(league):
+    team_a, _, player = league
+    assert db.delete_team(team_a) == "Team A"
+    assert [p[0] for p in db.list_free_agents()] == [player]
+    with pytest.raises(db.NotFoundError):
+        db.get_team_by_id(team_a)
+
+
+def test_delete_team_is_one_statement(league, count_statements):
+    team_a, _, _ = league
+    statements = count_statements(db.delete_team, team_a)
+    assert len(statements) == 1
+
+
+def test_delete_team_unknown(league):
+    with pytest.raises(db.NotFoundError, match="Squadra non trovata"):
+        db.delete_team(9999)
+
+
+def test_delete_team_action_uses_one_connection(league, monkeypatch):
+    from server import app
+
+    team_a, _, _ = league
+    opened = []
+    real_connect = db._connect
+    monkeypatch.setattr(db, "_connect", lambda *a: opened.append(a) or real_connect(*a))
+    db.configure()  # empty pool: every connection used below is a new one
+
+    resp = app.handle_request({"action": "delete_team", "data": {"id_squadra": team_a}})
+    assert resp == {"ok": True, "data": {}}
+    assert len(opened) == 1
+
+
+def test_delete_team_action_unknown(league):
+    from server import app
+
+    resp = app.handle_request({"action": "delete_team", "data": {"id_squadra": 9999}})
+    assert resp["ok"] is False
+    assert resp["error"]["message"] == "Squadra non trovata"
+    assert db.outbox_stats() == {}  # no email queued
+
+
+def test_delete_player_unknown(league):
+    with pytest.raises(db.NotFoundError, match="Giocatore non trovato"):
+        db.delete_player(9999)
+
+
+def test_integrity_error_is_wrapped(league):
+    _, _, player = league
+    with pytest.raises(db.IntegrityError):
+        db.update_player(player, None, "Rossi", "Portiere", 1)